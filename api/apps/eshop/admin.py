@@ -1,14 +1,21 @@
-import base64
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 from django.utils.html import format_html
 from django.db import models
-from django.db.models import Sum, Count, Avg, F
+from django.db.models import Count, Avg, F, ExpressionWrapper
+from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse
-from django.utils.safestring import mark_safe
 from django.template.response import TemplateResponse
 from django.urls import path
 
 from apps.eshop.admin_forms import ProductImageAdminForm, ProductImageForm
+from apps.eshop.bulk import bulk_set_order_status
+from apps.eshop.constants import LOW_STOCK_THRESHOLD, OrderStatus
+from apps.eshop.exports import CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE, stream_csv, stream_xlsx
+from apps.eshop.inventory import get_inventory_kpis
+from apps.eshop.reservations import StockConflict, clear_stock
+from apps.eshop.search import match_products
 from apps.eshop.models import (
     ProductCategory, Product, ProductImage, StockMovement,
     Wishlist, Order, OrderItem, Payment, Review
@@ -35,7 +42,7 @@ class OrderItemInline(admin.TabularInline):
     
     def subtotal_display(self, obj):
         if obj.pk:
-            return format_html('<strong>Frw {:,.2f}</strong>', obj.subtotal)
+            return format_html('<strong>Frw {}</strong>', f"{obj.subtotal:,.2f}")
         return '-'
     subtotal_display.short_description = 'Subtotal'
 
@@ -60,23 +67,10 @@ class CustomAdminSite(admin.AdminSite):
     index_title = "Welcome to E-Shop Administration"
     
     def index(self, request, extra_context=None):
-        total_products = Product.objects.count()
-        total_quantity = Product.objects.aggregate(models.Sum("quantity"))["quantity__sum"] or 0
-
-        total_value = Product.objects.annotate(
-            total=models.F("quantity") * models.F("price")
-        ).aggregate(models.Sum("total"))["total__sum"] or 0
-
-        out_of_stock = Product.objects.filter(quantity=0).count()
-        low_stock = Product.objects.filter(quantity__lt=10, quantity__gt=0).count()
-
         context = {
             **self.each_context(request),
-            "total_products": total_products,
-            "total_quantity": total_quantity,
-            "total_value": total_value,
-            "out_of_stock": out_of_stock,
-            "low_stock": low_stock,
+            # Cached, see apps.eshop.inventory
+            **get_inventory_kpis(),
         }
 
         return TemplateResponse(request, "admin/custom_dashboard.html", context)
@@ -84,30 +78,98 @@ class CustomAdminSite(admin.AdminSite):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path("inventory-report/", self.admin_view(self.inventory_report_view)),
+            path("inventory-report/", self.admin_view(self.inventory_report_view), name="inventory_report"),
+            path(
+                "inventory-report/export.<str:fmt>",
+                self.admin_view(self.inventory_export_view),
+                name="inventory_report_export",
+            ),
         ]
         return custom_urls + urls
-    
-    def inventory_report_view(self, request):
-        """View for inventory report"""
-        products = Product.objects.all().annotate(
-            stock_value=F("quantity") * F("price")
-        ).order_by('-stock_value')
 
-        total_value = products.aggregate(
-            total=Sum(F('quantity') * F('price'))
-        )['total'] or 0
+    # Report columns: (sort key, label, order_by field)
+    INVENTORY_COLUMNS = [
+        ("product", "Product", "product_name"),
+        ("category", "Category", "category__category_name"),
+        ("price", "Price", "price"),
+        ("quantity", "Quantity", "quantity"),
+        ("value", "Stock Value", "stock_value"),
+    ]
+    INVENTORY_DEFAULT_SORT = "-value"
+    INVENTORY_PAGE_SIZE = 50
+    INVENTORY_EXPORT_CHUNK_SIZE = 2000
+
+    def _inventory_queryset(self, request):
+        """Products with their stock value, sorted by the whitelisted `sort` parameter."""
+        sort = request.GET.get("sort", self.INVENTORY_DEFAULT_SORT)
+        fields = {key: field for key, _, field in self.INVENTORY_COLUMNS}
+        if sort.lstrip("-") not in fields:
+            sort = self.INVENTORY_DEFAULT_SORT
+        order = ("-" if sort.startswith("-") else "") + fields[sort.lstrip("-")]
+
+        products = Product.objects.annotate(
+            stock_value=ExpressionWrapper(F("quantity") * F("price"), output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+        ).order_by(order, "pk")
+        return products, sort
+
+    def inventory_report_view(self, request):
+        """Paginated inventory report with server-side sorting"""
+        products, sort = self._inventory_queryset(request)
+        page = Paginator(products.select_related("category"), self.INVENTORY_PAGE_SIZE).get_page(request.GET.get("page"))
+
+        columns = [
+            {
+                "label": label,
+                "active": sort.lstrip("-") == key,
+                "descending": sort == f"-{key}",
+                # Clicking the active column flips its direction
+                "sort": key if sort == f"-{key}" else f"-{key}",
+            }
+            for key, label, _ in self.INVENTORY_COLUMNS
+        ]
+        kpis = get_inventory_kpis()
 
         context = {
             **self.each_context(request),
-            "products": products,
-            "total_value": total_value,
+            "page_obj": page,
+            "products": page.object_list,
+            "columns": columns,
+            "sort": sort,
+            "total_products": kpis["total_products"],
+            "in_stock": kpis["total_products"] - kpis["out_of_stock"],
+            "total_value": kpis["total_value"],
+            "low_stock_threshold": LOW_STOCK_THRESHOLD,
         }
         return TemplateResponse(request, "admin/inventory_report.html", context)
-    
+
+    def inventory_export_view(self, request, fmt):
+        """Stream the whole report as CSV or XLSX, in the report's sort order"""
+        if fmt not in ("csv", "xlsx"):
+            raise Http404("Unknown export format")
+
+        products, _ = self._inventory_queryset(request)
+        rows = (
+            (name, category, price, quantity, value,
+             "Out of stock" if quantity == 0 else "Low stock" if quantity < LOW_STOCK_THRESHOLD else "In stock")
+            for name, category, price, quantity, value in products.values_list(
+                "product_name", "category__category_name", "price", "quantity", "stock_value",
+            ).iterator(chunk_size=self.INVENTORY_EXPORT_CHUNK_SIZE)
+        )
+        header = [label for _, label, _ in self.INVENTORY_COLUMNS] + ["Status"]
+
+        if fmt == "csv":
+            content, content_type = stream_csv(header, rows), CSV_CONTENT_TYPE
+        else:
+            content, content_type = stream_xlsx(header, rows, sheet_name="Inventory"), XLSX_CONTENT_TYPE
+        return StreamingHttpResponse(
+            content,
+            content_type=content_type,
+            headers={"Content-Disposition": f'attachment; filename="inventory-report.{fmt}"'},
+        )
+
     def each_context(self, request):
         context = super().each_context(request)
-        low_stock = Product.objects.filter(quantity__lt=10, quantity__gt=0).count()
+        low_stock = get_inventory_kpis()["low_stock"]
 
         if low_stock > 0:
             context["low_stock_warning"] = f"{low_stock} products are running low on stock!"
@@ -126,12 +188,15 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     list_display = ['category_name', 'product_count', 'description_preview']
     search_fields = ['category_name', 'description']
     list_per_page = 20
-    
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(product_total=Count('products'))
+
     def product_count(self, obj):
-        count = obj.products.count()
         url = reverse('admin:eshop_product_changelist') + f'?category__id__exact={obj.id}'
-        return format_html('<a href="{}">{} products</a>', url, count)
+        return format_html('<a href="{}">{} products</a>', url, obj.product_total)
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'product_total'
     
     def description_preview(self, obj):
         if obj.description:
@@ -149,10 +214,14 @@ class ProductAdmin(admin.ModelAdmin):
         'unit', 'stock_status', 'average_rating_display', 'created_at'
     ]
     list_filter = ['category', 'unit', 'created_at']
-    search_fields = ['product_name', 'description', 'category__category_name']
-    readonly_fields = ['created_at', 'average_rating_display', 'total_reviews', 'stock_value']
+    # Searched through the full-text / trigram indexes instead, see get_search_results
+    search_fields = ['product_name']
+    search_help_text = 'Searches product names and descriptions, tolerating typos.'
+    readonly_fields = ['created_at', 'updated_at', 'average_rating_display', 'total_reviews', 'stock_value']
     date_hierarchy = 'created_at'
     list_per_page = 20
+    # Ratings come from the denormalized rating_count/rating_sum, so only the FK needs joining
+    list_select_related = ['category']
     inlines = [ProductImageInline, StockMovementInline]
 
     fieldsets = (
@@ -163,11 +232,15 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('price', 'quantity', 'unit', 'stock_value')
         }),
         ('Statistics', {
-            'fields': ('average_rating_display', 'total_reviews', 'created_at'),
+            'fields': ('average_rating_display', 'total_reviews', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same indexed match as the storefront search, no ILIKE scan joined to categories
+        return match_products(queryset, search_term), False
+
     def price_display(self, obj):
         formatted_price = f"{obj.price:,.2f}"
         return format_html("<strong>Frw {}</strong>", formatted_price)
@@ -187,14 +260,14 @@ class ProductAdmin(admin.ModelAdmin):
         avg = obj.average_rating
         if avg:
             stars = '⭐' * int(round(avg))
-            return format_html('{} ({:.1f}/5)', stars, avg)
+            return format_html('{} ({}/5)', stars, f"{avg:.1f}")
         return 'No reviews'
     average_rating_display.short_description = 'Rating'
 
     def total_reviews(self, obj):
-        count = obj.reviews.count()
-        return f'{count} review(s)'
+        return f'{obj.rating_count} review(s)'
     total_reviews.short_description = 'Total Reviews'
+    total_reviews.admin_order_field = 'rating_count'
 
     def stock_value(self, obj):
         value = obj.price * obj.quantity
@@ -205,8 +278,10 @@ class ProductAdmin(admin.ModelAdmin):
     actions = ['mark_out_of_stock']
 
     def mark_out_of_stock(self, request, queryset):
-        queryset.update(quantity=0)
-        self.message_user(request, f'{queryset.count()} products marked as out of stock.')
+        # One UPDATE plus the STOCK_OUT ledger rows the product signals would have written
+        with transaction.atomic():
+            count = clear_stock(queryset, processed_by=request.user)
+        self.message_user(request, f'{count} products marked as out of stock.')
     mark_out_of_stock.short_description = 'Mark selected as out of stock'
 
 
@@ -218,32 +293,15 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_display = ['product', 'image_preview', 'file_name', 'created_at']
     list_filter = ['product__category', 'created_at']
     search_fields = ['product__product_name', 'file_name']
-    readonly_fields = ['file_name', 'mime_type', 'image_data', 'image_preview', 'created_at']
-    fields = ['product', 'upload_image', 'file_name', 'mime_type', 'image_data', 'image_preview', 'created_at']
+    readonly_fields = ['file_name', 'mime_type', 'storage_name', 'content_hash', 'image_preview', 'created_at']
+    fields = ['product', 'upload_image', 'file_name', 'mime_type', 'storage_name', 'content_hash', 'image_preview', 'created_at']
     list_per_page = 20
+    list_select_related = ['product']
 
-    def save_model(self, request, obj, form, change):
-        """
-        Handle uploaded file, convert & store into BinaryField.
-        """
-        file = form.cleaned_data.get("upload_image")
-
-        if file:
-            obj.file_name = file.name
-            obj.mime_type = getattr(file, "content_type", "application/octet-stream")
-            obj.image_data = file.read()
-
-        super().save_model(request, obj, form, change)
-    
     def image_preview(self, obj):
-        try:
-            if not obj.image_data:
-                return "No Image"
-            data = bytes(obj.image_data)  # convert memoryview if needed
-            encoded = base64.b64encode(data).decode("utf-8")
-            return mark_safe(f'<img src="data:{obj.mime_type};base64,{encoded}" width="100" />')
-        except Exception:
-            return "Invalid Image"
+        if not obj.content_hash:
+            return "No Image"
+        return format_html('<img src="{}" width="80" />', obj.variant_url("thumb"))
 
     image_preview.short_description = "Preview"
 
@@ -261,6 +319,7 @@ class StockMovementAdmin(admin.ModelAdmin):
     readonly_fields = ['created_date', 'processed_by']
     date_hierarchy = 'created_date'
     list_per_page = 20
+    list_select_related = ['product', 'processed_by']
     
     fieldsets = (
         ('Movement Details', {
@@ -273,7 +332,7 @@ class StockMovementAdmin(admin.ModelAdmin):
     
     def total_price_display(self, obj):
         try:
-            return format_html('Frw {:,.2f}', float(obj.total_price))
+            return format_html('Frw {}', f"{float(obj.total_price):,.2f}")
         except (ValueError, TypeError):
             # fallback if total_price is None or not a number
             return obj.total_price
@@ -287,13 +346,14 @@ class StockMovementAdmin(admin.ModelAdmin):
 class WishlistAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'product_price', 'added_date']
     list_filter = ['added_date', 'product__category']
-    search_fields = ['user__username', 'user__email', 'product__product_name']
+    search_fields = ['user__email', 'product__product_name']
     readonly_fields = ['added_date']
     date_hierarchy = 'added_date'
     list_per_page = 20
+    list_select_related = ['user', 'product']
     
     def product_price(self, obj):
-        return format_html('Frw {:,.2f}', obj.product.price)
+        return format_html('Frw {}', f"{obj.product.price:,.2f}")
     product_price.short_description = 'Price'
     product_price.admin_order_field = 'product__price'
 
@@ -307,10 +367,11 @@ class OrderAdmin(admin.ModelAdmin):
         'payment_method', 'payment_status', 'created_date'
     ]
     list_filter = ['status', 'payment_method', 'created_date']
-    search_fields = ['order_number', 'client__username', 'client__email', 'payment_id']
+    search_fields = ['order_number', 'client__email', 'payment_id']
     readonly_fields = ['order_number', 'created_date', 'updated_date', 'payment_status']
     date_hierarchy = 'created_date'
     list_per_page = 20
+    list_select_related = ['client', 'payment']
     inlines = [OrderItemInline]
     
     fieldsets = (
@@ -347,7 +408,7 @@ class OrderAdmin(admin.ModelAdmin):
     status_display.admin_order_field = 'status'
     
     def total_amount_display(self, obj):
-        return format_html('<strong>Frw {:,.2f}</strong>', obj.total_amount)
+        return format_html('<strong>Frw {}</strong>', f"{obj.total_amount:,.2f}")
     total_amount_display.short_description = 'Total'
     total_amount_display.admin_order_field = 'total_amount'
     
@@ -363,24 +424,30 @@ class OrderAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered', 'cancel_orders']
     
+    def _set_status(self, request, queryset, status, done):
+        """Set-based status change with the same stock and job side effects as saving each order"""
+        try:
+            count = bulk_set_order_status(queryset, status)
+        except StockConflict as exc:
+            names = ', '.join(str(c['product_name']) for c in exc.conflicts)
+            self.message_user(request, f'Not enough stock to reopen the selected orders: {names}.', messages.ERROR)
+            return
+        self.message_user(request, f'{count} orders {done}.')
+
     def mark_as_processing(self, request, queryset):
-        queryset.update(status='Processing')
-        self.message_user(request, f'{queryset.count()} orders marked as processing.')
+        self._set_status(request, queryset, OrderStatus.PROCESSING, 'marked as processing')
     mark_as_processing.short_description = 'Mark as Processing'
     
     def mark_as_shipped(self, request, queryset):
-        queryset.update(status='Shipped')
-        self.message_user(request, f'{queryset.count()} orders marked as shipped.')
+        self._set_status(request, queryset, OrderStatus.SHIPPED, 'marked as shipped')
     mark_as_shipped.short_description = 'Mark as Shipped'
     
     def mark_as_delivered(self, request, queryset):
-        queryset.update(status='Delivered')
-        self.message_user(request, f'{queryset.count()} orders marked as delivered.')
+        self._set_status(request, queryset, OrderStatus.DELIVERED, 'marked as delivered')
     mark_as_delivered.short_description = 'Mark as Delivered'
     
     def cancel_orders(self, request, queryset):
-        queryset.update(status='Canceled')
-        self.message_user(request, f'{queryset.count()} orders canceled.')
+        self._set_status(request, queryset, OrderStatus.CANCELED, 'canceled')
     cancel_orders.short_description = 'Cancel selected orders'
 
 
@@ -393,14 +460,16 @@ class OrderItemAdmin(admin.ModelAdmin):
     search_fields = ['order__order_number', 'product__product_name']
     readonly_fields = ['subtotal_display']
     list_per_page = 20
+    # Order.__str__ shows the client
+    list_select_related = ['order__client', 'product']
     
     def price_display(self, obj):
-        return format_html('Frw {:,.2f}', obj.price)
+        return format_html('Frw {}', f"{obj.price:,.2f}")
     price_display.short_description = 'Price'
     price_display.admin_order_field = 'price'
     
     def subtotal_display(self, obj):
-        return format_html('<strong>Frw {:,.2f}</strong>', obj.subtotal)
+        return format_html('<strong>Frw {}</strong>', f"{obj.subtotal:,.2f}")
     subtotal_display.short_description = 'Subtotal'
 
 
@@ -417,9 +486,10 @@ class PaymentAdmin(admin.ModelAdmin):
     readonly_fields = ['created_date', 'updated_date']
     date_hierarchy = 'created_date'
     list_per_page = 20
+    list_select_related = ['order__client']
     
     def amount_display(self, obj):
-        return format_html('<strong>Frw {:,.2f}</strong>', obj.amount)
+        return format_html('<strong>Frw {}</strong>', f"{obj.amount:,.2f}")
     amount_display.short_description = 'Amount'
     amount_display.admin_order_field = 'amount'
     
@@ -448,10 +518,11 @@ class ReviewAdmin(admin.ModelAdmin):
         'created_date'
     ]
     list_filter = ['rating', 'created_date', 'product__category']
-    search_fields = ['product__product_name', 'user__username', 'comment']
+    search_fields = ['product__product_name', 'user__email', 'comment']
     readonly_fields = ['created_date', 'updated_date']
     date_hierarchy = 'created_date'
     list_per_page = 20
+    list_select_related = ['product', 'user']
     
     def rating_display(self, obj):
         stars = '⭐' * obj.rating
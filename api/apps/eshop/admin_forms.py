@@ -5,7 +5,7 @@ from apps.eshop.models import ProductImage
 class ProductImageAdminForm(forms.ModelForm):
     upload_image = forms.FileField(
         required=False,
-        help_text="Upload an image. It will be converted and stored."
+        help_text="Upload an image. It will be written to the image storage."
     )
 
     class Meta:
@@ -17,9 +17,7 @@ class ProductImageAdminForm(forms.ModelForm):
 
         file = self.cleaned_data.get("upload_image")
         if file:
-            instance.file_name = file.name
-            instance.mime_type = getattr(file, "content_type", "application/octet-stream")
-            instance.image_data = file.read()
+            instance.set_upload(file)
 
         if commit:
             instance.save()
@@ -32,7 +30,7 @@ class ProductImageAdminForm(forms.ModelForm):
 class ProductImageForm(forms.ModelForm):
     upload = forms.FileField(
         required=False,
-        help_text="Upload an image. It will be stored as binary."
+        help_text="Upload an image. It will be written to the image storage."
     )
 
     class Meta:
@@ -44,9 +42,7 @@ class ProductImageForm(forms.ModelForm):
 
         file = self.cleaned_data.get("upload")
         if file:
-            instance.file_name = file.name
-            instance.mime_type = getattr(file, "content_type", "application/octet-stream")
-            instance.image_data = file.read()
+            instance.set_upload(file)
 
         if commit:
             instance.save()
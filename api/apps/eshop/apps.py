@@ -7,3 +7,4 @@ class EshopConfig(AppConfig):
     
     def ready(self):
         import apps.eshop.controller.signals
+        import apps.eshop.jobs
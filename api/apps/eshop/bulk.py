@@ -0,0 +1,62 @@
+"""
+Set-based order status changes for admin bulk actions.
+
+Saving orders one by one runs the Order signals (stock release/reservation,
+low stock alerts, sales rollups) per row, about four queries each. Here the
+same side effects are applied to the whole selection at once: one UPDATE of
+the orders, one UPDATE of the products, one INSERT of ledger rows and one
+INSERT of jobs, whatever the number of orders selected.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from apps.eshop.constants import OrderStatus
+from apps.eshop.models import Order, OrderItem
+from apps.eshop.reservations import release_orders_stock, reserve_orders_stock
+from apps.jobs.queue import enqueue, enqueue_many
+
+
+def bulk_set_order_status(queryset, status):
+    """
+    Move every order of `queryset` to `status`; returns how many changed.
+    Raises StockConflict, changing nothing, if reopening canceled orders
+    needs more stock than is available.
+    """
+    with transaction.atomic():
+        orders = list(
+            queryset.exclude(status=status).select_for_update()
+            .order_by('pk').values_list('pk', 'stock_released', 'created_date')
+        )
+        if not orders:
+            return 0
+        order_ids = [pk for pk, _, _ in orders]
+
+        # Canceling releases stock, leaving CANCELED takes back what was released
+        # (see handle_order_stock); orders whose release job is pending still hold theirs
+        if status == OrderStatus.CANCELED:
+            moved = [pk for pk, released, _ in orders if not released]
+        else:
+            moved = [pk for pk, released, _ in orders if released]
+        Order.objects.filter(pk__in=order_ids).update(
+            status=status, stock_released=status == OrderStatus.CANCELED, updated_date=timezone.now(),
+        )
+        if moved:
+            lines = list(
+                OrderItem.objects.filter(order_id__in=moved)
+                .values_list('order__order_number', 'product_id', 'quantity', 'price')
+            )
+            if status == OrderStatus.CANCELED:
+                release_orders_stock(lines)
+            else:
+                reserve_orders_stock(lines)
+
+        # Jobs are inserted in this transaction, so they exist exactly when the status change does
+        if status == OrderStatus.SUCCESS:
+            enqueue_many(
+                "eshop.low_stock_alert",
+                (({"order_id": pk}, f"eshop.low_stock_alert:{pk}") for pk in order_ids),
+            )
+        days = sorted({timezone.localdate(created).isoformat() for _, _, created in orders})
+        enqueue("eshop.refresh_sales_rollups", {"days": days})
+
+    return len(orders)
@@ -1,6 +1,15 @@
 from django.db import models
 
 
+# Products with fewer units than this (but some) are running low on stock
+LOW_STOCK_THRESHOLD = 10
+
+# Storefront price facets in Frw: lower bound inclusive, upper bound exclusive
+PRICE_BUCKETS = ((0, 5000), (5000, 20000), (20000, 50000), (50000, None))
+# Rating facets: products rated this or better on average
+RATING_BANDS = (4, 3, 2, 1)
+
+
 
 class OrderStatus(models.TextChoices):
     PENDING = "Pending", "Pending"
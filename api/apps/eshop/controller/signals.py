@@ -1,11 +1,20 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.db import transaction
-from django.core.mail import send_mail
 from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
 from decimal import Decimal
 
-from apps.eshop.models import Product, StockMovement, Order, OrderItem
+from apps.eshop.models import (
+    ProductCategory, Product, ProductImage, ProductTombstone, StockMovement, Order, OrderItem, Review,
+)
+from apps.eshop.inventory import invalidate_inventory_kpis
+from apps.eshop.reservations import reserve_order_stock
+from apps.eshop.storage import delete_image, lock_image
+from apps.eshop.thumbnails import variant_names
+from apps.eshop.versions import bump_versions
+from apps.jobs.queue import enqueue, enqueue_on_commit
 from apps.eshop.constants import MovementType, OrderStatus
 
 
@@ -88,7 +97,11 @@ def create_movement_for_product_change(sender, instance, created, **kwargs):
 def store_old_order_status(sender, instance, **kwargs):
     if instance.pk:
         try:
-            instance._old_status = Order.objects.only('status').get(pk=instance.pk).status
+            # Locked until the save commits, so concurrent status changes see each other's result
+            old = Order.objects.select_for_update().only('status', 'stock_released').get(pk=instance.pk)
+            instance._old_status = old.status
+            # Only the release job and handle_order_stock change the flag, never a stale instance
+            instance.stock_released = old.stock_released
         except Order.DoesNotExist:
             instance._old_status = None
     else:
@@ -96,67 +109,201 @@ def store_old_order_status(sender, instance, **kwargs):
 
 
 # ===========================
-# Update stock when order is completed/paid
+# Order status side effects, queued as background jobs
 # ===========================
 @receiver(post_save, sender=Order)
 def handle_order_stock(sender, instance, created, **kwargs):
-    """Reduce product stock when order is paid or completed."""
+    """
+    Stock already leaves inventory when the order is placed (a STOCK_OUT
+    movement per item in CustomerOrderViewSet.create). Canceling releases it
+    and completing the order checks for low stock; both run in the job worker
+    once the status change commits (see apps.eshop.jobs).
+
+    Reopening a canceled order reserves its stock again right away, so a
+    conflict reaches the seller instead of failing in the background. If the
+    release job has not run yet the order still holds its stock, so there is
+    nothing to reserve and the job skips it.
+    """
     old_status = getattr(instance, "_old_status", None)
 
-    # Only process if status changed to PAID or COMPLETED
-    if instance.status in [OrderStatus.PAID, OrderStatus.COMPLETED] and old_status != instance.status:
-        with transaction.atomic():
-            for item in instance.order_items.select_related('product'):
-                product = item.product
-
-                # Update stock using F() expression to avoid race conditions
-                Product.objects.filter(pk=product.pk).update(
-                    quantity=F('quantity') - item.quantity
-                )
-                
-                # Refresh product to get updated quantity
-                product.refresh_from_db()
-                
-                # Ensure quantity doesn't go negative
-                if product.quantity < 0:
-                    Product.objects.filter(pk=product.pk).update(quantity=0)
-                    product.quantity = 0
-
-                # Record stock movement with proper decimal calculation
-                total_price = Decimal(str(item.quantity)) * Decimal(str(product.price))
-                
-                movement = StockMovement(
-                    product=product,
-                    movement_type=MovementType.STOCK_OUT,
-                    quantity=item.quantity,
-                    total_price=total_price,
-                    notes=f"Order #{instance.order_number} processed",
-                )
-                movement._skip_stock_update = True  # Stock already updated above
-                movement.save()
-                
-                # Send low stock alert if needed
-                if product.quantity < 10 and product.quantity > 0:
-                    send_low_stock_email(product)
-
-
-# ===========================
-# Low stock email alert
-# ===========================
-def send_low_stock_email(product):
-    """Send email alert when product stock is low."""
-    try:
-        send_mail(
-            subject=f"⚠️ Low Stock Alert: {product.product_name}",
-            message=f"The product '{product.product_name}' is low on stock.\n\n"
-                    f"Current quantity: {product.quantity}\n"
-                    f"Product ID: {product.id}\n\n"
-                    f"Please restock soon.\n\n"
-                    f"This is an automated notification.",
-            from_email="noreply@yourshop.com",
-            recipient_list=["admin@yourshop.com"],
-            fail_silently=True,  # Don't crash if email fails
+    if created or old_status == instance.status:
+        return
+
+    if instance.status == OrderStatus.CANCELED:
+        # One release per cancellation, even if the enqueue is retried
+        enqueue_on_commit(
+            "eshop.release_order_stock", {"order_id": instance.pk},
+            key=f"eshop.release_order_stock:{instance.pk}:{instance.updated_date.isoformat()}",
         )
-    except Exception as e:
-        # Log the error but don't crash
-        print(f"Failed to send low stock email: {e}")
\ No newline at end of file
+    elif old_status == OrderStatus.CANCELED and instance.stock_released:
+        reserve_order_stock(instance)
+        Order.objects.filter(pk=instance.pk).update(stock_released=False)
+        instance.stock_released = False
+
+    if instance.status == OrderStatus.SUCCESS:
+        enqueue_on_commit(
+            "eshop.low_stock_alert", {"order_id": instance.pk},
+            key=f"eshop.low_stock_alert:{instance.pk}",
+        )
+
+
+# ===========================
+# Keep the sales rollups of the order's day current
+# ===========================
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_sales_rollups(sender, instance, **kwargs):
+    """Rebuilding a day is idempotent, so every order or item change just queues its day."""
+    created = instance.created_date if sender is Order else (
+        Order.objects.filter(pk=instance.order_id).values_list("created_date", flat=True).first()
+    )
+    if created is None:
+        return
+    day = timezone.localdate(created).isoformat()
+
+    def queue_refresh():
+        enqueue("eshop.refresh_sales_rollups", {"days": [day]})
+
+    # Robust: failing to queue a refresh must not fail the checkout, refresh_sales_rollups catches up
+    transaction.on_commit(queue_refresh, robust=True)
+
+
+# ===========================
+# Track old review rating
+# ===========================
+@receiver(pre_save, sender=Review)
+def store_old_review_rating(sender, instance, **kwargs):
+    # Review.save is atomic: the row lock holds until the deltas below are applied,
+    # so a concurrent edit reads the rating this one writes
+    if instance.pk:
+        try:
+            old = Review.objects.select_for_update().only('product_id', 'rating').get(pk=instance.pk)
+            instance._old_rating = (old.product_id, old.rating)
+        except Review.DoesNotExist:
+            instance._old_rating = None
+    else:
+        instance._old_rating = None
+
+
+# ===========================
+# Keep Product rating aggregates in sync
+# ===========================
+def _bump_rating(product_id, count, total):
+    Product.objects.filter(pk=product_id).update(
+        rating_count=F('rating_count') + count,
+        rating_sum=F('rating_sum') + total,
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    """Apply the review as a delta so concurrent writes never overwrite each other."""
+    old = getattr(instance, "_old_rating", None)
+
+    if created or old is None:
+        _bump_rating(instance.product_id, 1, instance.rating)
+        return
+
+    old_product_id, old_rating = old
+    if old_product_id != instance.product_id:
+        _bump_rating(old_product_id, -1, -old_rating)
+        _bump_rating(instance.product_id, 1, instance.rating)
+    elif old_rating != instance.rating:
+        _bump_rating(instance.product_id, 0, instance.rating - old_rating)
+
+
+@receiver(pre_delete, sender=Review)
+def lock_deleted_review(sender, instance, **kwargs):
+    # Subtract what is stored, not what this (possibly stale) instance last loaded
+    try:
+        old = Review.objects.select_for_update().only('product_id', 'rating').get(pk=instance.pk)
+    except Review.DoesNotExist:
+        # Already deleted by someone else, who has subtracted it
+        instance._rating_counted = False
+        return
+    instance.product_id, instance.rating = old.product_id, old.rating
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    if not getattr(instance, "_rating_counted", True):
+        return
+    _bump_rating(instance.product_id, -1, -instance.rating)
+
+
+# ===========================
+# Remove stored image bytes once unreferenced
+# ===========================
+@receiver(post_delete, sender=ProductImage)
+def delete_stored_image(sender, instance, **kwargs):
+    """Storage is content-addressed, so only delete when no other row shares the hash."""
+    content_hash = instance.content_hash
+    if not content_hash or ProductImage.objects.filter(content_hash=content_hash).exists():
+        return
+
+    names = variant_names(content_hash)
+    if instance.storage_name:
+        names.append(instance.storage_name)
+
+    def delete_files():
+        # An upload of the same content may have re-used the file since; it holds the lock until it commits
+        with transaction.atomic():
+            lock_image(content_hash)
+            if ProductImage.objects.filter(content_hash=content_hash).exists():
+                return
+            for name in names:
+                delete_image(name)
+
+    transaction.on_commit(delete_files)
+
+
+# ===========================
+# Incremental sync bookkeeping (apps.eshop.sync)
+# ===========================
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product_on_image_change(sender, instance, **kwargs):
+    # Images are part of the product payload, so the product counts as changed (the trigger stamps it)
+    Product.objects.filter(pk=instance.product_id).update(updated_at=Now())
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    # Database clock, like Product.updated_at, so the feed can order both against one watermark
+    ProductTombstone.objects.create(product_id=instance.pk, deleted_at=Now())
+
+
+# ===========================
+# Drop the cached admin inventory KPIs on stock changes
+# ===========================
+@receiver([post_save, post_delete], sender=Product)
+@receiver(post_save, sender=StockMovement)
+def invalidate_admin_inventory(sender, **kwargs):
+    transaction.on_commit(invalidate_inventory_kpis)
+
+
+
+# ===========================
+# Bump the catalogue version stamps behind the HTTP validators and the shop overview
+# ===========================
+CATALOG_TABLE_OF = {
+    ProductCategory: "category",
+    Product: "product",
+    ProductImage: "image",
+    Review: "review",
+    StockMovement: "product",  # movements change Product.quantity
+}
+
+
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=StockMovement)
+def bump_catalog_version(sender, **kwargs):
+    table = CATALOG_TABLE_OF[sender]
+
+    def bump():
+        bump_versions(table)
+
+    # After commit, so a client cannot revalidate against the pre-change state
+    transaction.on_commit(bump)
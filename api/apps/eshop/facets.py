@@ -0,0 +1,143 @@
+"""
+Facet counts for the storefront product list (?facets=1 on shop_products).
+
+All facets come from one grouped query: products are grouped by category and
+every count is a conditional aggregate (COUNT ... FILTER (WHERE ...)). Each
+facet ignores its own filter, so the sidebar shows what selecting another
+value would give: category counts disregard the chosen category, price counts
+the price range, stock counts the in-stock switch. Results are cached per
+normalized filter set and catalogue version stamps (apps.eshop.versions, the
+same stamps the product list ETag comes from), so a write to the catalogue
+moves to a new key at once; SHOP_FACETS_TIMEOUT only bounds how long an
+entry is kept.
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from rest_framework.exceptions import ValidationError
+
+from apps.eshop.constants import PRICE_BUCKETS, RATING_BANDS
+from apps.eshop.models import Product
+from apps.eshop.search import match_products
+from apps.eshop.versions import CATALOG_TABLES, get_versions
+
+
+FACETS_CACHE_PREFIX = "eshop:product_facets"
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: "A valid number is required."})
+
+
+def product_filters(params):
+    """Normalized storefront filters from the query string."""
+    category = params.get("category")
+    if category and not category.isdigit():
+        raise ValidationError({"category": "A valid category id is required."})
+    return {
+        "category": int(category) if category else None,
+        "min_price": _decimal(params, "min_price"),
+        "max_price": _decimal(params, "max_price"),
+        "in_stock": params.get("in_stock") in ("1", "true", "True"),
+        "search": " ".join(params.get("search", "").lower().split()),
+    }
+
+
+def _category_q(filters):
+    return Q(category_id=filters["category"]) if filters["category"] else Q()
+
+
+def _price_q(filters):
+    q = Q()
+    if filters["min_price"] is not None:
+        q &= Q(price__gte=filters["min_price"])
+    if filters["max_price"] is not None:
+        q &= Q(price__lte=filters["max_price"])
+    return q
+
+
+def _stock_q(filters):
+    return Q(quantity__gt=0) if filters["in_stock"] else Q()
+
+
+def filter_products(queryset, filters):
+    """Apply the category, price and stock filters (search is ranked separately by the caller)."""
+    return queryset.filter(_category_q(filters) & _price_q(filters) & _stock_q(filters))
+
+
+def _bucket_q(low, high):
+    q = Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+def build_facets(filters):
+    price, stock = _price_q(filters), _stock_q(filters)
+    aggregates = {
+        "category_count": Count("pk", filter=price & stock),
+        "in_stock": Count("pk", filter=price & Q(quantity__gt=0)),
+        "out_of_stock": Count("pk", filter=price & Q(quantity__lte=0)),
+    }
+    for n, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f"price_{n}"] = Count("pk", filter=_bucket_q(low, high) & stock)
+    for band in RATING_BANDS:
+        rated = Q(rating_count__gt=0, rating_sum__gte=band * F("rating_count"))
+        aggregates[f"rating_{band}"] = Count("pk", filter=price & stock & rated)
+
+    queryset = Product.objects.all()
+    if filters["search"]:
+        queryset = match_products(queryset, filters["search"])
+    rows = list(
+        queryset.order_by()
+        .values("category_id", "category__category_name")
+        .annotate(**aggregates)
+        .order_by("category__category_name")
+    )
+
+    # Non-category facets only count the rows of the chosen category
+    selected = [row for row in rows if filters["category"] in (None, row["category_id"])]
+    return {
+        "categories": [
+            {"id": row["category_id"], "category_name": row["category__category_name"], "count": row["category_count"]}
+            for row in rows
+        ],
+        "price": [
+            {"min": low, "max": high, "count": sum(row[f"price_{n}"] for row in selected)}
+            for n, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        "stock": {
+            "in_stock": sum(row["in_stock"] for row in selected),
+            "out_of_stock": sum(row["out_of_stock"] for row in selected),
+        },
+        "rating": [
+            {"min_rating": band, "count": sum(row[f"rating_{band}"] for row in selected)}
+            for band in RATING_BANDS
+        ],
+    }
+
+
+def facets_cache_key(filters):
+    # Stamps are read before the counts, like the overview: a build racing a write lands under the old key
+    tokens = "|".join(stamp["token"] for stamp in get_versions(CATALOG_TABLES))
+    normalized = json.dumps(filters, sort_keys=True, default=lambda value: str(value.normalize()))
+    return f"{FACETS_CACHE_PREFIX}:{hashlib.sha1(f'{tokens}|{normalized}'.encode()).hexdigest()}"
+
+
+def get_facets(filters):
+    key = facets_cache_key(filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = build_facets(filters)
+        cache.set(key, facets, settings.SHOP_FACETS_TIMEOUT)
+    return facets
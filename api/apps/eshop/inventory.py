@@ -0,0 +1,42 @@
+"""
+Inventory KPIs for the admin site.
+
+Every admin page shows the low stock warning and the admin index shows the
+stock totals, so they are computed in one aggregate query and cached. The
+stock signals (and the bulk paths in apps.eshop.reservations) drop the entry
+whenever a product or its quantity changes, so the next page rebuilds it.
+"""
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from apps.eshop.constants import LOW_STOCK_THRESHOLD
+from apps.eshop.models import Product
+
+
+INVENTORY_CACHE_KEY = "eshop:inventory_kpis"
+INVENTORY_CACHE_TIMEOUT = 60 * 60  # safety net only; signals invalidate on every change
+
+
+def build_inventory_kpis():
+    kpis = Product.objects.aggregate(
+        total_products=Count("id"),
+        total_quantity=Sum("quantity"),
+        total_value=Sum(ExpressionWrapper(F("quantity") * F("price"), output_field=DecimalField())),
+        out_of_stock=Count("id", filter=Q(quantity=0)),
+        low_stock=Count("id", filter=Q(quantity__gt=0, quantity__lt=LOW_STOCK_THRESHOLD)),
+    )
+    kpis["total_quantity"] = kpis["total_quantity"] or 0
+    kpis["total_value"] = kpis["total_value"] or 0
+    return kpis
+
+
+def get_inventory_kpis():
+    kpis = cache.get(INVENTORY_CACHE_KEY)
+    if kpis is None:
+        kpis = build_inventory_kpis()
+        cache.set(INVENTORY_CACHE_KEY, kpis, INVENTORY_CACHE_TIMEOUT)
+    return kpis
+
+
+def invalidate_inventory_kpis():
+    cache.delete(INVENTORY_CACHE_KEY)
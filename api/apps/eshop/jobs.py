@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.core.mail import send_mail
+
+from apps.eshop.constants import LOW_STOCK_THRESHOLD, OrderStatus
+from apps.eshop.models import Order, Product
+from apps.eshop.reservations import release_stock
+from apps.eshop.rollups import refresh_days
+from apps.jobs.queue import job
+
+
+
+
+# ===========================
+# Background work triggered by order changes
+# ===========================
+# Enqueued from apps.eshop.controller.signals once the change commits,
+# and run by `manage.py run_jobs`.
+
+@job("eshop.release_order_stock")
+def release_order_stock(order_id):
+    """
+    Put the stock of a canceled order back on the shelves.
+
+    Runs in the job's transaction with the order locked, and only while the
+    order is still canceled and its stock not yet released: an order reopened
+    before the worker got here still holds its stock, and a retried job must
+    not restock twice.
+    """
+    order = Order.objects.select_for_update().filter(pk=order_id).first()
+    if order is None or order.status != OrderStatus.CANCELED or order.stock_released:
+        return
+    release_stock(order)
+    Order.objects.filter(pk=order.pk).update(stock_released=True)
+
+
+@job("eshop.low_stock_alert")
+def low_stock_alert(order_id):
+    """Warn about products of a completed order that are now running low."""
+    products = Product.objects.filter(
+        orderitem__order_id=order_id, quantity__gt=0, quantity__lt=LOW_STOCK_THRESHOLD,
+    ).distinct()
+    for product in products:
+        send_low_stock_email(product)
+
+
+@job("eshop.refresh_sales_rollups")
+def refresh_sales_rollups(days):
+    """Rebuild the analytics rollups of the days whose orders changed."""
+    refresh_days([date.fromisoformat(day) for day in days])
+
+
+def send_low_stock_email(product):
+    """Send email alert when product stock is low."""
+    # Goes to the outbox (EMAIL_BACKEND), which retries delivery on its own
+    send_mail(
+        subject=f"⚠️ Low Stock Alert: {product.product_name}",
+        message=f"The product '{product.product_name}' is low on stock.\n\n"
+                f"Current quantity: {product.quantity}\n"
+                f"Product ID: {product.id}\n\n"
+                f"Please restock soon.\n\n"
+                f"This is an automated notification.",
+        from_email="noreply@yourshop.com",
+        recipient_list=["admin@yourshop.com"],
+    )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from apps.eshop.models import Product, Review
+from apps.eshop.versions import bump_versions
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.rating_count / rating_sum from the Review table."
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+
+        # One UPDATE with correlated subqueries; no rows are loaded into Python
+        updated = Product.objects.update(
+            rating_count=Coalesce(Subquery(reviews.annotate(c=Count('pk')).values('c')), 0),
+            rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0),
+        )
+
+        # update() bypasses the signals; ratings show on every catalogue endpoint
+        bump_versions("product")
+        self.stdout.write(self.style.SUCCESS(f"Rating aggregates recomputed for {updated} product(s)."))
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.eshop.models import Product, ProductCategory
+from apps.eshop.search import autocomplete_products, search_products
+
+
+WORDS = [
+    "organic", "fresh", "premium", "classic", "rwandan", "roasted", "sweet", "spicy", "golden", "green",
+    "coffee", "tea", "honey", "banana", "avocado", "mango", "pineapple", "cassava", "sorghum", "beans",
+    "rice", "maize", "flour", "butter", "cheese", "milk", "yogurt", "juice", "water", "soap",
+    "shampoo", "lotion", "basket", "sandals", "shirt", "dress", "kitenge", "notebook", "charger", "lamp",
+]
+PAGE_SIZE = 20
+
+
+def _typo(word):
+    position = random.randrange(1, len(word) - 1)
+    return word[:position] + word[position + 1:]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product search and autocomplete against a synthetic catalog (PostgreSQL only). "
+        "The catalog is seeded in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500_000, help="Synthetic products to seed.")
+        parser.add_argument("--queries", type=int, default=200, help="Timed queries per kind.")
+        parser.add_argument("--target-ms", type=float, default=50.0, help="Fail when a p95 exceeds this.")
+        parser.add_argument("--keep", action="store_true", help="Commit the synthetic catalog instead of rolling it back.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The search benchmark needs PostgreSQL (full-text and pg_trgm indexes).")
+
+        random.seed(0)
+        with transaction.atomic():
+            self._seed(options["products"])
+            results = {
+                "search": self._time(self._search_terms(options["queries"]), self._search),
+                "autocomplete": self._time(self._prefixes(options["queries"]), self._autocomplete),
+            }
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        failed = False
+        for kind, timings in results.items():
+            p50, p95 = statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
+            ok = p95 < options["target_ms"]
+            failed |= not ok
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f"{kind:<12} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   max {max(timings):7.2f} ms"))
+
+        if failed:
+            raise CommandError(f"p95 above {options['target_ms']} ms")
+
+    # ---------------------------
+    # Catalog
+    # ---------------------------
+    def _seed(self, count):
+        category = ProductCategory.objects.create(category_name=f"Benchmark {time.time_ns()}")
+        table = connection.ops.quote_name(Product._meta.db_table)
+        self.stdout.write(f"Seeding {count} products...")
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            # Generated server side; the search_vector trigger fills the tsvector of every row
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (category_id, product_name, description, price, quantity, created_at, rating_count, rating_sum)
+                SELECT %s,
+                       w[1 + i %% n] || ' ' || w[1 + (i / n) %% n] || ' ' || w[1 + (i / (n * n)) %% n] || ' ' || i,
+                       'Benchmark ' || w[1 + (i * 7) %% n] || ' ' || w[1 + (i * 13) %% n] || ' from our partners',
+                       (i %% 100000) / 100.0, i %% 50, now(), 0, 0
+                FROM generate_series(1, %s) AS i, (SELECT %s::text[] AS w, %s AS n) AS vocabulary
+                """,
+                [category.pk, count, WORDS, len(WORDS)],
+            )
+            cursor.execute(f"ANALYZE {table}")
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f} s")
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def _search_terms(self, count):
+        terms = []
+        for n in range(count):
+            words = random.sample(WORDS, 2 if n % 2 else 1)
+            if n % 5 == 0:
+                words[0] = _typo(words[0])
+            terms.append(" ".join(words))
+        return terms
+
+    def _prefixes(self, count):
+        prefixes = []
+        for n in range(count):
+            first, second = random.sample(WORDS, 2)
+            prefixes.append(f"{first} {second[:3]}" if n % 2 else first[:3])
+        return prefixes
+
+    def _search(self, term):
+        # What the storefront fetches for one page of results
+        return list(search_products(Product.objects.all(), term).values_list("pk", flat=True)[:PAGE_SIZE])
+
+    def _autocomplete(self, term):
+        return autocomplete_products(Product.objects.all(), term)
+
+    def _time(self, terms, run):
+        for term in terms[:10]:
+            run(term)  # warm the buffer cache
+        timings = []
+        for term in terms:
+            started = time.perf_counter()
+            run(term)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
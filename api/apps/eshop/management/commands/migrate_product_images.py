@@ -0,0 +1,52 @@
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.eshop.models import ProductImage
+from apps.eshop.storage import store_image
+
+
+class Command(BaseCommand):
+    help = "Move ProductImage bytes out of the image_data column into the configured image storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Rows loaded per batch (default: 50).")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be moved.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pending = ProductImage.objects.filter(storage_name="")
+
+        if options["dry_run"]:
+            self.stdout.write(f"{pending.count()} image(s) still stored in the database.")
+            return
+
+        moved = 0
+        last_pk = 0
+        while True:
+            # Walk by primary key so each batch is a small indexed range; only one batch of blobs is in memory
+            batch = list(
+                pending.with_data()
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "image_data")[:batch_size]
+            )
+            if not batch:
+                break
+
+            for image in batch:
+                last_pk = image.pk
+                if not image.image_data:
+                    continue
+                with transaction.atomic():
+                    name, content_hash = store_image(ContentFile(bytes(image.image_data)))
+                    ProductImage.objects.filter(pk=image.pk).update(
+                        storage_name=name,
+                        content_hash=content_hash,
+                        image_data=b"",
+                    )
+                moved += 1
+
+            self.stdout.write(f"Moved {moved} image(s) so far (last id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {moved} image(s) moved to storage."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.eshop.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete product tombstones older than CATALOG_TOMBSTONE_DAYS."
+
+    def handle(self, *args, **options):
+        pruned = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} product tombstone(s)."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import TruncDate
+
+from apps.eshop.models import DailySales, Order
+from apps.eshop.rollups import REFRESH_WINDOW_DAYS, refresh_days, trailing_days
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups behind the seller analytics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=REFRESH_WINDOW_DAYS,
+            help=f"Rebuild the last N days, today included (default: {REFRESH_WINDOW_DAYS}).",
+        )
+        parser.add_argument("--all", action="store_true", help="Rebuild every day that has orders.")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            days = set(Order.objects.annotate(day=TruncDate("created_date")).order_by().values_list("day", flat=True))
+            # Days whose orders are all gone still need their rows dropped
+            days.update(DailySales.objects.values_list("day", flat=True))
+        else:
+            # Writes that bypassed the order signals cannot be detected, so rebuild the whole window
+            days = trailing_days(options["days"])
+
+        refreshed = refresh_days(days)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed sales rollups of {refreshed} day(s)."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.eshop.constants import OrderStatus
+from apps.eshop.models import Order
+
+
+class Command(BaseCommand):
+    help = "Cancel unpaid orders whose stock reservation has expired, releasing their stock."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the expired orders.")
+
+    def handle(self, *args, **options):
+        expired = (
+            Order.objects.filter(status=OrderStatus.PENDING, reserved_until__lt=timezone.now())
+            .exclude(payment__status=True)
+        )
+        order_ids = list(expired.values_list('pk', flat=True))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(order_ids)} order(s) have an expired reservation.")
+            return
+
+        released = 0
+        for order_id in order_ids:
+            # One transaction per order; re-check under lock in case it was paid meanwhile
+            with transaction.atomic():
+                order = expired.select_for_update(of=('self',)).filter(pk=order_id).first()
+                if order is None:
+                    continue
+                order.status = OrderStatus.CANCELED
+                order.order_note = "\n".join(filter(None, [order.order_note, "Reservation expired before payment."]))
+                order.save()  # handle_order_stock releases the stock
+                released += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Released stock of {released} expired order(s)."))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired rows from database-backed caches (CACHE_BACKEND=db)."
+
+    def handle(self, *args, **options):
+        swept = 0
+        tables = set()
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if not isinstance(cache, DatabaseCache):
+                continue
+            db = router.db_for_write(cache.cache_model_class)
+            if (db, cache._table) in tables:
+                continue  # aliases may share a table
+            tables.add((db, cache._table))
+
+            connection = connections[db]
+            table = connection.ops.quote_name(cache._table)
+            now = connection.ops.adapt_datetimefield_value(timezone.now().replace(microsecond=0))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE expires < %s", [now])
+                swept += cursor.rowcount
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {swept} expired cache entr{'y' if swept == 1 else 'ies'}."))
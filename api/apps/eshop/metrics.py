@@ -0,0 +1,84 @@
+"""
+Shop-wide metrics shared by the seller dashboard and the inventory overview.
+
+Each table is read once with conditional aggregation, and the result is kept
+in the cache for SHOP_METRICS_TIMEOUT seconds. Refreshing is single flight:
+the first request past the deadline takes a short lock and recomputes, the
+others keep serving the previous value (or wait for the first computation),
+so any number of dashboards refreshing at once cost one computation.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+from apps.eshop.constants import OrderStatus
+from apps.eshop.models import Order, Product
+from apps.eshop.rollups import top_products
+
+
+# Single shop: every seller shares one entry
+METRICS_CACHE_KEY = "eshop:shop_metrics"
+METRICS_LOCK_KEY = "eshop:shop_metrics:lock"
+# Stale values outlive their deadline so waiting requests have something to serve
+METRICS_STALE_TIMEOUT = 5 * 60
+METRICS_LOCK_TIMEOUT = 10
+METRICS_WAIT_STEP = 0.05
+
+LOW_STOCK_QUANTITY = 5
+
+
+def compute_metrics():
+    """One query per table, plus the best sellers from the sales rollups."""
+    from apps.eshop.serializers import SellerProductOverviewSerializer
+
+    orders = Order.objects.aggregate(
+        total_orders=Count("id"),
+        pending_orders=Count("id", filter=Q(status=OrderStatus.PENDING)),
+        total_revenue=Sum("total_amount", filter=Q(status=OrderStatus.SUCCESS)),
+    )
+    products = Product.objects.aggregate(
+        total_products=Count("id"),
+        low_stock=Count("id", filter=Q(quantity__lt=LOW_STOCK_QUANTITY)),
+    )
+    return {
+        **orders,
+        "total_revenue": orders["total_revenue"] or 0,
+        **products,
+        "top_selling_products": list(SellerProductOverviewSerializer(top_products(), many=True).data),
+    }
+
+
+def _store(metrics):
+    cache.set(
+        METRICS_CACHE_KEY,
+        {"metrics": metrics, "fresh_until": time.time() + settings.SHOP_METRICS_TIMEOUT},
+        METRICS_STALE_TIMEOUT,
+    )
+
+
+def get_metrics():
+    entry = cache.get(METRICS_CACHE_KEY)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["metrics"]
+
+    if cache.add(METRICS_LOCK_KEY, 1, METRICS_LOCK_TIMEOUT):
+        try:
+            metrics = compute_metrics()
+            _store(metrics)
+            return metrics
+        finally:
+            cache.delete(METRICS_LOCK_KEY)
+
+    if entry is not None:
+        return entry["metrics"]
+
+    # Nothing cached yet and someone else is computing: wait for them, up to the lock timeout
+    deadline = time.monotonic() + METRICS_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(METRICS_WAIT_STEP)
+        entry = cache.get(METRICS_CACHE_KEY)
+        if entry is not None:
+            return entry["metrics"]
+    return compute_metrics()
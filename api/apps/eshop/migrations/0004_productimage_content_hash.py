@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:02
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    ProductImage = apps.get_model('eshop', 'ProductImage')
+    images = ProductImage.objects.filter(content_hash='').only('id', 'image_data')
+    for image in images.iterator(chunk_size=100):
+        if not image.image_data:
+            continue
+        digest = hashlib.sha256(bytes(image.image_data)).hexdigest()
+        ProductImage.objects.filter(pk=image.pk).update(content_hash=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0003_alter_stockmovement_total_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Content Hash'),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0004_productimage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='storage_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Storage Name'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image_data',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='Image Data'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:17
+
+from django.db import migrations, models
+
+
+def clamp_negative_stock(apps, schema_editor):
+    # The old StockMovement.save clamped to zero after the fact, so rows should
+    # already be non-negative; make sure before the constraint goes in.
+    Product = apps.get_model('eshop', 'Product')
+    Product.objects.filter(quantity__lt=0).update(quantity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0007_created_date_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Reserved Until'),
+        ),
+        migrations.RunPython(clamp_negative_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='product_quantity_non_negative'),
+        ),
+    ]
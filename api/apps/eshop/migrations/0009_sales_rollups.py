@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0008_stock_reservations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Shipped', 'Shipped'), ('Delivered', 'Delivered'), ('Success', 'Success'), ('Canceled', 'Canceled')], max_length=15, verbose_name='Status')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Orders')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14, verbose_name='Revenue')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Sales',
+                'verbose_name_plural': 'Daily Sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='daily_sales_day_status_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCustomerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Orders')),
+                ('spent', models.DecimalField(decimal_places=2, default=0.0, max_digits=14, verbose_name='Spent')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL, verbose_name='Client')),
+            ],
+            options={
+                'verbose_name': 'Daily Customer Sales',
+                'verbose_name_plural': 'Daily Customer Sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'client'), name='daily_customer_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14, verbose_name='Revenue')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='eshop.product', verbose_name='Product')),
+            ],
+            options={
+                'verbose_name': 'Daily Product Sales',
+                'verbose_name_plural': 'Daily Product Sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'product'), name='daily_product_sales_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0009_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lt', 10)), fields=['quantity'], name='product_low_stock_idx'),
+        ),
+    ]
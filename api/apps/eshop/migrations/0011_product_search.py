@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:42
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# The trigger keeping search_vector current (on every write path,
+# queryset.update() and bulk_create included) and the GIN indexes used by
+# apps.eshop.search.
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION eshop_product_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.product_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER eshop_product_search_vector_trg
+    BEFORE INSERT OR UPDATE OF product_name, description, search_vector ON {table}
+    FOR EACH ROW EXECUTE FUNCTION eshop_product_search_vector()
+    """,
+    """
+    UPDATE {table} SET search_vector =
+        setweight(to_tsvector('english', coalesce(product_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    """,
+    "CREATE INDEX product_search_vector_idx ON {table} USING gin (search_vector)",
+    "CREATE INDEX product_name_trgm_idx ON {table} USING gin (product_name gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS product_name_trgm_idx",
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "DROP TRIGGER IF EXISTS eshop_product_search_vector_trg ON {table}",
+    "DROP FUNCTION IF EXISTS eshop_product_search_vector()",
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        table = schema_editor.quote_name(apps.get_model('eshop', 'Product')._meta.db_table)
+        for statement in statements:
+            schema_editor.execute(statement.format(table=table))
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0010_product_low_stock_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_sql(FORWARD_SQL), run_sql(REVERSE_SQL)),
+    ]
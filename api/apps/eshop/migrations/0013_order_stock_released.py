@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+def mark_released_orders(apps, schema_editor):
+    # Canceled orders already had their stock put back, except those whose
+    # release job has not run yet: that job sets the flag itself.
+    Order = apps.get_model('eshop', 'Order')
+    Job = apps.get_model('jobs', 'Job')
+    pending = [
+        payload["order_id"]
+        for payload in Job.objects.filter(
+            name="eshop.release_order_stock", status__in=["pending", "running"],
+        ).values_list('payload', flat=True)
+    ]
+    Order.objects.filter(status="Canceled").exclude(pk__in=pending).update(stock_released=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0012_catalog_updated_at'),
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_released',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Stock Released'),
+        ),
+        migrations.RunPython(mark_released_orders, migrations.RunPython.noop),
+    ]
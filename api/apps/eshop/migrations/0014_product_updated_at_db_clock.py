@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# Product.updated_at is stamped by the database, with the writing
+# transaction's now(), on every insert and update, whatever the write path.
+# Updating a category touches its products, so the sync feed
+# (apps.eshop.sync) only has to look at Product.updated_at.
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION eshop_product_stamp_updated_at() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := now();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER eshop_product_stamp_updated_at_trg
+    BEFORE INSERT OR UPDATE ON {product}
+    FOR EACH ROW EXECUTE FUNCTION eshop_product_stamp_updated_at()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION eshop_category_touch_products() RETURNS trigger AS $$
+    BEGIN
+        UPDATE {product} SET updated_at = now() WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER eshop_category_touch_products_trg
+    AFTER UPDATE ON {category}
+    FOR EACH ROW EXECUTE FUNCTION eshop_category_touch_products()
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS eshop_category_touch_products_trg ON {category}",
+    "DROP FUNCTION IF EXISTS eshop_category_touch_products()",
+    "DROP TRIGGER IF EXISTS eshop_product_stamp_updated_at_trg ON {product}",
+    "DROP FUNCTION IF EXISTS eshop_product_stamp_updated_at()",
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        tables = {
+            "product": schema_editor.quote_name(apps.get_model('eshop', 'Product')._meta.db_table),
+            "category": schema_editor.quote_name(apps.get_model('eshop', 'ProductCategory')._meta.db_table),
+        }
+        for statement in statements:
+            schema_editor.execute(statement.format(**tables))
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0013_order_stock_released'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(run_sql(FORWARD_SQL), run_sql(REVERSE_SQL)),
+    ]
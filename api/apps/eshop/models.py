@@ -1,15 +1,34 @@
-from django.db import models
+import hashlib
+import io
+import uuid
+
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.utils.safestring import mark_safe
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from apps.eshop.constants import LOW_STOCK_THRESHOLD, UnitChoices, MovementType, OrderStatus
+
+
 
-from apps.eshop.constants import UnitChoices, MovementType, OrderStatus
+class TimestampedQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # auto_now only fires on save(); queryset updates (admin actions, stock engine) stamp the rows here
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
 
 
 
 class ProductCategory(models.Model):
     category_name = models.CharField(verbose_name="Category Name", max_length=100, unique=True, db_index=True)
     description = models.TextField(verbose_name="Description", blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TimestampedQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Product Category"
@@ -21,6 +40,13 @@ class ProductCategory(models.Model):
 
 
 
+class ProductManager(models.Manager):
+    def get_queryset(self):
+        # The tsvector is only read by the database (apps.eshop.search), never by Python
+        return super().get_queryset().defer('search_vector')
+
+
+
 class Product(models.Model):
     category = models.ForeignKey(ProductCategory, verbose_name="Category", related_name='products', on_delete=models.CASCADE)
     product_name = models.CharField(verbose_name="Product Name", max_length=100, unique=True, db_index=True)
@@ -29,21 +55,41 @@ class Product(models.Model):
     quantity = models.IntegerField(verbose_name="Quantity", default=0, validators=[MinValueValidator(0)])
     unit = models.CharField(verbose_name="Unit", max_length=5, choices=UnitChoices.choices, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Stamped by a database trigger with the writing transaction's now() on every
+    # insert and update, and touched when the category changes; feeds ?updated_since=
+    # (apps.eshop.sync). The value Python holds right after a save is only approximate.
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Denormalized review aggregates, maintained by the Review signals
+    rating_count = models.PositiveIntegerField(verbose_name="Rating Count", default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(verbose_name="Rating Sum", default=0, editable=False)
+    # Name (A) + description (B), kept current by a database trigger on PostgreSQL (see apps.eshop.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductManager()
 
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ['-created_at']
+        constraints = [
+            # Last line of defence against overselling, see apps.eshop.reservations
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='product_quantity_non_negative'),
+        ]
+        indexes = [
+            # Small partial index for the low/out of stock lookups (apps.eshop.inventory, admin filters)
+            models.Index(fields=['quantity'], name='product_low_stock_idx', condition=models.Q(quantity__lt=LOW_STOCK_THRESHOLD)),
+            # Keyset order of the incremental sync feed
+            models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+        ]
 
     def __str__(self):
         return self.product_name
 
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews.exists():
-            return reviews.aggregate(models.Avg('rating'))['rating__avg']
-        return None
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
 
     @property
     def in_stock(self):
@@ -52,13 +98,33 @@ class Product(models.Model):
 
 
 
+class ProductImageQuerySet(TimestampedQuerySet):
+    def with_data(self):
+        """Load the binary payload as well (only the image endpoint needs it)."""
+        return self.defer(None)
+
+
+class ProductImageManager(models.Manager.from_queryset(ProductImageQuerySet)):
+    def get_queryset(self):
+        # Never pull the blob out of the database unless explicitly asked for
+        return super().get_queryset().defer('image_data')
+
+
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, verbose_name="Product", related_name="product_images", on_delete=models.CASCADE)
     file_name = models.CharField(max_length=255, blank=True, null=True)
     mime_type = models.CharField(max_length=100, blank=True, null=True)
-    image_data = models.BinaryField(verbose_name="Image Data", default=b"")
+    # Legacy inline storage; new uploads go through apps.eshop.storage and leave this empty
+    image_data = models.BinaryField(verbose_name="Image Data", default=b"", blank=True)
+    storage_name = models.CharField(verbose_name="Storage Name", max_length=255, blank=True, default="")
+    content_hash = models.CharField(verbose_name="Content Hash", max_length=64, blank=True, default="", db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductImageManager()
 
     class Meta:
         ordering = ['created_at']
@@ -66,17 +132,50 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"{self.product.product_name} - {self.file_name}"
 
+    def save(self, *args, **kwargs):
+        # Keep the content hash in sync with the stored bytes (skip when the blob was deferred)
+        if 'image_data' not in self.get_deferred_fields() and self.image_data:
+            self.content_hash = hashlib.sha256(bytes(self.image_data)).hexdigest()
+        super().save(*args, **kwargs)
+
+    def set_upload(self, file):
+        """Write an uploaded file through the image storage and point this row at it."""
+        from apps.eshop.storage import store_image
+
+        self.storage_name, self.content_hash = store_image(file)
+        self.file_name = file.name
+        self.mime_type = getattr(file, "content_type", "application/octet-stream")
+        self.image_data = b""
+
+    def open_image(self):
+        """File-like object with the image bytes, wherever they are stored."""
+        if self.storage_name:
+            from apps.eshop.storage import open_image
+            return open_image(self.storage_name)
+        return io.BytesIO(bytes(self.image_data))
+
+    @property
+    def image_url(self):
+        """Content-addressed URL of the raw image bytes."""
+        if not self.content_hash:
+            return None
+        return reverse('product-images-detail', kwargs={'content_hash': self.content_hash})
+
+    def variant_url(self, variant, fmt="jpg"):
+        """URL of a resized variant (see apps.eshop.thumbnails)."""
+        if not self.content_hash:
+            return None
+        return reverse('product-images-variant', kwargs={
+            'content_hash': self.content_hash, 'variant': variant, 'fmt': fmt,
+        })
+
     def image_preview(self):
         """
-        Preview for Django admin — shows the stored image.
+        Preview for Django admin — shows the 80px thumbnail.
         """
-        if not self.image_data:
+        if not self.content_hash:
             return "No Image"
-
-        # Convert binary to base64 for inline display
-        import base64
-        data = base64.b64encode(self.image_data).decode("utf-8")
-        return mark_safe(f'<img src="data:{self.mime_type};base64,{data}" width="80" />')
+        return format_html('<img src="{}" width="80" />', self.variant_url("thumb"))
 
     image_preview.short_description = "Preview"
     image_preview.allow_tags = True
@@ -84,6 +183,22 @@ class ProductImage(models.Model):
 
 
 
+class ProductTombstone(models.Model):
+    """A deleted product, kept for the incremental sync feed (apps.eshop.sync)."""
+    product_id = models.BigIntegerField(verbose_name="Product ID")
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Product Tombstone"
+        verbose_name_plural = "Product Tombstones"
+        ordering = ['deleted_at']
+
+    def __str__(self):
+        return f"Product {self.product_id} deleted {self.deleted_at}"
+
+
+
+
 class StockMovement(models.Model):
     product = models.ForeignKey(Product, verbose_name="Product", related_name="stock_movements", on_delete=models.CASCADE)
     movement_type = models.CharField(verbose_name="Movement Type", choices=MovementType.choices, max_length=15)
@@ -95,6 +210,7 @@ class StockMovement(models.Model):
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [models.Index(fields=['-created_date', '-id'], name='stockmove_created_id_idx')]
         verbose_name = "Stock Movement"
         verbose_name_plural = "Stock Movements"
 
@@ -110,29 +226,38 @@ class StockMovement(models.Model):
             return -self.quantity
         return 0
 
+    def clean(self):
+        super().clean()
+        if (
+            not self.pk and self.movement_type == MovementType.STOCK_OUT
+            and self.product_id and self.quantity and self.quantity > self.product.quantity
+        ):
+            raise ValidationError({"quantity": f"Only {self.product.quantity} in stock."})
+
     def save(self, *args, **kwargs):
         # Only update product quantity if this is NOT coming from a signal
         # and if this is a new StockMovement
         if not self.pk and not getattr(self, '_skip_stock_update', False):
-            # Update product quantity directly using update() to avoid triggering signals
             from django.db.models import F
-            
-            # Calculate the change
+            from apps.eshop.reservations import StockConflict
+
             change = self.quantity_changed
-            
-            # Update using F() expression
-            Product.objects.filter(pk=self.product.pk).update(
-                quantity=F('quantity') + change
-            )
-            
-            # Refresh the product instance
-            self.product.refresh_from_db()
-            
-            # Ensure quantity doesn't go negative
-            if self.product.quantity < 0:
-                Product.objects.filter(pk=self.product.pk).update(quantity=0)
-                self.product.quantity = 0
-        
+            products = Product.objects.filter(pk=self.product.pk)
+            if change < 0:
+                # Conditional decrement: never takes more than is on the shelf
+                products = products.filter(quantity__gte=-change)
+
+            if not products.update(quantity=F('quantity') + change):
+                self.product.refresh_from_db(fields=['quantity'])
+                raise StockConflict([{
+                    "product": self.product.pk,
+                    "product_name": self.product.product_name,
+                    "requested": self.quantity,
+                    "available": self.product.quantity,
+                }])
+
+            self.product.refresh_from_db(fields=['quantity'])
+
         super().save(*args, **kwargs)
 
 
@@ -164,17 +289,29 @@ class Order(models.Model):
     total_amount = models.DecimalField(verbose_name="Total Amount", max_digits=10, decimal_places=2, default=0.00)
     payment_method = models.CharField(verbose_name="Payment Method", max_length=50)
     payment_id = models.CharField(verbose_name="Payment ID", max_length=100, blank=True, null=True)
+    # Unpaid orders hold their stock until this deadline (release_expired_reservations)
+    reserved_until = models.DateTimeField(verbose_name="Reserved Until", blank=True, null=True, db_index=True)
+    # Set once a canceled order's stock is back on the shelves, cleared when it is reserved again
+    stock_released = models.BooleanField(verbose_name="Stock Released", default=False, editable=False)
     created_date = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_date = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [models.Index(fields=['-created_date', '-id'], name='order_created_id_idx')]
         verbose_name = "Order"
         verbose_name_plural = "Orders"
 
     def __str__(self):
         return f"{self.order_number} - {self.client}"
 
+    def save(self, *args, **kwargs):
+        if not self.order_number:
+            self.order_number = f"ORD-{timezone.now():%Y%m%d}-{uuid.uuid4().hex[:8].upper()}"
+        # Atomic so store_old_order_status can hold the row lock through the status side effects
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     def calculate_total(self):
         total = sum(item.quantity * item.price for item in self.order_items.all())
         self.total_amount = total
@@ -214,6 +351,7 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [models.Index(fields=['-created_date', '-id'], name='payment_created_id_idx')]
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
 
@@ -233,9 +371,69 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [models.Index(fields=['-created_date', '-id'], name='review_created_id_idx')]
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
         unique_together = ('product', 'user')
 
     def __str__(self):
-        return f"{self.product.product_name} - {self.user.username} ({self.rating}/5)"
+        return f"{self.product.product_name} - {self.user.email} ({self.rating}/5)"
+
+    def save(self, *args, **kwargs):
+        # The post_save signal updates Product rating counters; keep both writes in one transaction
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+
+
+# ===========================
+# Sales rollups (see apps.eshop.rollups)
+# ===========================
+# One row per day and key, rebuilt from the orders of that day whenever an
+# order changes. The seller analytics read these instead of scanning orders.
+
+class DailySales(models.Model):
+    day = models.DateField(verbose_name="Day")
+    status = models.CharField(verbose_name="Status", max_length=15, choices=OrderStatus.choices)
+    order_count = models.PositiveIntegerField(verbose_name="Orders", default=0)
+    revenue = models.DecimalField(verbose_name="Revenue", max_digits=14, decimal_places=2, default=0.00)
+    refreshed_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'status'], name='daily_sales_day_status_uniq')]
+        verbose_name = "Daily Sales"
+        verbose_name_plural = "Daily Sales"
+
+    def __str__(self):
+        return f"{self.day} - {self.status}"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField(verbose_name="Day")
+    product = models.ForeignKey(Product, verbose_name="Product", related_name="daily_sales", on_delete=models.CASCADE)
+    units = models.PositiveIntegerField(verbose_name="Units", default=0)
+    revenue = models.DecimalField(verbose_name="Revenue", max_digits=14, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_uniq')]
+        verbose_name = "Daily Product Sales"
+        verbose_name_plural = "Daily Product Sales"
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}"
+
+
+class DailyCustomerSales(models.Model):
+    day = models.DateField(verbose_name="Day")
+    client = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name="Client", related_name="daily_sales", on_delete=models.CASCADE)
+    order_count = models.PositiveIntegerField(verbose_name="Orders", default=0)
+    spent = models.DecimalField(verbose_name="Spent", max_digits=14, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'client'], name='daily_customer_sales_uniq')]
+        verbose_name = "Daily Customer Sales"
+        verbose_name_plural = "Daily Customer Sales"
+
+    def __str__(self):
+        return f"{self.day} - {self.client_id}"
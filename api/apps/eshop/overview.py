@@ -0,0 +1,64 @@
+"""
+Pre-rendered payload for the public shop overview.
+
+The JSON body is built once and kept in the cache together with its ETag and
+build time, under a key derived from the catalogue version stamps (see
+apps.eshop.versions). Every committed change to a category, product, image,
+review or stock level replaces a stamp, so the next hit looks up a new key
+and rebuilds.
+
+The stamps are read before the catalogue: a rebuild that raced a write and
+saw the old data stores its body under the old stamps, which no request
+asks for any more, instead of pinning it under the current key.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.eshop.models import ProductCategory, Product
+from apps.eshop.versions import CATALOG_TABLES, get_versions
+
+
+OVERVIEW_CACHE_KEY = "eshop:shop_overview:{}"
+OVERVIEW_CACHE_TIMEOUT = 60 * 60  # only bounds how long superseded bodies linger
+OVERVIEW_TOP_PRODUCTS = 10
+
+
+def build_overview():
+    """Render the overview in three queries: categories, top products, their images."""
+    from apps.eshop.serializers import ShopOverviewSerializer
+
+    generated_at = timezone.now()
+    payload = {
+        "categories": ProductCategory.objects.annotate(product_count=Count("products")).order_by("category_name"),
+        "top_products": (
+            Product.objects.filter(quantity__gt=0)
+            .prefetch_related("product_images")
+            .order_by("-created_at")[:OVERVIEW_TOP_PRODUCTS]
+        ),
+        "generated_at": generated_at,
+    }
+    body = JSONRenderer().render(ShopOverviewSerializer(payload).data)
+
+    return {
+        "body": body,
+        "etag": '"{}"'.format(hashlib.sha1(body).hexdigest()),
+        "last_modified": int(generated_at.timestamp()),
+    }
+
+
+def overview_cache_key():
+    tokens = "|".join(stamp["token"] for stamp in get_versions(CATALOG_TABLES))
+    return OVERVIEW_CACHE_KEY.format(hashlib.sha1(tokens.encode()).hexdigest())
+
+
+def get_overview():
+    key = overview_cache_key()
+    overview = cache.get(key)
+    if overview is None:
+        overview = build_overview()
+        cache.set(key, overview, OVERVIEW_CACHE_TIMEOUT)
+    return overview
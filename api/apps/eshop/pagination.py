@@ -0,0 +1,30 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+
+
+# ===========================
+# Keyset pagination for append-heavy seller lists
+# ===========================
+class CreatedDateCursorPagination(CursorPagination):
+    """
+    Cursor pagination on created_date, newest first.
+
+    DRF builds the cursor position from the first ordering field only: the
+    next page filters `created_date < <position>`, where the position is the
+    last created_date on the page that is not shared by the rows after it, and
+    skips those already-served tied rows by an offset stored in the cursor.
+    Every page is a bounded range scan on the (created_date, id) index
+    no matter how deep the client has paged. `id` only orders rows created in
+    the same instant, it is not part of the WHERE clause.
+
+    Responses carry `next`, `previous` and `results` only: unlike the previous
+    limit/offset pagination there is no `count`, so no COUNT(*) is issued.
+    `?limit=` is kept as the page size parameter so existing clients keep
+    working; `offset` is simply ignored.
+    """
+    ordering = ('-created_date', '-id')
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+    page_size_query_param = 'limit'
+    max_page_size = 100
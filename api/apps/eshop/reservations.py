@@ -0,0 +1,200 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from apps.eshop.constants import MovementType
+from apps.eshop.models import Product, StockMovement
+from apps.eshop.inventory import invalidate_inventory_kpis
+from apps.eshop.versions import bump_versions
+
+
+
+
+# ===========================
+# Stock reservation engine
+# ===========================
+#
+# Placing an order reserves its stock straight away: Product.quantity is
+# decremented and a STOCK_OUT movement is written per line. Every decrement is
+# conditional (UPDATE ... WHERE quantity >= n), and the product_quantity_non_negative
+# CHECK constraint backs it up, so concurrent checkouts can never drive a
+# product below zero. Canceling the order puts the stock back.
+
+
+class StockConflict(Exception):
+    """
+    Raised when stock cannot be reserved. `conflicts` holds one entry per
+    product that is short: {"product", "product_name", "requested", "available"}.
+    """
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__(f"insufficient stock for {len(conflicts)} product(s)")
+
+
+def reservation_expiry():
+    """Deadline for paying an order placed now, after which its stock is released."""
+    return timezone.now() + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+
+
+def _conflicts(requested, products):
+    conflicts = []
+    for prod_id, qty in requested.items():
+        product = products.get(prod_id)
+        available = product.quantity if product else 0
+        if available < qty:
+            conflicts.append({
+                "product": prod_id,
+                "product_name": product.product_name if product else None,
+                "requested": qty,
+                "available": available,
+            })
+    return conflicts
+
+
+def _apply(requested, sign):
+    """Move stock for every product in a single UPDATE; returns the rows changed."""
+    queryset = Product.objects.filter(pk__in=requested)
+    if sign < 0:
+        # Only rows that still hold enough stock are touched
+        condition = models.Q()
+        for prod_id, qty in requested.items():
+            condition |= models.Q(pk=prod_id, quantity__gte=qty)
+        queryset = queryset.filter(condition)
+
+    return queryset.update(
+        quantity=models.Case(
+            *[models.When(pk=prod_id, then=models.F('quantity') + sign * qty) for prod_id, qty in requested.items()],
+            output_field=models.IntegerField(),
+        )
+    )
+
+
+def _requested(lines):
+    requested = {}
+    for prod_id, qty, *_ in lines:
+        requested[prod_id] = requested.get(prod_id, 0) + qty
+    return requested
+
+
+def _ledger(entries, movement_type, processed_by=None):
+    """Write one movement per (product_id, quantity, price, notes) entry in a single INSERT."""
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=prod_id,
+            movement_type=movement_type,
+            quantity=qty,
+            total_price=price * qty,
+            processed_by=processed_by,
+            notes=notes,
+        )
+        for prod_id, qty, price, notes in entries
+    ])
+    # bulk_create skips post_save, so the caches fed by stock are dropped here
+    transaction.on_commit(invalidate_inventory_kpis)
+    transaction.on_commit(bump_product_version)
+
+
+def bump_product_version():
+    bump_versions("product")
+
+
+def _movements(order, lines, movement_type, note):
+    _ledger(
+        [(prod_id, qty, price, f"Order {order.order_number} {note}") for prod_id, qty, price in lines],
+        movement_type,
+    )
+
+
+def _take(requested):
+    """
+    Decrement stock for `requested` ({product_id: quantity}) or raise StockConflict.
+
+    All products are locked in one query ordered by pk, so concurrent checkouts
+    always lock in the same order and cannot deadlock.
+    """
+    products = {
+        product.pk: product
+        for product in Product.objects.select_for_update()
+        .filter(pk__in=requested)
+        .only('id', 'product_name', 'quantity')
+        .order_by('pk')
+    }
+    conflicts = _conflicts(requested, products)
+    if conflicts:
+        raise StockConflict(conflicts)
+
+    if _apply(requested, -1) != len(requested):
+        # Only reachable where the database does not honour row locks
+        raise StockConflict(_conflicts(requested, Product.objects.in_bulk(requested)))
+
+
+def reserve_stock(order, lines, note="created by customer"):
+    """
+    Take stock out for `lines` ((product_id, quantity, price) tuples) of `order`.
+
+    Raises StockConflict when any product is short; it must run inside a
+    transaction, which the caller rolls back on conflict.
+    """
+    _take(_requested(lines))
+    _movements(order, lines, MovementType.STOCK_OUT, note)
+
+
+def release_stock(order, note="canceled"):
+    """Put the stock held by `order` back on the shelves."""
+    lines = list(order.order_items.values_list('product_id', 'quantity', 'price'))
+    if not lines:
+        return
+    _apply(_requested(lines), 1)
+    _movements(order, lines, MovementType.STOCK_IN, note)
+
+
+def reserve_order_stock(order, note="reopened"):
+    """Reserve the stock of an existing order again (a canceled order being reopened)."""
+    lines = list(order.order_items.values_list('product_id', 'quantity', 'price'))
+    if lines:
+        reserve_stock(order, lines, note)
+
+
+
+
+# ===========================
+# Set-based variants for bulk admin actions
+# ===========================
+# `lines` are (order_number, product_id, quantity, price) tuples spanning many
+# orders. Each call costs a constant number of queries however many orders
+# and products are involved.
+
+def _order_entries(lines, note):
+    return [(prod_id, qty, price, f"Order {number} {note}") for number, prod_id, qty, price in lines]
+
+
+def release_orders_stock(lines, note="canceled"):
+    """Put the stock of many canceled orders back in one UPDATE and one INSERT."""
+    if not lines:
+        return
+    _apply(_requested((prod_id, qty) for _, prod_id, qty, _ in lines), 1)
+    _ledger(_order_entries(lines, note), MovementType.STOCK_IN)
+
+
+def reserve_orders_stock(lines, note="reopened"):
+    """Reserve the stock of many reopened orders at once; raises StockConflict if any product is short."""
+    if not lines:
+        return
+    _take(_requested((prod_id, qty) for _, prod_id, qty, _ in lines))
+    _ledger(_order_entries(lines, note), MovementType.STOCK_OUT)
+
+
+def clear_stock(products, processed_by=None, note="Marked out of stock in admin"):
+    """Set every product of the `products` queryset to zero, writing the STOCK_OUT ledger rows."""
+    rows = list(
+        products.filter(quantity__gt=0).select_for_update()
+        .order_by('pk').values_list('pk', 'quantity', 'price')
+    )
+    if not rows:
+        return 0
+    Product.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(quantity=0)
+    _ledger([(pk, qty, price, note) for pk, qty, price in rows], MovementType.STOCK_OUT, processed_by)
+    return len(rows)
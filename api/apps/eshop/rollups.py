@@ -0,0 +1,134 @@
+"""
+Daily sales rollups behind the seller analytics.
+
+A day is always rebuilt as a whole from its orders (delete + insert in one
+transaction), so refreshing is idempotent and can be triggered as often as
+needed: by the order signals through the job queue, and by the
+`refresh_sales_rollups` command for anything that bypassed them (queryset
+updates, raw SQL). Bypassed writes leave no trace to detect them by, so the
+scheduled run simply rebuilds a trailing window of REFRESH_WINDOW_DAYS;
+older days are caught up with `--days N` or `--all` (e.g. after a fresh
+deployment or a bulk fix).
+
+Reading is O(days): monthly revenue and per-status counts sum DailySales,
+the top lists sum the per-product and per-customer daily rows.
+"""
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from apps.eshop.constants import OrderStatus
+from apps.eshop.models import DailyCustomerSales, DailyProductSales, DailySales, Order, OrderItem, Product
+
+
+TOP_LIMIT = 5
+# Days (today included) the scheduled refresh_sales_rollups run rebuilds
+REFRESH_WINDOW_DAYS = 2
+
+
+# ===========================
+# Refreshing
+# ===========================
+def _created_on(days, field="created_date"):
+    # Range lookups rather than __date so the created_date index is used
+    ranges = []
+    for day in days:
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        ranges.append(Q(**{f"{field}__gte": start, f"{field}__lt": start + timedelta(days=1)}))
+    return reduce(or_, ranges)
+
+
+def _lock_days(days):
+    # Two workers rebuilding the same day would both insert its rows; the second
+    # waits here and then rebuilds from the committed orders. Sorted, so no deadlocks.
+    with connection.cursor() as cursor:
+        for day in days:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"eshop.daily_sales:{day.isoformat()}"])
+
+
+def refresh_days(days):
+    """Rebuild the rollup rows of `days` (dates in the current time zone)."""
+    days = sorted(set(days))
+    if not days:
+        return 0
+
+    # order_by() drops Order.Meta.ordering, which would otherwise end up in the GROUP BY
+    orders = Order.objects.filter(_created_on(days)).annotate(day=TruncDate("created_date")).order_by()
+    items = (
+        OrderItem.objects.filter(_created_on(days, "order__created_date"))
+        .annotate(day=TruncDate("order__created_date"))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        _lock_days(days)
+        for model in (DailySales, DailyProductSales, DailyCustomerSales):
+            model.objects.filter(day__in=days).delete()
+
+        DailySales.objects.bulk_create([
+            DailySales(day=row["day"], status=row["status"], order_count=row["order_count"], revenue=row["revenue"] or 0)
+            for row in orders.values("day", "status").annotate(order_count=Count("id"), revenue=Sum("total_amount"))
+        ])
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(day=row["day"], product_id=row["product"], units=row["units"], revenue=row["revenue"] or 0)
+            for row in items.values("day", "product").annotate(
+                units=Sum("quantity"),
+                revenue=Sum(ExpressionWrapper(F("quantity") * F("price"), output_field=DecimalField())),
+            )
+        ])
+        DailyCustomerSales.objects.bulk_create([
+            DailyCustomerSales(day=row["day"], client_id=row["client"], order_count=row["order_count"], spent=row["spent"] or 0)
+            for row in orders.values("day", "client").annotate(order_count=Count("id"), spent=Sum("total_amount"))
+        ])
+    return len(days)
+
+
+def trailing_days(count=REFRESH_WINDOW_DAYS):
+    """The last `count` days, today included."""
+    today = timezone.localdate()
+    return [today - timedelta(days=n) for n in range(count)]
+
+
+# ===========================
+# Reading
+# ===========================
+def top_products(limit=TOP_LIMIT):
+    """Best sellers by units, annotated with total_sold."""
+    return (
+        Product.objects.annotate(total_sold=Sum("daily_sales__units"))
+        .filter(total_sold__gt=0)
+        .order_by("-total_sold", "id")[:limit]
+    )
+
+
+def sales_analytics():
+    """Payload for SellerAnalyticsSerializer, in four queries over the rollup tables."""
+    revenue_qs = (
+        DailySales.objects.filter(status=OrderStatus.SUCCESS)
+        .annotate(month=TruncMonth("day"))
+        .values("month")
+        .annotate(total=Sum("revenue"))
+        .order_by("month")
+    )
+    status_qs = DailySales.objects.values("status").annotate(count=Sum("order_count"))
+
+    top_customers = (
+        get_user_model().objects.annotate(spent=Sum("daily_sales__spent"))
+        .filter(spent__gt=0)
+        .order_by("-spent", "id")[:TOP_LIMIT]
+    )
+
+    return {
+        "revenue_by_month": {row["month"].strftime("%Y-%m"): float(row["total"] or 0) for row in revenue_qs},
+        "orders_by_status": {row["status"]: row["count"] for row in status_qs},
+        "top_products": top_products(),
+        "top_customers": [
+            {"username": user.get_username(), "total_spent": float(user.spent)} for user in top_customers
+        ],
+    }
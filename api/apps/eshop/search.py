@@ -0,0 +1,58 @@
+"""
+Product search for the storefront and the admin.
+
+Product.search_vector holds the product name (weight A) and description
+(weight B) as a tsvector. A trigger keeps it current on every write path,
+including queryset.update() and bulk_create (migration 0011_product_search).
+Matches come from that column (GIN index) or from trigram similarity on the
+name (pg_trgm GIN index), so typos still find the product. Results are
+ranked by text rank plus name similarity.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Coalesce
+
+
+SEARCH_CONFIG = "english"
+AUTOCOMPLETE_LIMIT = 10
+
+
+def _query(term):
+    return SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def match_products(queryset, term):
+    """Filter `queryset` to products matching `term`, without ranking (the admin sorts by column)."""
+    term = term.strip()
+    if not term:
+        return queryset
+    return queryset.filter(Q(search_vector=_query(term)) | Q(product_name__trigram_similar=term))
+
+
+def search_products(queryset, term):
+    """Filter `queryset` to products matching `term`, best matches first."""
+    term = term.strip()
+    if not term:
+        return queryset
+
+    return match_products(queryset, term).annotate(
+        rank=Coalesce(SearchRank(F("search_vector"), _query(term)), Value(0.0), output_field=FloatField())
+        + TrigramSimilarity("product_name", term),
+    ).order_by("-rank", "pk")
+
+
+def autocomplete_products(queryset, term, limit=AUTOCOMPLETE_LIMIT):
+    """(id, product_name) of products whose words start with the words typed so far."""
+    words = re.findall(r"\w+", term)
+    if not words:
+        return []
+
+    # Every word must match, the last one (still being typed) as a prefix; words are \w+ so the raw query is safe
+    prefix = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+    matches = queryset.filter(Q(search_vector=prefix) | Q(product_name__istartswith=term.strip())).annotate(
+        rank=Coalesce(SearchRank(F("search_vector"), prefix), Value(0.0), output_field=FloatField()),
+    ).order_by("-rank", "product_name", "pk")
+
+    return list(matches.values("id", "product_name")[:limit])
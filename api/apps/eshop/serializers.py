@@ -1,33 +1,76 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from rest_framework import serializers
 from django.db import models
-from django.db.models import Avg
 from decimal import Decimal
+from urllib.parse import urljoin
 
 from apps.eshop.models import (
     ProductCategory, Product, ProductImage, StockMovement,
     Wishlist, Order, OrderItem, Payment, Review
 )
+from apps.eshop.thumbnails import VARIANT_FORMATS, VARIANT_WIDTHS
 
 User = get_user_model()
 
 
+def absolute_url(context, url):
+    request = context.get('request')
+    if url and request is not None:
+        return request.build_absolute_uri(url)
+    if url and settings.BACKEND_URL:
+        # No request (cached payloads, responses built by hand): use the public API origin
+        return urljoin(settings.BACKEND_URL, url)
+    return url
+
+
+def requested_fields(request):
+    """Field names asked for with ?fields=a,b,c (empty set: all fields)."""
+    if request is None:
+        return set()
+    return {name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Keeps only the fields named in ?fields= (plus id); unknown names are ignored."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = requested_fields(self.context.get('request')) & set(self.fields)
+        if keep:
+            for name in set(self.fields) - keep - {'id'}:
+                self.fields.pop(name)
+
+
 # ==========================
 # Product Image Serializer
 # ==========================
 class ProductImageSerializer(serializers.ModelSerializer):
-    image_base64 = serializers.SerializerMethodField()
+    image_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ['id', 'file_name', 'mime_type', 'image_base64', 'created_at']
+        fields = ['id', 'file_name', 'mime_type', 'content_hash', 'image_url', 'srcset', 'created_at']
+
+    def _absolute(self, url):
+        return absolute_url(self.context, url)
+
+    def get_image_url(self, obj):
+        return self._absolute(obj.image_url)
 
-    def get_image_base64(self, obj):
-        import base64
-        if not obj.image_data:
+    def get_srcset(self, obj):
+        """One srcset string per format, e.g. {"webp": "<url> 80w, <url> 320w, ..."}."""
+        if not obj.content_hash:
             return None
-        return f"data:{obj.mime_type};base64," + base64.b64encode(obj.image_data).decode('utf-8')
+        return {
+            fmt: ", ".join(
+                f"{self._absolute(obj.variant_url(variant, fmt))} {width}w"
+                for variant, width in VARIANT_WIDTHS.items()
+            )
+            for fmt in VARIANT_FORMATS
+        }
 
 
 # ==========================
@@ -42,14 +85,85 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'product_name', 'description', 'price', 'quantity',
-            'unit', 'category', 'created_at', 'average_rating', 'in_stock',
+            'unit', 'category', 'created_at', 'updated_at', 'average_rating', 'in_stock',
             'product_images'
         ]
 
     def get_average_rating(self, obj):
-        avg = obj.reviews.aggregate(avg=Avg('rating'))['avg']
+        avg = obj.average_rating
+        return round(avg, 1) if avg else None
+
+
+# ==========================
+# Product List Serializers
+# ==========================
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact product card for list pages; the full product is on the detail endpoint."""
+    average_rating = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
+    in_stock = serializers.BooleanField(read_only=True)
+    category_name = serializers.CharField(source='category.category_name', read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+
+    # Model columns read by each field, see setup_queryset
+    COLUMNS = {
+        'id': ['id'],
+        'product_name': ['product_name'],
+        'price': ['price'],
+        'quantity': ['quantity'],
+        'unit': ['unit'],
+        'in_stock': ['quantity'],
+        'average_rating': ['rating_count', 'rating_sum'],
+        'review_count': ['rating_count'],
+        'category': ['category'],
+        'category_name': ['category', 'category__category_name'],
+        'created_at': ['created_at'],
+        'updated_at': ['updated_at'],
+    }
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'product_name', 'price', 'unit', 'in_stock',
+            'average_rating', 'review_count', 'category_name', 'thumbnail'
+        ]
+
+    @classmethod
+    def setup_queryset(cls, queryset, request):
+        """Load only the columns (and the one image hash) the requested fields render."""
+        fields = (requested_fields(request) & set(cls.Meta.fields)) or set(cls.Meta.fields)
+        fields.add('id')
+        columns = {column for name in fields for column in cls.COLUMNS.get(name, ())}
+
+        queryset = queryset.prefetch_related(None)
+        queryset = queryset.select_related('category') if 'category_name' in fields else queryset.select_related(None)
+        if 'thumbnail' in fields:
+            primary = ProductImage.objects.filter(product=models.OuterRef('pk')).order_by('created_at', 'pk')
+            queryset = queryset.annotate(primary_image_hash=models.Subquery(primary.values('content_hash')[:1]))
+        return queryset.only(*columns)
+
+    def get_average_rating(self, obj):
+        avg = obj.average_rating
         return round(avg, 1) if avg else None
 
+    def get_thumbnail(self, obj):
+        """Card-sized JPEG of the first image, or None."""
+        if not obj.primary_image_hash:
+            return None
+        url = reverse('product-images-variant', kwargs={
+            'content_hash': obj.primary_image_hash, 'variant': 'card', 'fmt': 'jpg',
+        })
+        return absolute_url(self.context, url)
+
+
+class ShopProductListSerializer(ProductListSerializer):
+
+    class Meta(ProductListSerializer.Meta):
+        fields = [
+            'id', 'product_name', 'price', 'quantity', 'unit', 'category', 'category_name',
+            'in_stock', 'average_rating', 'review_count', 'thumbnail', 'created_at', 'updated_at'
+        ]
+
 
 # ==========================
 # Product Category Serializer
@@ -82,12 +196,18 @@ class StockMovementSerializer(serializers.ModelSerializer):
 # Wishlist Serializer
 # ==========================
 class WishlistSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    # Clients post the product id; responses nest the full product
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
 
     class Meta:
         model = Wishlist
         fields = ['id', 'product', 'added_date']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['product'] = ProductSerializer(instance.product, context=self.context).data
+        return data
+
 
 # ==========================
 # Order Item Serializer
@@ -155,17 +275,19 @@ class ReviewSerializer(serializers.ModelSerializer):
 # ==========================
 # SHOP / CUSTOMER
 # ==========================
-class ShopOverviewSerializer(serializers.Serializer):
-    categories = serializers.SerializerMethodField()
-    top_products = serializers.SerializerMethodField()
+class CategorySummarySerializer(serializers.ModelSerializer):
+    product_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ProductCategory
+        fields = ['id', 'category_name', 'description', 'product_count']
 
-    def get_categories(self, obj):
-        queryset = ProductCategory.objects.all()
-        return ProductCategorySerializer(queryset, many=True).data
 
-    def get_top_products(self, obj):
-        products = Product.objects.filter(in_stock=True).order_by('-created_at')[:10]
-        return ProductSerializer(products, many=True).data
+class ShopOverviewSerializer(serializers.Serializer):
+    """Rendered once and cached by apps.eshop.overview."""
+    categories = CategorySummarySerializer(many=True)
+    top_products = ProductSerializer(many=True)
+    generated_at = serializers.DateTimeField()
 
 
 class CustomerProductDetailSerializer(serializers.ModelSerializer):
@@ -184,7 +306,7 @@ class CustomerProductDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_average_rating(self, obj):
-        avg = obj.reviews.aggregate(avg=Avg('rating'))['avg']
+        avg = obj.average_rating
         return round(avg, 1) if avg else None
 
 
@@ -197,7 +319,10 @@ class CustomerProfileSerializer(serializers.Serializer):
     recent_orders = serializers.SerializerMethodField()
 
     def get_recent_orders(self, obj):
-        orders = obj.orders.all()[:5]
+        orders = (
+            obj.orders.select_related('payment')
+            .prefetch_related('order_items__product__product_images')[:5]
+        )
         return OrderSerializer(orders, many=True).data
 
 
@@ -228,6 +353,9 @@ class SellerProductOverviewSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_sold(self, obj):
+        # Querysets feeding this serializer annotate total_sold; fall back to a query otherwise
+        if hasattr(obj, 'total_sold'):
+            return obj.total_sold or 0
         return OrderItem.objects.filter(product=obj).aggregate(
             total=models.Sum('quantity')
         )['total'] or 0
@@ -239,18 +367,13 @@ class DashboardSerializer(serializers.Serializer):
     total_revenue = serializers.DecimalField(max_digits=10, decimal_places=2)
     total_products = serializers.IntegerField()
     low_stock = serializers.IntegerField()
-    top_selling_products = serializers.SerializerMethodField()
-
-    def get_top_selling_products(self, obj):
-        qs = Product.objects.annotate(
-            total_sold=models.Sum('order_items__quantity')
-        ).order_by('-total_sold')[:5]
-        return SellerProductOverviewSerializer(qs, many=True).data
+    # Already serialized by apps.eshop.metrics, so the cached payload stays plain data
+    top_selling_products = serializers.JSONField()
 
 
 class SellerOrderSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(source='client.username')
-    items_count = serializers.IntegerField(source='order_items.count', read_only=True)
+    items_count = serializers.IntegerField(read_only=True)  # annotated by ShopOrderViewSet
 
     class Meta:
         model = Order
@@ -264,24 +387,8 @@ class SellerOrderSerializer(serializers.ModelSerializer):
 class SellerAnalyticsSerializer(serializers.Serializer):
     revenue_by_month = serializers.JSONField()
     orders_by_status = serializers.JSONField()
-    top_products = serializers.SerializerMethodField()
-    top_customers = serializers.SerializerMethodField()
-
-    def get_top_products(self, obj):
-        qs = Product.objects.annotate(
-            sold=models.Sum('order_items__quantity')
-        ).order_by('-sold')[:5]
-        return SellerProductOverviewSerializer(qs, many=True).data
-
-    def get_top_customers(self, obj):
-        qs = User.objects.annotate(
-            spending=models.Sum('orders__total_amount')
-        ).order_by('-spending')[:5]
-
-        return [
-            {"username": c.username, "total_spent": c.spending or 0}
-            for c in qs
-        ]
+    top_products = SellerProductOverviewSerializer(many=True, read_only=True)
+    top_customers = serializers.JSONField()
 
 
 class InventoryOverviewSerializer(serializers.Serializer):
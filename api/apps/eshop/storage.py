@@ -0,0 +1,71 @@
+"""
+Content-addressed storage for product images.
+
+Image bytes are written through the Django storage configured under
+``STORAGES["product_images"]`` (a local directory by default, or any
+S3-compatible bucket through django-storages) at a path derived from their
+SHA-256 hash, so identical uploads are only stored once.
+
+Because rows share files, writing a file and deleting it are serialized per
+hash (see lock_image): a delete re-checks the references under the lock, and
+an upload keeps the lock until the row pointing at the file has committed.
+"""
+import hashlib
+
+from django.core.files.storage import storages
+from django.db import connection
+
+
+STORAGE_ALIAS = "product_images"
+CHUNK_SIZE = 64 * 1024
+
+
+def get_image_storage():
+    return storages[STORAGE_ALIAS]
+
+
+def image_name(content_hash):
+    """ab/cd/abcd... — keeps directories (or key prefixes) small."""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+def hash_file(file):
+    """SHA-256 of a Django File, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def lock_image(content_hash):
+    """
+    Per-hash transaction-level advisory lock, held until the current
+    transaction ends. Must be called inside transaction.atomic.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [content_hash])
+
+
+def store_image(file):
+    """
+    Write a Django File (upload or ContentFile) into image storage.
+    Returns (storage name, content hash); existing content is not written twice.
+    Call it in the transaction that saves the referencing row, so a concurrent
+    delete of the same content waits for that row.
+    """
+    content_hash = hash_file(file)
+    name = image_name(content_hash)
+    storage = get_image_storage()
+    lock_image(content_hash)
+    if not storage.exists(name):
+        name = storage.save(name, file)
+    return name, content_hash
+
+
+def open_image(name):
+    return get_image_storage().open(name, "rb")
+
+
+def delete_image(name):
+    get_image_storage().delete(name)
@@ -0,0 +1,114 @@
+"""
+Incremental catalogue sync: ?updated_since= on shop_products and shop/products.
+
+Instead of the usual page, the list returns the products changed after the
+cursor and the ids of the products deleted since (tombstones). The feed is
+keyed on Product.updated_at alone: a database trigger stamps it with the
+writing transaction's now() on every insert and update, updating a category
+touches its products, and image changes touch their product (migration
+0014_product_updated_at_db_clock and the ProductImage signals).
+
+Pages are keyset ordered on (updated_at, id). Clients store the returned
+cursor and pass it back as ?updated_since=...&after_id=...; upserting the
+rows and deleting the tombstoned ids is idempotent, so replaying a page is
+harmless. A page never reaches past the commit watermark: the start of the
+oldest transaction still open, so a long transaction cannot commit rows
+behind a cursor already handed out. Tombstones are kept
+CATALOG_TOMBSTONE_DAYS; older cursors must resync from scratch.
+"""
+from datetime import timedelta
+from typing import List, NamedTuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from apps.eshop.models import ProductTombstone
+
+
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+
+
+class ResyncRequired(Exception):
+    """The cursor is older than the tombstones kept; the client must download the catalogue again."""
+
+
+class SyncPage(NamedTuple):
+    changed: List
+    deleted: List[int]
+    cursor: dict
+    has_more: bool
+
+
+def sync_params(params):
+    """(since, after_id, limit) from the query string."""
+    # '+' of a UTC offset arrives as a space when the client did not encode it
+    raw = params.get("updated_since", "").strip().replace(" ", "+")
+    try:
+        since = parse_datetime(raw) if raw else None
+    except ValueError:  # well formed but not a real date, e.g. February 30th
+        since = None
+    if since is None:
+        raise ValidationError({"updated_since": "An ISO 8601 date and time is required."})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+
+    try:
+        after = int(params.get("after_id") or 0)
+        limit = min(int(params.get("limit") or SYNC_PAGE_SIZE), SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError({"detail": "after_id and limit must be integers."})
+    return since, after, max(limit, 1)
+
+
+def commit_watermark(using):
+    """
+    Database time before which every stamped row is committed: the start of
+    the oldest other transaction still open, or now when there is none. Rows
+    are stamped with their transaction's start, so none below it can appear
+    later. Only sessions of the application's own role are visible in
+    pg_stat_activity, which are the ones writing the catalogue.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT LEAST(clock_timestamp(), MIN(xact_start)) FROM pg_stat_activity
+            WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid()
+            """
+        )
+        return cursor.fetchone()[0]
+
+
+def product_changes(queryset, since, after=0, limit=SYNC_PAGE_SIZE):
+    if since < timezone.now() - timedelta(days=settings.CATALOG_TOMBSTONE_DAYS):
+        raise ResyncRequired
+    until = commit_watermark(queryset.db)
+
+    rows = list(
+        # The range on updated_at is served by product_updated_id_idx, which also gives the order;
+        # after_id continues a page boundary that fell between rows of the same timestamp
+        queryset.filter(updated_at__gte=since, updated_at__lt=until)
+        .filter(Q(updated_at__gt=since) | Q(pk__gt=after))
+        .order_by("updated_at", "pk")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        cursor = {"updated_since": rows[-1].updated_at, "after_id": rows[-1].pk}
+    else:
+        cursor = {"updated_since": max(until, since), "after_id": 0}
+
+    deleted = list(
+        ProductTombstone.objects.filter(deleted_at__gte=since, deleted_at__lt=cursor["updated_since"])
+        .order_by("deleted_at").values_list("product_id", flat=True)
+    )
+    return SyncPage(rows, deleted, cursor, has_more)
+
+
+def prune_tombstones():
+    cutoff = timezone.now() - timedelta(days=settings.CATALOG_TOMBSTONE_DAYS)
+    return ProductTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -1,3 +1,1550 @@
-from django.test import TestCase
+"""
+API query budgets.
 
-# Create your tests here.
+Seeds a realistic catalogue (thousands of products, reviews and orders),
+calls every route in apps/eshop/urls.py and apps/usr/urls.py and records the
+query count, wall time and response size of each call. A route fails when it
+goes over its declared query budget, or when a paginated list issues more
+queries for a bigger page (an N+1 slipped in).
+
+The results are written to QUERY_BUDGET_REPORT (default
+query_budget_report.json next to manage.py) so runs can be diffed across
+releases. The dataset size can be scaled with API_BENCH_PRODUCTS.
+
+The stock reservation tests at the bottom check that concurrent checkouts can
+never sell more than is on the shelf.
+"""
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from typing import Callable, NamedTuple, Optional
+from unittest import mock, skipUnless
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from apps.eshop import urls as eshop_urls
+from apps.eshop.constants import MovementType, OrderStatus, UnitChoices
+from apps.eshop.models import (
+    ProductCategory, Product, ProductImage, StockMovement,
+    Wishlist, Order, OrderItem, Payment, Review, DailySales
+)
+from apps.eshop.admin import custom_admin_site
+from apps.eshop.inventory import get_inventory_kpis
+from apps.eshop.metrics import METRICS_CACHE_KEY, METRICS_LOCK_KEY, get_metrics
+from apps.eshop.overview import build_overview, overview_cache_key
+from apps.eshop.reservations import StockConflict, reserve_stock
+from apps.eshop.rollups import refresh_days, sales_analytics
+from apps.eshop.storage import delete_image, get_image_storage, image_name, open_image, store_image
+from apps.eshop.thumbnails import open_variant, variant_name
+from apps.jobs.constants import JobStatus
+from apps.jobs.models import Job
+from apps.jobs.queue import work
+from apps.usr import urls as usr_urls
+from apps.usr.constants import UserRole
+from apps.usr.otp import ACCOUNT_ACTIVATION, PASSWORD_RESET
+from apps.usr.tokens import refresh_token
+from apps.usr.models import User, UserProfile
+from apps.usr.utils import generate_jwt_token
+
+
+BENCH_PRODUCTS = int(os.getenv("API_BENCH_PRODUCTS", "2000"))
+BENCH_CATEGORIES = 25
+BENCH_CUSTOMERS = 60
+BENCH_ORDERS = max(BENCH_PRODUCTS // 4, 50)
+REPORT_PATH = os.getenv("QUERY_BUDGET_REPORT", str(settings.BASE_DIR / "query_budget_report.json"))
+PASSWORD = "Bench-pass-123"
+
+
+
+def _scheduled_commands():
+    """Management commands (with their arguments) the production entrypoint runs in a loop."""
+    script = (settings.BASE_DIR / "entrypoint.prod.sh").read_text()
+    return [line.split() for line in re.findall(r"while true; do python manage\.py ([^;]+);", script)]
+
+
+def _png_bytes(size=(1600, 1200)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Route(NamedTuple):
+    """One call against the API and the most queries it may issue."""
+    name: str
+    method: str
+    path: Callable
+    user: Optional[str]
+    budget: int
+    data: Optional[Callable] = None
+    paginated: bool = False
+
+
+def _path(name, **kwargs):
+    return lambda t: reverse(name, kwargs={k: (v(t) if callable(v) else v) for k, v in kwargs.items()})
+
+
+ROUTES = [
+    # Public
+    Route("shop-overview-list", "get", _path("shop-overview-list"), None, 3),
+    Route("product-images-detail", "get", _path("product-images-detail", content_hash=lambda t: t.image.content_hash), None, 1),
+    Route("product-images-variant", "get", _path("product-images-variant", content_hash=lambda t: t.image.content_hash, variant="card", fmt="jpg"), None, 1),
+    Route("customer-products-list", "get", _path("customer-products-list"), None, 2, paginated=True),
+    Route("customer-products-detail", "get", _path("customer-products-detail", pk=lambda t: t.product.pk), None, 3),
+    Route("customer-products-list", "get", lambda t: reverse("customer-products-list") + "?facets=1&in_stock=1", None, 3, paginated=True),
+    Route("customer-products-autocomplete", "get", lambda t: reverse("customer-products-autocomplete") + "?q=Product 1", None, 1),
+
+    # Customer
+    Route("customer-dashboard-list", "get", _path("customer-dashboard-list"), "customer", 6),
+    Route("customer-orders-list", "get", _path("customer-orders-list"), "customer", 7, paginated=True),
+    Route("customer-orders-detail", "get", _path("customer-orders-detail", pk=lambda t: t.customer_order.pk), "customer", 6),
+    Route("customer-orders-list", "post", _path("customer-orders-list"), "customer", 13, data=lambda t: {
+        "shipping_address": "KG 11 Ave",
+        "payment_method": "COD",
+        "items": [{"product": p.pk, "quantity": 1, "price": str(p.price)} for p in t.cart[:10]],
+    }),
+    Route("customer-wishlist-list", "get", _path("customer-wishlist-list"), "customer", 5, paginated=True),
+    Route("customer-wishlist-list", "post", _path("customer-wishlist-list"), "customer", 5, data=lambda t: {"product": t.product.pk}),
+    Route("customer-wishlist-detail", "delete", _path("customer-wishlist-detail", pk=lambda t: t.wishlist_item.pk), "customer", 6),
+    Route("customer-reviews-list", "get", _path("customer-reviews-list"), "customer", 4, paginated=True),
+    Route("customer-reviews-detail", "patch", _path("customer-reviews-detail", pk=lambda t: t.review.pk), "customer", 8, data=lambda t: {"rating": 3}),
+
+    # Seller
+    Route("shop-categories-list", "get", _path("shop-categories-list"), "seller", 6, paginated=True),
+    Route("shop-categories-detail", "get", _path("shop-categories-detail", pk=lambda t: t.category.pk), "seller", 5),
+    Route("shop-products-list", "get", _path("shop-products-list"), "seller", 3, paginated=True),
+    Route("shop-products-detail", "get", _path("shop-products-detail", pk=lambda t: t.product.pk), "seller", 4),
+    Route("shop-products-detail", "patch", _path("shop-products-detail", pk=lambda t: t.product.pk), "seller", 8, data=lambda t: {"quantity": 75}),
+    Route("shop-product-images-list", "get", _path("shop-product-images-list", product_pk=lambda t: t.product.pk), "seller", 4, paginated=True),
+    Route("shop-product-images-detail", "delete", _path("shop-product-images-detail", product_pk=lambda t: t.product.pk, pk=lambda t: t.image.pk), "seller", 5),
+    Route("shop-stock-movements-list", "get", _path("shop-stock-movements-list"), "seller", 3, paginated=True),
+    Route("shop-orders-list", "get", _path("shop-orders-list"), "seller", 3, paginated=True),
+    Route("shop-orders-detail", "get", _path("shop-orders-detail", pk=lambda t: t.customer_order.pk), "seller", 3),
+    Route("shop-orders-detail", "patch", _path("shop-orders-detail", pk=lambda t: t.customer_order.pk), "seller", 7, data=lambda t: {"status": OrderStatus.PROCESSING}),
+    Route("shop-payments-list", "get", _path("shop-payments-list"), "seller", 3, paginated=True),
+    Route("shop-payments-detail", "get", _path("shop-payments-detail", pk=lambda t: t.payment.pk), "seller", 3),
+    Route("shop-reviews-list", "get", _path("shop-reviews-list"), "seller", 3, paginated=True),
+    Route("shop-reviews-detail", "get", _path("shop-reviews-detail", pk=lambda t: t.review.pk), "seller", 3),
+    Route("shop-dashboard-list", "get", _path("shop-dashboard-list"), "seller", 4),
+    Route("shop-analytics-list", "get", _path("shop-analytics-list"), "seller", 5),
+    Route("shop-inventory-list", "get", _path("shop-inventory-list"), "seller", 5),
+
+    # Accounts
+    Route("sign_up", "post", _path("sign_up"), None, 7, data=lambda t: {
+        "first_name": "New", "last_name": "Customer", "email": "new.customer@bench.test",
+        "role": UserRole.CUSTOMER, "gender": "other", "password": PASSWORD, "password_confirmation": PASSWORD,
+    }),
+    Route("activate_verify_otp", "post", _path("activate_verify_otp"), None, 4, data=lambda t: {
+        "email": t.inactive.email, "otp": ACCOUNT_ACTIVATION.issue(t.inactive),
+    }),
+    Route("activate_resend_otp", "post", _path("activate_resend_otp"), None, 4, data=lambda t: {"email": t.inactive.email}),
+    Route("password_reset_verify_email", "post", _path("password_reset_verify_email"), None, 4, data=lambda t: {"email": t.customer.email}),
+    Route("password_reset_verify_otp", "post", _path("password_reset_verify_otp"), None, 3, data=lambda t: {
+        "email": t.customer.email, "otp": PASSWORD_RESET.issue(t.customer),
+    }),
+    Route("password_reset_confirm", "post", _path("password_reset_confirm"), None, 3, data=lambda t: {
+        "email": t.customer.email, "new_password1": PASSWORD, "new_password2": PASSWORD,
+        "_": PASSWORD_RESET.mark_verified(t.customer),
+    }),
+    Route("login", "post", _path("login"), None, 10, data=lambda t: {
+        "email": t.customer.email, "password": PASSWORD, "role": UserRole.CUSTOMER,
+    }),
+    Route("logout", "post", _path("logout"), "customer", 5),
+    Route("token_refresh", "post", _path("token_refresh"), None, 6, data=lambda t: {"refresh": refresh_token(t.customer)}),
+    Route("change_user_password", "put", _path("change_user_password"), "customer", 12, data=lambda t: {
+        "old_password": PASSWORD, "new_password": PASSWORD, "confirm_password": PASSWORD,
+    }),
+    Route("current_user_profile", "get", _path("current_user_profile"), "customer", 3),
+]
+
+
+def _route_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if hasattr(pattern, "url_patterns"):
+            names |= _route_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    "product_images": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": tempfile.mkdtemp(prefix="eshop-bench-")},
+    },
+})
+class APIQueryBudgetTests(TestCase):
+    maxDiff = None
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        password = make_password(PASSWORD)
+
+        cls.seller = User.objects.create_user("Shop", "Seller", "seller@bench.test", PASSWORD, role=UserRole.SELLER)
+        cls.customer = User.objects.create_user("Main", "Customer", "customer@bench.test", PASSWORD)
+        cls.inactive = User.objects.create_user("Inactive", "Customer", "inactive@bench.test", PASSWORD, is_active=False)
+        customers = User.objects.bulk_create([
+            User(first_name="Customer", last_name=str(i), email=f"customer{i}@bench.test",
+                 role=UserRole.CUSTOMER, password=password)
+            for i in range(BENCH_CUSTOMERS)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=u) for u in customers])
+        customers.append(cls.customer)
+
+        categories = ProductCategory.objects.bulk_create([
+            ProductCategory(category_name=f"Category {i}", description="Bench category")
+            for i in range(BENCH_CATEGORIES)
+        ])
+        products = Product.objects.bulk_create([
+            Product(
+                category=categories[i % BENCH_CATEGORIES],
+                product_name=f"Product {i}",
+                description="A product used to benchmark the API.",
+                price=Decimal(rng.randint(100, 50000)),
+                quantity=rng.randint(0, 200),
+                unit=UnitChoices.PIECE,
+            )
+            for i in range(BENCH_PRODUCTS)
+        ])
+
+        cls.product = products[0]
+        cls.category = cls.product.category
+        cls.cart = [p for p in products[1:] if p.quantity][:30]
+
+        image = ProductImage(product=cls.product)
+        image.set_upload(ContentFile(_png_bytes(), name="photo.png"))
+        image.mime_type = "image/png"
+        image.save()
+        cls.image = image
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, file_name="photo.png", mime_type="image/png",
+                         storage_name=image.storage_name, content_hash=image.content_hash)
+            for p in products[1:200]
+        ])
+
+        StockMovement.objects.bulk_create([
+            StockMovement(product=p, movement_type=MovementType.STOCK_IN, quantity=max(p.quantity, 1),
+                          total_price=p.price * max(p.quantity, 1), processed_by=cls.seller)
+            for p in products
+        ])
+
+        reviews = []
+        for customer in customers:
+            for product in rng.sample(products, 20):
+                reviews.append(Review(product=product, user=customer, rating=rng.randint(1, 5), comment="ok"))
+        Review.objects.bulk_create(reviews)
+        cls.review = Review.objects.create(product=cls.product, user=cls.customer, rating=5, comment="Great")
+        call_command("backfill_product_ratings", stdout=open(os.devnull, "w"))
+
+        Wishlist.objects.bulk_create([Wishlist(user=cls.customer, product=p) for p in products[20:60]])
+        cls.wishlist_item = Wishlist.objects.filter(user=cls.customer).first()
+
+        statuses = [choice[0] for choice in OrderStatus.choices]
+        orders = Order.objects.bulk_create([
+            Order(
+                client=customers[i % len(customers)],
+                order_number=f"BENCH-{i:06d}",
+                status=statuses[i % len(statuses)],
+                shipping_address="Kigali",
+                payment_method="MoMo",
+            )
+            for i in range(BENCH_ORDERS)
+        ])
+        items = []
+        for order in orders:
+            for product in rng.sample(products, 3):
+                items.append(OrderItem(order=order, product=product, quantity=rng.randint(1, 4), price=product.price))
+        OrderItem.objects.bulk_create(items)
+        totals = {}
+        for item in items:
+            totals[item.order_id] = totals.get(item.order_id, 0) + item.quantity * item.price
+        for order in orders:
+            order.total_amount = totals[order.pk]
+            order.created_date = timezone.now() - timedelta(days=rng.randint(0, 365))
+        Order.objects.bulk_update(orders, ["total_amount", "created_date"])
+        Payment.objects.bulk_create([
+            Payment(order=o, amount=o.total_amount, payment_method="MoMo", payment_id=f"PAY-{o.pk}", status=True)
+            for o in orders[::2]
+        ])
+        call_command("refresh_sales_rollups", "--all", stdout=open(os.devnull, "w"))
+
+        cls.customer_order = Order.objects.filter(client=cls.customer, status=OrderStatus.PENDING).first()
+        cls.payment = Payment.objects.first()
+
+    def call(self, route, query=""):
+        # The API is stateless: the access token cookie is all a client sends
+        self.client.cookies.pop("jwt", None)
+        if route.user:
+            self.client.cookies["jwt"] = generate_jwt_token(getattr(self, route.user))
+
+        path = route.path(self)
+        if query:
+            path += ("&" if "?" in path else "?") + query.lstrip("?")
+        kwargs = {"content_type": "application/json"}
+        if route.data:
+            kwargs["data"] = json.dumps(route.data(self))
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, route.method)(path, **kwargs)
+            content = b"".join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+
+        return response, {
+            "route": route.name,
+            "method": route.method.upper(),
+            "path": path,
+            "status": response.status_code,
+            "queries": len(queries),
+            "budget": route.budget,
+            "time_ms": round(elapsed * 1000, 2),
+            "bytes": len(content),
+        }, queries
+
+    def test_every_route_has_a_budget(self):
+        declared = {route.name for route in ROUTES}
+        routes = _route_names(eshop_urls.urlpatterns) | _route_names(usr_urls.urlpatterns)
+        self.assertEqual(routes - declared, set(), "routes without a query budget")
+
+    def test_order_placement_does_not_grow_with_cart_size(self):
+        counts = {}
+        for size in (1, 30):
+            route = Route("customer-orders-list", "post", _path("customer-orders-list"), "customer", 0, data=lambda t: {
+                "shipping_address": "KG 11 Ave",
+                "items": [{"product": p.pk, "quantity": 1, "price": str(p.price)} for p in t.cart[:size]],
+            })
+            with transaction.atomic():
+                for store in caches.all():
+                    store.clear()
+                response, entry, _ = self.call(route)
+                stock = dict(Product.objects.filter(pk__in=[p.pk for p in self.cart]).values_list("pk", "quantity"))
+                transaction.set_rollback(True)
+            self.assertEqual(response.status_code, 201, entry)
+            self.assertEqual(len(response.json()["order_items"]), size)
+            for p in self.cart:
+                self.assertEqual(stock[p.pk], p.quantity - (p in self.cart[:size]))
+            counts[size] = entry["queries"]
+        self.assertEqual(counts[1], counts[30])
+
+    def test_order_placement_rejects_insufficient_stock(self):
+        product = self.cart[0]
+        route = Route("customer-orders-list", "post", _path("customer-orders-list"), "customer", 0, data=lambda t: {
+            "items": [{"product": product.pk, "quantity": product.quantity + 1, "price": str(product.price)}],
+        })
+        response = self.call(route)[0]
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["conflicts"], [{
+            "product": product.pk, "product_name": product.product_name,
+            "requested": product.quantity + 1, "available": product.quantity,
+        }])
+        self.assertFalse(Order.objects.filter(client=self.customer, order_items__product=product).exists())
+
+    def test_query_budgets(self):
+        report = []
+        for route in ROUTES:
+            with self.subTest(route=f"{route.method.upper()} {route.name}"):
+                # Each call runs in its own savepoint so writes never leak into the next route
+                with transaction.atomic():
+                    for store in caches.all():
+                        store.clear()
+                    response, entry, queries = self.call(route)
+                    transaction.set_rollback(True)
+
+                self.assertLess(response.status_code, 400, entry)
+                report.append(entry)
+                self.assertLessEqual(
+                    entry["queries"], route.budget,
+                    "\n".join(q["sql"] for q in queries.captured_queries),
+                )
+
+                if route.paginated:
+                    small = self.call(route, "?limit=5")[1]
+                    large_response, large = self.call(route, "?limit=50")[:2]
+                    report.extend([small, large])
+                    self.assertEqual(
+                        small["queries"], large["queries"],
+                        f"{route.name}: query count grows with page size",
+                    )
+
+                    # Cursor paginated lists must not get dearer the deeper the client pages
+                    next_url = large_response.json().get("next") or ""
+                    if "cursor=" in next_url:
+                        deep = self.call(route, "?" + urlsplit(next_url).query)[1]
+                        report.append(deep)
+                        self.assertEqual(
+                            large["queries"], deep["queries"],
+                            f"{route.name}: deeper pages issue more queries",
+                        )
+                        self.assertNotIn("count", large_response.json())
+
+        with open(REPORT_PATH, "w") as fh:
+            json.dump({"products": BENCH_PRODUCTS, "orders": BENCH_ORDERS, "results": report}, fh, indent=2)
+
+
+
+
+# ===========================
+# Product image storage
+# ===========================
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    "product_images": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": tempfile.mkdtemp(prefix="eshop-images-")},
+    },
+})
+class ProductImageStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(category_name="Images")
+        cls.product = Product.objects.create(category=category, product_name="Framed Print", price=Decimal("9.00"), quantity=3)
+
+    def upload(self, data):
+        image = ProductImage(product=self.product)
+        with transaction.atomic():
+            image.set_upload(ContentFile(data, name="print.png"))
+            image.save()
+        return image
+
+    def test_identical_uploads_share_one_file(self):
+        data = _png_bytes((40, 30))
+        first, second = self.upload(data), self.upload(data)
+        self.assertEqual(first.storage_name, second.storage_name)
+        with second.open_image() as file:
+            self.assertEqual(file.read(), data)
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        first = self.upload(_png_bytes((40, 30)))
+        second = self.upload(_png_bytes((40, 30)))
+        storage = get_image_storage()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(second.storage_name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(second.storage_name))
+
+    def test_delete_rechecks_references_before_removing_the_file(self):
+        image = self.upload(_png_bytes((40, 30)))
+        with self.captureOnCommitCallbacks() as callbacks:
+            image.delete()
+        # The same content is uploaded again before the delete gets to run
+        again = self.upload(_png_bytes((40, 30)))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(get_image_storage().exists(again.storage_name))
+
+    def test_variant_is_rendered_once(self):
+        image = self.upload(_png_bytes((400, 300)))
+        url = image.variant_url("thumb", "jpg")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as img:
+            self.assertEqual(img.size, (80, 60))
+
+        with mock.patch("apps.eshop.thumbnails.render_variant") as render:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        render.assert_not_called()
+
+    def test_concurrent_render_leaves_no_copy(self):
+        image = self.upload(_png_bytes((400, 300)))
+        storage = get_image_storage()
+        name = variant_name(image.content_hash, "card", "webp")
+
+        def open_source():
+            # Another request stores the same variant while this one is rendering
+            storage.save(name, ContentFile(b"rendered elsewhere"))
+            return image.open_image()
+
+        with open_variant(image.content_hash, "card", "webp", open_source) as file:
+            self.assertEqual(file.read(), b"rendered elsewhere")
+        directory = name.rsplit("/", 1)[0]
+        self.assertEqual(
+            sorted(f for f in storage.listdir(directory)[1] if ".card." in f),
+            [name.rsplit("/", 1)[1]],
+        )
+
+    def test_decompression_bomb_is_a_404(self):
+        image = self.upload(_png_bytes((400, 300)))
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            response = self.client.get(image.variant_url("detail", "jpg"))
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_is_only_confirmed_for_stored_content(self):
+        image = self.upload(_png_bytes((40, 30)))
+        url = reverse("product-images-detail", args=[image.content_hash])
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        unknown = "0" * 64
+        response = self.client.get(reverse("product-images-detail", args=[unknown]), HTTP_IF_NONE_MATCH=f'"{unknown}"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_file_is_a_404(self):
+        image = self.upload(_png_bytes((40, 30)))
+        get_image_storage().delete(image.storage_name)
+
+        response = self.client.get(reverse("product-images-detail", args=[image.content_hash]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(image.variant_url("thumb"))
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(settings.PRODUCT_IMAGE_STORAGE == "s3", "set PRODUCT_IMAGE_STORAGE=s3 and point PRODUCT_IMAGE_S3_* at a local S3 server (e.g. MinIO)")
+class ProductImageS3StorageTests(TestCase):
+    """Round trip through the configured S3-compatible bucket."""
+
+    def test_store_open_and_delete(self):
+        data = os.urandom(1024)
+        name, content_hash = store_image(ContentFile(data, name="blob.bin"))
+        self.addCleanup(delete_image, name)
+
+        self.assertEqual(name, image_name(content_hash))
+        self.assertEqual(store_image(ContentFile(data, name="blob.bin")), (name, content_hash))
+        with open_image(name) as file:
+            self.assertEqual(file.read(), data)
+
+        delete_image(name)
+        self.assertFalse(get_image_storage().exists(name))
+        with self.assertRaises(FileNotFoundError):
+            open_image(name).read()
+
+
+# ===========================
+# Shop overview
+# ===========================
+class ShopOverviewTests(TestCase):
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.category = ProductCategory.objects.create(category_name="Overview")
+        Product.objects.create(category=self.category, product_name="First SKU", price=Decimal("5.00"), quantity=4)
+
+    def overview(self, **headers):
+        return self.client.get(reverse("shop-overview-list"), **headers)
+
+    def top_products(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [p["product_name"] for p in response.json()["top_products"]]
+
+    def add_product(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(category=self.category, product_name=name, price=Decimal("5.00"), quantity=4)
+
+    def test_cached_body_is_served_without_queries(self):
+        first = self.overview()
+        with self.assertNumQueries(0):
+            second = self.overview()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_catalogue_changes_rebuild_it(self):
+        first = self.overview()
+        self.add_product("Second SKU")
+        second = self.overview()
+        self.assertEqual(self.top_products(second), ["Second SKU", "First SKU"])
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockMovement.objects.create(
+                product=Product.objects.get(product_name="Second SKU"), movement_type=MovementType.STOCK_OUT, quantity=4,
+            )
+        self.assertEqual(self.top_products(self.overview()), ["First SKU"])
+
+    def test_rebuild_racing_a_write_cannot_pin_stale_data(self):
+        # A rebuild reads the stamps and the catalogue, then a write commits
+        # before it gets to store its (now stale) body
+        key = overview_cache_key()
+        stale = build_overview()
+        self.add_product("Second SKU")
+        caches["default"].set(key, stale)
+
+        self.assertEqual(self.top_products(self.overview()), ["Second SKU", "First SKU"])
+
+    def test_unchanged_overview_answers_304(self):
+        etag = self.overview()["ETag"]
+        with self.assertNumQueries(0):
+            response = self.overview(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+        self.add_product("Second SKU")
+        response = self.overview(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+# ===========================
+# Stock reservations
+# ===========================
+def _stock_fixture(quantity):
+    category = ProductCategory.objects.create(category_name="Reservations")
+    product = Product.objects.create(category=category, product_name="Limited SKU", price=Decimal("10.00"), quantity=quantity)
+    customer = User.objects.create(email="buyer@example.com", role=UserRole.CUSTOMER)
+    return product, customer
+
+
+def _order(customer, product, quantity, **kwargs):
+    order = Order.objects.create(client=customer, payment_method="MoMo", **kwargs)
+    OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+    return order
+
+
+class StockReservationTests(TestCase):
+
+    def setUp(self):
+        self.product, self.customer = _stock_fixture(5)
+
+    def reserve(self, quantity, **kwargs):
+        order = _order(self.customer, self.product, quantity, **kwargs)
+        reserve_stock(order, [(self.product.pk, quantity, self.product.price)])
+        return order
+
+    def test_reservation_fails_without_touching_stock(self):
+        with self.assertRaises(StockConflict) as ctx:
+            self.reserve(6)
+        self.assertEqual(ctx.exception.conflicts[0]["available"], 5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+    def test_cancel_releases_and_reopen_reserves(self):
+        order = self.reserve(4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.CANCELED
+            order.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1, "stock is released by the job worker")
+        work()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+        order.status = OrderStatus.PENDING
+        order.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+
+    def test_reopen_before_release_job_keeps_the_stock(self):
+        order = self.reserve(4)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.CANCELED
+            order.save()
+        order.status = OrderStatus.PENDING
+        order.save()  # the stock was never released, so there is no conflict
+        work()
+
+        self.product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+        self.assertFalse(order.stock_released)
+
+    def test_release_job_restocks_once(self):
+        order = self.reserve(4)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.CANCELED
+            order.save()
+        work()
+        # A worker dying before marking the job done gets it run again
+        Job.objects.filter(name="eshop.release_order_stock").update(status=JobStatus.PENDING)
+        work()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+        self.assertEqual(StockMovement.objects.filter(movement_type=MovementType.STOCK_IN, notes__contains="canceled").count(), 1)
+
+    def test_expired_reservations_are_released(self):
+        expired = self.reserve(2, reserved_until=timezone.now() - timedelta(minutes=1))
+        paid = self.reserve(2, reserved_until=timezone.now() - timedelta(minutes=1))
+        Payment.objects.create(order=paid, amount=paid.total_amount, payment_method="MoMo", status=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("release_expired_reservations", stdout=io.StringIO())
+        work()
+
+        expired.refresh_from_db()
+        paid.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(expired.status, OrderStatus.CANCELED)
+        self.assertEqual(paid.status, OrderStatus.PENDING)
+        self.assertEqual(self.product.quantity, 3)
+
+    def test_expiry_runs_on_a_schedule(self):
+        self.assertIn(["release_expired_reservations"], _scheduled_commands())
+
+    def test_stock_out_movement_cannot_go_negative(self):
+        with self.assertRaises(StockConflict):
+            StockMovement.objects.create(product=self.product, movement_type=MovementType.STOCK_OUT, quantity=6)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+
+class StockReservationStressTests(TransactionTestCase):
+    """Many buyers race for the last units of one SKU."""
+    STOCK = 25
+    THREADS = 8
+    ATTEMPTS = 10
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product, customer = _stock_fixture(self.STOCK)
+        reserved, conflicts = [], []
+
+        def buyer():
+            try:
+                for _ in range(self.ATTEMPTS):
+                    try:
+                        with transaction.atomic():
+                            order = _order(customer, product, 1)
+                            reserve_stock(order, [(product.pk, 1, product.price)])
+                        reserved.append(order.pk)
+                    except StockConflict:
+                        conflicts.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buyer) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(len(reserved), self.STOCK)
+        self.assertEqual(len(conflicts), self.THREADS * self.ATTEMPTS - self.STOCK)
+        self.assertEqual(
+            StockMovement.objects.filter(product=product, movement_type=MovementType.STOCK_OUT).count(),
+            self.STOCK,
+        )
+
+    def test_concurrent_cancels_release_once(self):
+        product, customer = _stock_fixture(self.STOCK)
+        order = _order(customer, product, 5)
+        reserve_stock(order, [(product.pk, 5, product.price)])
+
+        def seller():
+            try:
+                # Each thread starts from its own stale copy of the pending order
+                stale = Order.objects.get(pk=order.pk)
+                stale.status = OrderStatus.CANCELED
+                stale.save()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=seller) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        work()
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, self.STOCK)
+        self.assertEqual(Job.objects.filter(name="eshop.release_order_stock").count(), 1)
+
+
+# ===========================
+# Product rating aggregates
+# ===========================
+def _rating_fixture():
+    category = ProductCategory.objects.create(category_name="Ratings")
+    products = [
+        Product.objects.create(category=category, product_name=name, price=Decimal("4.00"), quantity=1)
+        for name in ("Rated Mug", "Rated Cup")
+    ]
+    users = [User.objects.create(email=f"rater{i}@example.com", role=UserRole.CUSTOMER) for i in range(2)]
+    return products, users
+
+
+class ProductRatingTests(TestCase):
+
+    def setUp(self):
+        (self.mug, self.cup), (self.alice, self.bob) = _rating_fixture()
+
+    def assertRating(self, product, count, total):
+        product.refresh_from_db()
+        self.assertEqual((product.rating_count, product.rating_sum), (count, total))
+
+    def test_reviews_are_applied_as_deltas(self):
+        review = Review.objects.create(product=self.mug, user=self.alice, rating=4)
+        Review.objects.create(product=self.mug, user=self.bob, rating=2)
+        self.assertRating(self.mug, 2, 6)
+
+        review.rating = 5
+        review.save()
+        self.assertRating(self.mug, 2, 7)
+
+        review.product = self.cup
+        review.save()
+        self.assertRating(self.mug, 1, 2)
+        self.assertRating(self.cup, 1, 5)
+
+        review.delete()
+        self.assertRating(self.cup, 0, 0)
+
+    def test_stale_instances_apply_the_stored_rating(self):
+        review = Review.objects.create(product=self.mug, user=self.alice, rating=3)
+        stale = Review.objects.get(pk=review.pk)
+        review.rating = 1
+        review.save()
+
+        stale.delete()
+        self.assertRating(self.mug, 0, 0)
+        # A second delete of the same row changes nothing
+        review.delete()
+        self.assertRating(self.mug, 0, 0)
+
+    def test_backfill_recomputes_the_aggregates(self):
+        Review.objects.bulk_create([
+            Review(product=self.mug, user=self.alice, rating=5),
+            Review(product=self.mug, user=self.bob, rating=2),
+        ])
+        Product.objects.filter(pk=self.cup.pk).update(rating_count=7, rating_sum=30)
+        call_command("backfill_product_ratings", stdout=io.StringIO())
+        self.assertRating(self.mug, 2, 7)
+        self.assertRating(self.cup, 0, 0)
+
+
+class ProductRatingStressTests(TransactionTestCase):
+    """Concurrent edits of one review must leave rating_sum equal to the stored rating."""
+    THREADS = 8
+
+    def test_concurrent_edits_keep_the_sum(self):
+        (mug, _), (alice, _) = _rating_fixture()
+        review = Review.objects.create(product=mug, user=alice, rating=1)
+
+        def editor(rating):
+            try:
+                # Each thread starts from its own copy loaded before the others write
+                stale = Review.objects.get(pk=review.pk)
+                stale.rating = rating
+                stale.save()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=editor, args=(i % 5 + 1,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        review.refresh_from_db()
+        mug.refresh_from_db()
+        self.assertEqual((mug.rating_count, mug.rating_sum), (1, review.rating))
+
+
+# ===========================
+# Sales rollups
+# ===========================
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.product, self.customer = _stock_fixture(50)
+        self.other = Product.objects.create(category=self.product.category, product_name="Other SKU", price=Decimal("3.00"))
+
+    def place(self, product, quantity, status=OrderStatus.SUCCESS, days_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = _order(self.customer, product, quantity, status=status, total_amount=product.price * quantity)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(created_date=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def analytics(self):
+        work()
+        return sales_analytics()
+
+    def test_order_events_keep_rollups_current(self):
+        order = self.place(self.product, 2)
+        self.place(self.other, 5, status=OrderStatus.PENDING)
+        payload = self.analytics()
+
+        month = timezone.localdate().strftime("%Y-%m")
+        self.assertEqual(payload["revenue_by_month"], {month: 20.0})
+        self.assertEqual(payload["orders_by_status"], {OrderStatus.SUCCESS: 1, OrderStatus.PENDING: 1})
+        self.assertEqual([(p.pk, p.total_sold) for p in payload["top_products"]], [(self.other.pk, 5), (self.product.pk, 2)])
+        self.assertEqual(payload["top_customers"], [{"username": "buyer@example.com", "total_spent": 35.0}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.CANCELED
+            order.save()
+        self.assertNotIn(OrderStatus.SUCCESS, self.analytics()["orders_by_status"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(self.analytics()["orders_by_status"], {OrderStatus.PENDING: 1})
+
+    def test_command_catches_up_on_bypassed_writes(self):
+        old = self.place(self.product, 1, days_ago=40)
+        call_command("refresh_sales_rollups", "--days", "45", stdout=io.StringIO())
+        Order.objects.filter(pk=old.pk).update(status=OrderStatus.CANCELED)
+        self.assertEqual(sales_analytics()["orders_by_status"], {OrderStatus.SUCCESS: 1})
+
+        call_command("refresh_sales_rollups", "--days", "45", stdout=io.StringIO())
+        self.assertEqual(sales_analytics()["orders_by_status"], {OrderStatus.CANCELED: 1})
+        self.assertEqual(DailySales.objects.get().day, timezone.localdate(timezone.now() - timedelta(days=40)))
+
+    def test_scheduled_run_catches_up_on_bypassed_writes(self):
+        command = next(args for args in _scheduled_commands() if args[0] == "refresh_sales_rollups")
+        order = self.place(self.product, 1, days_ago=1)
+        call_command(*command, stdout=io.StringIO())
+        Order.objects.filter(pk=order.pk).update(status=OrderStatus.CANCELED)
+        self.assertEqual(sales_analytics()["orders_by_status"], {OrderStatus.SUCCESS: 1})
+
+        call_command(*command, stdout=io.StringIO())
+        self.assertEqual(sales_analytics()["orders_by_status"], {OrderStatus.CANCELED: 1})
+        self.assertEqual(DailySales.objects.get().day, timezone.localdate(timezone.now() - timedelta(days=1)))
+
+    def test_analytics_reads_a_constant_number_of_queries(self):
+        for days_ago in range(0, 90, 3):
+            self.place(self.product, 1, days_ago=days_ago)
+        call_command("refresh_sales_rollups", "--all", stdout=io.StringIO())
+        with self.assertNumQueries(4):
+            payload = sales_analytics()
+            list(payload["top_products"])
+        self.assertEqual(sum(payload["orders_by_status"].values()), 30)
+
+
+class SalesRollupStressTests(TransactionTestCase):
+    """Workers rebuilding the same day must queue behind each other, not collide on its unique rows."""
+    THREADS = 6
+
+    def test_concurrent_refreshes_of_one_day(self):
+        product, customer = _stock_fixture(50)
+        for status in (OrderStatus.SUCCESS, OrderStatus.PENDING):
+            _order(customer, product, 1, status=status, total_amount=product.price)
+        errors = []
+
+        def worker():
+            try:
+                refresh_days([timezone.localdate()])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(DailySales.objects.count(), 2)
+        self.assertEqual(sales_analytics()["orders_by_status"], {OrderStatus.SUCCESS: 1, OrderStatus.PENDING: 1})
+
+
+
+# ===========================
+# Dashboard metrics
+# ===========================
+class ShopMetricsTests(TestCase):
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.product, self.customer = _stock_fixture(3)
+        _order(self.customer, self.product, 1, status=OrderStatus.SUCCESS, total_amount=Decimal("10.00"))
+        _order(self.customer, self.product, 1)
+
+    def test_metrics_take_one_query_per_table(self):
+        with self.assertNumQueries(3):
+            metrics = get_metrics()
+        self.assertEqual(
+            {key: metrics[key] for key in ("total_orders", "pending_orders", "total_revenue", "total_products", "low_stock")},
+            {"total_orders": 2, "pending_orders": 1, "total_revenue": Decimal("10.00"), "total_products": 1, "low_stock": 1},
+        )
+        with self.assertNumQueries(0):
+            get_metrics()
+
+    @override_settings(SHOP_METRICS_TIMEOUT=0)
+    def test_stale_metrics_are_served_while_another_request_recomputes(self):
+        stale = get_metrics()
+        caches["default"].add(METRICS_LOCK_KEY, 1)
+        _order(self.customer, self.product, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_metrics(), stale)
+
+        caches["default"].delete(METRICS_LOCK_KEY)
+        self.assertEqual(get_metrics()["total_orders"], 3)
+        self.assertIsNotNone(caches["default"].get(METRICS_CACHE_KEY))
+
+
+# ===========================
+# Admin inventory KPIs
+# ===========================
+class AdminInventoryKPITests(TestCase):
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.product, self.customer = _stock_fixture(12)
+        self.request = RequestFactory().get("/admin/")
+        self.request.user = self.customer
+
+    def test_each_context_reads_the_cached_kpis(self):
+        self.assertNotIn("low_stock_warning", custom_admin_site.each_context(self.request))
+        with self.assertNumQueries(0):
+            custom_admin_site.each_context(self.request)
+
+    def test_stock_changes_refresh_the_kpis(self):
+        self.assertEqual(get_inventory_kpis()["low_stock"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            StockMovement.objects.create(product=self.product, movement_type=MovementType.STOCK_OUT, quantity=5)
+        self.assertIn("1 products", custom_admin_site.each_context(self.request)["low_stock_warning"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = _order(self.customer, self.product, 7)
+            reserve_stock(order, [(self.product.pk, 7, self.product.price)])
+        kpis = get_inventory_kpis()
+        self.assertEqual((kpis["low_stock"], kpis["out_of_stock"]), (0, 1))
+
+
+# ===========================
+# Admin inventory report
+# ===========================
+class InventoryReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(category_name="Report")
+        Product.objects.bulk_create([
+            Product(category=category, product_name=f"SKU {i:03d}", price=Decimal(i + 1), quantity=i % 15)
+            for i in range(120)
+        ])
+        cls.admin = User.objects.create_superuser("Admin", "User", "admin@example.com", PASSWORD)
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.client.force_login(self.admin)
+
+    def test_report_pages_in_a_constant_number_of_queries(self):
+        url = reverse("admin:inventory_report")
+        self.client.get(url)  # warm the KPI cache
+
+        counts = []
+        for page in (1, 3):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {"sort": "quantity", "page": page})
+            counts.append(len(ctx))
+            self.assertEqual(len(response.context["products"]), 50 if page == 1 else 20)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(response.context["products"][19].quantity, 14)
+
+    def test_exports_stream_every_row(self):
+        response = self.client.get(reverse("admin:inventory_report_export", args=["csv"]), {"sort": "-price"})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 121)
+        name, category, price, quantity, value, status = lines[1].split(",")
+        self.assertEqual((name, quantity, Decimal(value), status), ("SKU 119", "14", Decimal("1680"), "In stock"))
+
+        response = self.client.get(reverse("admin:inventory_report_export", args=["xlsx"]))
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as workbook:
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 121)
+
+        self.assertEqual(self.client.get(reverse("admin:inventory_report_export", args=["pdf"])).status_code, 404)
+
+
+# ===========================
+# Admin changelists
+# ===========================
+class AdminChangelistQueryTests(TestCase):
+    """Every changelist renders in the same number of queries whatever the page size."""
+    ROWS = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("Admin", "User", "admin@example.com", PASSWORD)
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(first_name="Customer", last_name=str(i), email=f"changelist{i}@example.com",
+                 role=UserRole.CUSTOMER, password=password)
+            for i in range(cls.ROWS)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=u) for u in users])
+        categories = ProductCategory.objects.bulk_create([
+            ProductCategory(category_name=f"Changelist {i}") for i in range(cls.ROWS)
+        ])
+        products = Product.objects.bulk_create([
+            Product(category=categories[i], product_name=f"Changelist SKU {i}", price=Decimal(i + 1), quantity=i)
+            for i in range(cls.ROWS)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, file_name="photo.png", mime_type="image/png", content_hash=f"{p.pk:064x}")
+            for p in products
+        ])
+        StockMovement.objects.bulk_create([
+            StockMovement(product=p, movement_type=MovementType.STOCK_IN, quantity=1, processed_by=cls.admin)
+            for p in products
+        ])
+        Wishlist.objects.bulk_create([Wishlist(user=u, product=p) for u, p in zip(users, products)])
+        orders = Order.objects.bulk_create([
+            Order(client=u, order_number=f"CL-{i}", payment_method="MoMo") for i, u in enumerate(users)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=o, product=p, quantity=1, price=p.price) for o, p in zip(orders, products)
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=o, amount=1, payment_method="MoMo", status=True) for o in orders[::2]
+        ])
+        Review.objects.bulk_create([
+            Review(product=p, user=u, rating=4, comment="fine") for u, p in zip(users, products)
+        ])
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model_admin, per_page):
+        url = reverse(f"admin:{model_admin.opts.app_label}_{model_admin.opts.model_name}_changelist")
+        with mock.patch.object(model_admin, "list_per_page", per_page):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_changelists_do_not_query_per_row(self):
+        self.client.get(reverse("admin:index"))  # warm the KPI cache
+        for model, model_admin in custom_admin_site._registry.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    self.changelist_queries(model_admin, 2),
+                    self.changelist_queries(model_admin, self.ROWS),
+                )
+
+
+# ===========================
+# Bulk admin actions
+# ===========================
+class BulkAdminActionTests(TestCase):
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.admin = User.objects.create_superuser("Admin", "User", "admin@example.com", PASSWORD)
+        self.client.force_login(self.admin)
+        self.category = ProductCategory.objects.create(category_name="Bulk")
+        self.customer = User.objects.create(email="bulk@example.com", role=UserRole.CUSTOMER)
+
+    def products(self, count, quantity=10):
+        return Product.objects.bulk_create([
+            Product(category=self.category, product_name=f"Bulk {count}-{i}", price=Decimal("2.00"), quantity=quantity)
+            for i in range(count)
+        ])
+
+    def orders(self, products, status=OrderStatus.PENDING):
+        orders = Order.objects.bulk_create([
+            Order(
+                client=self.customer, order_number=f"BULK-{p.pk}", payment_method="MoMo",
+                status=status, stock_released=status == OrderStatus.CANCELED,
+            )
+            for p in products
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=o, product=p, quantity=3, price=p.price) for o, p in zip(orders, products)
+        ])
+        return orders
+
+    def act(self, model, action, objects):
+        url = reverse(f"admin:eshop_{model._meta.model_name}_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {"action": action, "_selected_action": [o.pk for o in objects]})
+        self.assertEqual(response.status_code, 302)
+        return len(ctx)
+
+    def test_cancel_restocks_in_constant_queries(self):
+        few, many = self.products(2), self.products(40)
+        counts = [self.act(Order, "cancel_orders", self.orders(group)) for group in (few, many)]
+        self.assertEqual(counts[0], counts[1])
+
+        self.assertFalse(Product.objects.filter(category=self.category).exclude(quantity=13).exists())
+        self.assertEqual(StockMovement.objects.filter(movement_type=MovementType.STOCK_IN, quantity=3).count(), 42)
+        self.assertEqual(Order.objects.filter(status=OrderStatus.CANCELED).count(), 42)
+        self.assertEqual(Job.objects.filter(name="eshop.refresh_sales_rollups").count(), 2)
+
+    def test_reopening_takes_stock_or_changes_nothing(self):
+        products = self.products(3, quantity=2)
+        orders = self.orders(products, status=OrderStatus.CANCELED)
+        self.act(Order, "mark_as_processing", orders)
+        self.assertFalse(Order.objects.exclude(status=OrderStatus.CANCELED).exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+        Product.objects.update(quantity=5)
+        self.act(Order, "mark_as_processing", orders)
+        self.assertFalse(Order.objects.exclude(status=OrderStatus.PROCESSING).exists())
+        self.assertEqual(set(Product.objects.values_list("quantity", flat=True)), {2})
+
+    def test_mark_out_of_stock_writes_the_ledger(self):
+        few, many = self.products(2), self.products(40, quantity=7)
+        counts = [self.act(Product, "mark_out_of_stock", group) for group in (few, many)]
+        self.assertEqual(counts[0], counts[1])
+
+        self.assertFalse(Product.objects.exclude(quantity=0).exists())
+        movements = StockMovement.objects.filter(movement_type=MovementType.STOCK_OUT, processed_by=self.admin)
+        self.assertEqual(sorted(set(movements.values_list("quantity", flat=True))), [7, 10])
+        self.assertEqual(movements.count(), 42)
+
+
+# ===========================
+# Product search
+# ===========================
+class ProductSearchTests(TestCase):
+    """Full-text (search_vector) and trigram matching, as ranked by PostgreSQL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("Admin", "User", "admin@example.com", PASSWORD)
+        category = ProductCategory.objects.create(category_name="Search")
+        Product.objects.bulk_create([
+            Product(category=category, product_name="Arabica Coffee", description="Roasted in Huye", quantity=5),
+            Product(category=category, product_name="Coffee Mug", description="Ceramic", quantity=0),
+            Product(category=category, product_name="Black Tea", description="Pairs well with coffee", quantity=5),
+            Product(category=category, product_name="Honey", description="Raw", quantity=5),
+        ])
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [p["product_name"] for p in response.json()["results"]]
+
+    def suggest(self, q):
+        return [p["product_name"] for p in self.client.get(reverse("customer-products-autocomplete"), {"q": q}).json()]
+
+    def test_search_ranks_name_matches_first(self):
+        url = reverse("customer-products-list")
+        # Name hits (weight A) outrank the description hit (weight B); the
+        # closer trigram match on the name breaks the tie between the two
+        self.assertEqual(self.names(self.client.get(url, {"search": "coffee"})), ["Coffee Mug", "Arabica Coffee", "Black Tea"])
+        self.assertEqual(self.names(self.client.get(url, {"search": "coffee", "in_stock": "1"})), ["Arabica Coffee", "Black Tea"])
+
+    def test_search_tolerates_typos_in_the_name(self):
+        url = reverse("customer-products-list")
+        self.assertEqual(self.names(self.client.get(url, {"search": "cofee"})), ["Coffee Mug", "Arabica Coffee"])
+
+    def test_search_vector_follows_queryset_updates(self):
+        Product.objects.filter(product_name="Honey").update(description="Coffee blossom honey")
+        names = self.names(self.client.get(reverse("customer-products-list"), {"search": "blossom"}))
+        self.assertEqual(names, ["Honey"])
+
+    def test_autocomplete_matches_prefixes(self):
+        # 'cof:*' matches the stemmed 'coffe' lexeme in names and descriptions alike
+        self.assertEqual(self.suggest("cof"), ["Arabica Coffee", "Coffee Mug", "Black Tea"])
+        # Earlier words must match whole, the last one as a prefix
+        self.assertEqual(self.suggest("coffee mu"), ["Coffee Mug"])
+        self.assertEqual(self.suggest("  "), [])
+
+    def test_admin_search_uses_the_product_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin:eshop_product_changelist"), {"q": "honey"})
+        self.assertEqual([p.product_name for p in response.context["cl"].result_list], ["Honey"])
+
+
+# ===========================
+# Storefront facets
+# ===========================
+class ProductFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.food, cls.drinks = ProductCategory.objects.bulk_create([
+            ProductCategory(category_name="Food"), ProductCategory(category_name="Drinks"),
+        ])
+        Product.objects.bulk_create([
+            Product(category=cls.food, product_name="Rice", price=Decimal("1000"), quantity=5, rating_count=2, rating_sum=9),
+            Product(category=cls.food, product_name="Beans", price=Decimal("25000"), quantity=0, rating_count=1, rating_sum=3),
+            Product(category=cls.drinks, product_name="Juice", price=Decimal("6000"), quantity=4),
+            Product(category=cls.drinks, product_name="Wine", price=Decimal("60000"), quantity=1, rating_count=1, rating_sum=5),
+        ])
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+
+    def facets(self, **params):
+        url = reverse("customer-products-list")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"facets": "1", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["facets"], len(ctx)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets, _ = self.facets(category=self.food.pk, in_stock="1")
+        self.assertEqual(
+            [(c["category_name"], c["count"]) for c in facets["categories"]],
+            [("Drinks", 2), ("Food", 1)],
+        )
+        self.assertEqual([p["count"] for p in facets["price"]], [1, 0, 0, 0])
+        self.assertEqual(facets["stock"], {"in_stock": 1, "out_of_stock": 1})
+        self.assertEqual([r["count"] for r in facets["rating"]], [1, 1, 1, 1])
+
+    def test_facets_take_one_query_and_are_cached_per_filter_set(self):
+        _, first = self.facets(min_price="5000")
+        facets, second = self.facets(min_price="5000.00")
+        self.assertEqual(first - second, 1)
+        self.assertEqual(facets["stock"], {"in_stock": 2, "out_of_stock": 1})
+
+    def test_catalogue_writes_refresh_the_counts(self):
+        facets, _ = self.facets()
+        self.assertEqual(facets["stock"], {"in_stock": 3, "out_of_stock": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            beans = Product.objects.get(product_name="Beans")
+            beans.quantity = 7
+            beans.save()
+        facets, _ = self.facets()
+        self.assertEqual(facets["stock"], {"in_stock": 4, "out_of_stock": 0})
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse("customer-products-list"), {"min_price": "cheap"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ===========================
+# Product list payloads
+# ===========================
+class ProductListPayloadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(category_name="Cards")
+        cls.product = Product.objects.create(
+            category=category, product_name="Card SKU", description="Long text " * 50,
+            price=Decimal("12.50"), quantity=3, rating_count=2, rating_sum=7,
+        )
+        ProductImage.objects.create(product=cls.product, file_name="a.png", mime_type="image/png", content_hash="a" * 64)
+        ProductImage.objects.create(product=cls.product, file_name="b.png", mime_type="image/png", content_hash="b" * 64)
+
+    def test_list_rows_are_compact_cards(self):
+        row = self.client.get(reverse("customer-products-list")).json()["results"][0]
+        self.assertEqual(set(row), {
+            "id", "product_name", "price", "unit", "in_stock",
+            "average_rating", "review_count", "category_name", "thumbnail",
+        })
+        self.assertEqual(row["average_rating"], 3.5)
+        self.assertTrue(row["thumbnail"].endswith(f"/{'a' * 64}/card.jpg/"))
+        self.assertIn("reviews", self.client.get(reverse("customer-products-detail", args=[self.product.pk])).json())
+
+    def test_sparse_fieldsets_trim_payload_and_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("customer-products-list"), {"fields": "price,in_stock,bogus"})
+        self.assertEqual(response.json()["results"], [{"id": self.product.pk, "price": "12.50", "in_stock": True}])
+        select = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("description", select)
+        self.assertNotIn("product_name", select)
+        self.assertNotIn("eshop_productimage", select)
+
+
+# ===========================
+# Wishlist
+# ===========================
+class WishlistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("Wish", "Customer", "wish@example.com", PASSWORD)
+        category = ProductCategory.objects.create(category_name="Wishes")
+        cls.product = Product.objects.create(category=category, product_name="Wished SKU", price=Decimal("3.00"), quantity=2)
+
+    def setUp(self):
+        self.client.cookies["jwt"] = generate_jwt_token(self.customer)
+
+    def test_add_returns_the_nested_product(self):
+        response = self.client.post(reverse("customer-wishlist-list"), {"product": self.product.pk}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["product"]["product_name"], "Wished SKU")
+
+    def test_bad_product_ids_are_rejected(self):
+        for product in ("abc", 10**9, None):
+            response = self.client.post(reverse("customer-wishlist-list"), {"product": product}, content_type="application/json")
+            self.assertEqual(response.status_code, 400, product)
+            self.assertIn("product", response.json())
+
+
+# ===========================
+# Conditional GET on the catalogue
+# ===========================
+class CatalogConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("Shop", "Seller", "seller@example.com", PASSWORD, role=UserRole.SELLER)
+        category = ProductCategory.objects.create(category_name="Conditional")
+        cls.product = Product.objects.create(category=category, product_name="Conditional SKU", price=Decimal("5.00"), quantity=4)
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+
+    def test_unchanged_catalogue_answers_304_without_queries(self):
+        url = reverse("customer-products-detail", args=[self.product.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("stale-while-revalidate=", response["Cache-Control"])
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.assertNotEqual(self.client.get(reverse("customer-products-list"))["ETag"], etag)
+
+        url = reverse("customer-products-list") + "?facets=1"
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalogue_writes_change_the_validators(self):
+        url = reverse("customer-products-list")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).first().save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_seller_responses_stay_private(self):
+        self.client.cookies["jwt"] = generate_jwt_token(self.seller)
+        response = self.client.get(reverse("shop-categories-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+        self.client.cookies.pop("jwt")
+        response = self.client.get(reverse("shop-categories-list"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_overview_is_publicly_cacheable(self):
+        response = self.client.get(reverse("shop-overview-list"))
+        self.assertIn("public", response["Cache-Control"])
+
+
+# ===========================
+# Incremental sync
+# ===========================
+class ProductSyncTests(TransactionTestCase):
+    """Autocommit, so every write gets its own database timestamp as in production."""
+
+    def setUp(self):
+        for store in caches.all():
+            store.clear()
+        self.seller = User.objects.create_user("Shop", "Seller", "seller@example.com", PASSWORD, role=UserRole.SELLER)
+        self.category = ProductCategory.objects.create(category_name="Sync")
+        self.start = self.db_now()
+        # One statement, so all three rows share a timestamp
+        self.products = Product.objects.bulk_create([
+            Product(category=self.category, product_name=f"Sync {i}", price=Decimal("3.00"), quantity=5)
+            for i in range(3)
+        ])
+
+    def db_now(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT now()")
+            return cursor.fetchone()[0]
+
+    def stamps(self):
+        return dict(Product.objects.values_list("pk", "updated_at"))
+
+    def feed(self, since, **params):
+        since = since if isinstance(since, str) else since.isoformat()
+        response = self.client.get(reverse("customer-products-list"), {"updated_since": since, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_every_write_path_stamps_updated_at(self):
+        first, second, third = self.products
+        before = self.stamps()
+        Product.objects.filter(pk=first.pk).update(price=Decimal("4.00"))
+        StockMovement.objects.create(product=second, movement_type=MovementType.STOCK_IN, quantity=2)
+        ProductImage.objects.create(product=third, file_name="a.png", content_hash="c" * 64)
+        after = self.stamps()
+        self.assertTrue(all(after[pk] > before[pk] for pk in before), (before, after))
+
+    def test_feed_pages_changes_and_reports_deletions(self):
+        first = self.feed(self.start, limit=2)
+        self.assertEqual([p["id"] for p in first["changed"]], [p.pk for p in self.products[:2]])
+        self.assertIsNotNone(first["next"])
+        second = self.feed(first["cursor"]["updated_since"], after_id=first["cursor"]["after_id"], limit=2)
+        self.assertEqual([p["id"] for p in second["changed"]], [self.products[2].pk])
+        self.assertIsNone(second["next"])
+
+        deleted = self.products[0].pk
+        self.products[0].delete()
+        feed = self.feed(second["cursor"]["updated_since"])
+        self.assertEqual(feed["deleted"], [deleted])
+        self.assertEqual(feed["changed"], [])
+
+    def test_category_changes_touch_their_products(self):
+        cursor = self.feed(self.start)["cursor"]["updated_since"]
+        ProductCategory.objects.filter(pk=self.category.pk).update(description="Renamed")
+        self.assertEqual(len(self.feed(cursor)["changed"]), 3)
+
+    def test_open_transactions_hold_the_cursor_back(self):
+        started, release = threading.Event(), threading.Event()
+
+        def writer():
+            try:
+                with transaction.atomic():
+                    Product.objects.filter(pk=self.products[0].pk).update(quantity=9)
+                    started.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            cursor = self.feed(self.start)["cursor"]["updated_since"]
+        finally:
+            release.set()
+            thread.join()
+
+        # The write committed after the cursor was handed out, stamped with an earlier time
+        changed = self.feed(cursor)["changed"]
+        self.assertEqual([p["id"] for p in changed], [self.products[0].pk])
+
+    def test_bad_cursors_are_rejected(self):
+        url = reverse("customer-products-list")
+        since = timezone.now() - timedelta(days=settings.CATALOG_TOMBSTONE_DAYS + 1)
+        self.assertEqual(self.client.get(url, {"updated_since": since.isoformat()}).status_code, 410)
+        self.assertEqual(self.client.get(url, {"updated_since": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"updated_since": "2024-02-30T00:00:00"}).status_code, 400)
+
+    def test_seller_feed_uses_the_seller_rows(self):
+        cursor = self.feed(self.start)["cursor"]["updated_since"]
+        Product.objects.filter(pk=self.products[0].pk).update(quantity=7)
+        self.client.cookies["jwt"] = generate_jwt_token(self.seller)
+        response = self.client.get(reverse("shop-products-list"), {"updated_since": cursor})
+        self.assertEqual([(p["id"], p["quantity"]) for p in response.json()["changed"]], [(self.products[0].pk, 7)])
@@ -0,0 +1,91 @@
+"""
+Responsive variants of product images.
+
+Each original can be served at a fixed set of widths as WebP, AVIF (when
+Pillow is built with it) and a JPEG fallback. A variant is rendered the first
+time it is requested and kept in the image storage next to the original, so
+it is only ever generated once per content hash.
+"""
+import io
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from apps.eshop.storage import get_image_storage, image_name
+
+
+VARIANT_WIDTHS = {
+    "thumb": 80,     # admin lists
+    "card": 320,     # product cards / list pages
+    "detail": 1024,  # product detail page
+}
+
+# extension -> (Pillow format, mime type, save options); the order is the order of preference
+VARIANT_FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 55}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 6}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+if not features.check("avif"):
+    VARIANT_FORMATS.pop("avif")
+
+
+def variant_name(content_hash, variant, fmt):
+    return f"{image_name(content_hash)}.{variant}.{fmt}"
+
+
+def variant_names(content_hash):
+    return [
+        variant_name(content_hash, variant, fmt)
+        for variant in VARIANT_WIDTHS
+        for fmt in VARIANT_FORMATS
+    ]
+
+
+def render_variant(source, width, fmt):
+    """Downscale (never upscale) a source image file to `width` and encode it as `fmt`."""
+    pil_format, _, save_options = VARIANT_FORMATS[fmt]
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        if pil_format == "JPEG" and img.mode == "RGBA":
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+
+        buffer = io.BytesIO()
+        img.save(buffer, format=pil_format, **save_options)
+    return buffer.getvalue()
+
+
+def open_variant(content_hash, variant, fmt, open_source):
+    """
+    Open a stored variant, rendering it first if needed.
+    `open_source` is only called on a miss and returns the original file (or None).
+    Returns None when there is no original or it is not a readable image
+    (including one over Pillow's decompression bomb limit).
+    """
+    storage = get_image_storage()
+    name = variant_name(content_hash, variant, fmt)
+
+    if not storage.exists(name):
+        source = open_source()
+        if source is None:
+            return None
+        try:
+            with source:
+                data = render_variant(source, VARIANT_WIDTHS[variant], fmt)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            return None
+        saved = storage.save(name, ContentFile(data))
+        if saved != name:
+            # Another request rendered it first and the storage picked a free name for ours: drop the copy
+            storage.delete(saved)
+
+    return storage.open(name, "rb")
@@ -23,6 +23,7 @@ from .views import (
 
     # Public
     ShopOverviewViewSet,
+    ProductImageContentViewSet,
 )
 
 # --------------------------------------------------------------------
@@ -34,6 +35,7 @@ router = routers.SimpleRouter()
 # PUBLIC ROUTES
 # -----------------------
 router.register(r'shop_overview', ShopOverviewViewSet, basename="shop-overview")
+router.register(r'product_images', ProductImageContentViewSet, basename="product-images")
 
 # -----------------------
 # CUSTOMER ROUTES
@@ -0,0 +1,49 @@
+"""
+Version stamps of the catalogue tables, for HTTP validators.
+
+Each table has a stamp in the cache ({"token", "modified"}) that is replaced
+after every committed write to it: the model signals cover saves and deletes,
+and the stock engine covers its queryset updates. The catalogue endpoints
+derive their ETag and Last-Modified from the stamps of the tables they render,
+so a conditional GET is answered from one get_many of the stamps without
+touching the catalogue. With redis or locmem that is no database query at all;
+with CACHE_BACKEND=db it is one SELECT on the cache_entries table.
+
+A stamp that is evicted is simply recreated: clients then get one full
+response instead of a 304, never a stale one.
+"""
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+VERSION_CACHE_KEY = "eshop:catalog_version:{}"
+CATALOG_TABLES = ("category", "product", "image", "review")
+
+
+def _new_stamp():
+    return {"token": uuid.uuid4().hex, "modified": int(time.time())}
+
+
+def get_versions(tables):
+    keys = [VERSION_CACHE_KEY.format(table) for table in tables]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # add() so concurrent first readers agree on a single stamp
+            cache.add(key, _new_stamp(), None)
+            stamps[key] = cache.get(key) or _new_stamp()
+    return [stamps[key] for key in keys]
+
+
+def bump_versions(*tables):
+    cache.set_many({VERSION_CACHE_KEY.format(table): _new_stamp() for table in tables}, None)
+
+
+def catalog_validators(tables, *variant):
+    """(etag, last_modified) for a response built from `tables`; `variant` is whatever else it depends on."""
+    stamps = get_versions(tables)
+    digest = hashlib.sha1("|".join([*(s["token"] for s in stamps), *variant]).encode()).hexdigest()
+    return f'W/"{digest}"', max(s["modified"] for s in stamps)
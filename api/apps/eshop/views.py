@@ -1,39 +1,137 @@
 # apps/eshop/views.py
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
 from django.db import models as dj_models
 from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
 from rest_framework import mixins, viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 
 from apps.eshop.models import (
     ProductCategory, Product, ProductImage, StockMovement,
     Wishlist, Order, OrderItem, Payment, Review
 )
-from apps.eshop.constants import MovementType, OrderStatus
+from apps.eshop.constants import OrderStatus
+from apps.eshop.facets import filter_products, get_facets, product_filters
+from apps.eshop.metrics import get_metrics
+from apps.eshop.overview import get_overview
+from apps.eshop.pagination import CreatedDateCursorPagination
 from apps.eshop.permissions import IsAdminOrSeller, IsCustomer, IsSeller, IsOwnerOrReadOnly
+from apps.eshop.reservations import StockConflict, reservation_expiry, reserve_stock
+from apps.eshop.rollups import sales_analytics
+from apps.eshop.search import autocomplete_products, search_products
+from apps.eshop.sync import ResyncRequired, product_changes, sync_params
+from apps.eshop.thumbnails import VARIANT_FORMATS, VARIANT_WIDTHS, open_variant
+from apps.eshop.versions import CATALOG_TABLES, catalog_validators
 
 from apps.eshop.serializers import (
     ProductCategorySerializer, ProductSerializer, ProductImageSerializer,
     StockMovementSerializer, WishlistSerializer, OrderSerializer,
     OrderItemSerializer, PaymentSerializer, ReviewSerializer,
-    ShopOverviewSerializer, CustomerProductDetailSerializer,
+    ProductListSerializer, ShopProductListSerializer, CustomerProductDetailSerializer,
     CustomerProfileSerializer, CustomerOrderDetailSerializer,
-    SellerProductOverviewSerializer, DashboardSerializer,
+    DashboardSerializer,
     SellerOrderSerializer, SellerAnalyticsSerializer, InventoryOverviewSerializer
 )
 
 User = get_user_model()
 
+# Image URLs embed the content hash, so the bytes behind them never change
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def patch_catalog_cache_control(response, public):
+    if public:
+        # Anonymous payloads are the same for everyone: shared caches may keep them
+        patch_cache_control(
+            response, public=True, max_age=settings.CATALOG_CACHE_MAX_AGE,
+            stale_while_revalidate=settings.CATALOG_STALE_WHILE_REVALIDATE,
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+class CatalogConditionalMixin:
+    """
+    Conditional GET for catalogue reads. ETag and Last-Modified come from the
+    version stamps of `catalog_tables` (apps.eshop.versions), so a matching
+    request gets its 304 before any query or serialization. `public_cache`
+    views are anonymous and may be stored by shared caches.
+    """
+    catalog_tables = CATALOG_TABLES
+    public_cache = False
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, render, *args, **kwargs):
+        # The path carries the resource and its filters; Accept picks JSON or the browsable API
+        etag, last_modified = catalog_validators(
+            self.catalog_tables, request.get_full_path(), request.headers.get('Accept', ''),
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_catalog_cache_control(response, self.public_cache)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class ProductSyncMixin:
+    """
+    ?updated_since= turns the product list into the incremental sync feed
+    (apps.eshop.sync): changed rows, tombstoned ids and the next cursor. The
+    feed covers the whole catalogue; only ?fields= applies to it.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if 'updated_since' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        since, after, limit = sync_params(request.query_params)
+        queryset = self.list_serializer_class.setup_queryset(Product.objects.all(), request)
+        try:
+            page = product_changes(queryset, since, after, limit)
+        except ResyncRequired:
+            return Response(
+                {"detail": "updated_since is older than the deletions kept; download the catalogue again."},
+                status=status.HTTP_410_GONE,
+            )
+
+        cursor = {"updated_since": page.cursor["updated_since"].isoformat(), "after_id": page.cursor["after_id"]}
+        next_url = None
+        if page.has_more:
+            next_url = request.build_absolute_uri()
+            for name, value in cursor.items():
+                next_url = replace_query_param(next_url, name, value)
+        return Response({
+            "changed": self.get_serializer(page.changed, many=True).data,
+            "deleted": page.deleted,
+            "cursor": cursor,
+            "next": next_url,
+        })
+
 
 
 # ---------------------------
 # Product Category (Seller)
 # ---------------------------
 class ShopProductCategoryViewSet(
+    CatalogConditionalMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -41,7 +139,7 @@ class ShopProductCategoryViewSet(
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = ProductCategory.objects.all().order_by('category_name')
+    queryset = ProductCategory.objects.all().order_by('category_name').prefetch_related('products__product_images')
     serializer_class = ProductCategorySerializer
     permission_classes = [IsAuthenticated, IsSeller]
 
@@ -50,6 +148,8 @@ class ShopProductCategoryViewSet(
 # Product (Seller CRUD)
 # ---------------------------
 class ShopProductViewSet(
+    CatalogConditionalMixin,
+    ProductSyncMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -57,16 +157,25 @@ class ShopProductViewSet(
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Product.objects.all().select_related('category').prefetch_related('product_images', 'reviews')
+    queryset = Product.objects.all().select_related('category').prefetch_related('product_images')
     serializer_class = ProductSerializer
+    list_serializer_class = ShopProductListSerializer
     permission_classes = [IsAuthenticated, IsSeller]
 
+    def get_serializer_class(self):
+        # Compact rows for the list, the full product everywhere else
+        if self.action == 'list':
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
     def get_queryset(self):
         qs = super().get_queryset()
         # allow optional filtering by category via ?category=1
         category_id = self.request.query_params.get('category')
         if category_id:
             qs = qs.filter(category_id=category_id)
+        if self.action == 'list':
+            qs = self.list_serializer_class.setup_queryset(qs, self.request)
         return qs
 
 
@@ -100,17 +209,87 @@ class ShopProductImageViewSet(
         except Product.DoesNotExist:
             return Response({"detail": "product not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        image_bytes = file.read()
-        obj = ProductImage.objects.create(
-            product=product,
-            file_name=file.name,
-            mime_type=getattr(file, "content_type", "application/octet-stream"),
-            image_data=image_bytes
-        )
+        obj = ProductImage(product=product)
+        with transaction.atomic():
+            obj.set_upload(file)
+            obj.save()
         serializer = self.get_serializer(obj)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+# ---------------------------
+# ProductImage content (public, content-addressed)
+# ---------------------------
+class ProductImageContentViewSet(viewsets.ViewSet):
+    """
+    Serves the raw image bytes at /product_images/<sha256>/ and resized
+    variants at /product_images/<sha256>/<size>.<format>.
+    URLs are derived from the content hash, so a strong ETag is answered
+    after a single existence check, without opening the file.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    lookup_field = 'content_hash'
+    lookup_value_regex = '[0-9a-f]{64}'
+
+    def retrieve(self, request, content_hash=None):
+        def build_response():
+            image = self._get_image(content_hash)
+            file = self._open_image(image)
+            if file is None:
+                raise Http404
+            return FileResponse(file, content_type=image.mime_type or "application/octet-stream")
+
+        return self._immutable_response(request, content_hash, f'"{content_hash}"', build_response)
+
+    @action(
+        detail=True,
+        url_path=r'(?P<variant>{})\.(?P<fmt>{})'.format('|'.join(VARIANT_WIDTHS), '|'.join(VARIANT_FORMATS)),
+        url_name='variant',
+    )
+    def variant(self, request, content_hash=None, variant=None, fmt=None):
+        def open_source():
+            return self._open_image(self._get_image(content_hash))
+
+        def build_response():
+            file = open_variant(content_hash, variant, fmt, open_source)
+            if file is None:
+                raise Http404
+            return FileResponse(file, content_type=VARIANT_FORMATS[fmt][1])
+
+        return self._immutable_response(request, content_hash, f'"{content_hash}.{variant}.{fmt}"', build_response)
+
+    def _get_image(self, content_hash):
+        return (
+            ProductImage.objects.filter(content_hash=content_hash)
+            .only('mime_type', 'storage_name')
+            .order_by('-storage_name')
+            .first()
+        )
+
+    def _open_image(self, image):
+        # A row whose file is gone from storage is a missing image, not a server error
+        if image is None:
+            return None
+        try:
+            return image.open_image()
+        except FileNotFoundError:
+            return None
+
+    def _immutable_response(self, request, content_hash, etag, build_response):
+        # Only confirm a cached copy while some image still has this content
+        if (
+            etag in parse_etags(request.headers.get('If-None-Match', ''))
+            and ProductImage.objects.filter(content_hash=content_hash).exists()
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = build_response()
+        response['ETag'] = etag
+        response['Cache-Control'] = IMAGE_CACHE_CONTROL
+        return response
+
+
 # ---------------------------
 # Stock Movement (Seller)
 # ---------------------------
@@ -122,10 +301,14 @@ class ShopStockMovementViewSet(
     queryset = StockMovement.objects.select_related('product', 'processed_by').all()
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated, IsSeller]
+    pagination_class = CreatedDateCursorPagination
 
     def perform_create(self, serializer):
         # set processed_by to current user (seller)
-        serializer.save(processed_by=self.request.user)
+        try:
+            serializer.save(processed_by=self.request.user)
+        except StockConflict as exc:
+            raise ValidationError({"quantity": [f"Only {exc.conflicts[0]['available']} in stock."]})
 
 
 # ---------------------------
@@ -137,15 +320,15 @@ class ShopOrderViewSet(
     mixins.UpdateModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Order.objects.select_related('client').prefetch_related('order_items__product')
+    queryset = Order.objects.select_related('client').annotate(items_count=dj_models.Count('order_items'))
     serializer_class = SellerOrderSerializer
     permission_classes = [IsAuthenticated, IsSeller]
+    pagination_class = CreatedDateCursorPagination
 
     def update(self, request, *args, **kwargs):
         """
         Restrict update to status and order_note (shop processing info).
         """
-        order = self.get_object()
         status_value = request.data.get('status')
         order_note = request.data.get('order_note', None)
 
@@ -154,12 +337,24 @@ class ShopOrderViewSet(
             valid_statuses = [choice[0] for choice in OrderStatus.choices]
             if status_value not in valid_statuses:
                 return Response({"detail": "invalid status"}, status=status.HTTP_400_BAD_REQUEST)
-            order.status = status_value
-
-        if order_note is not None:
-            order.order_note = order_note
 
-        order.save()
+        try:
+            # Canceling releases the order's stock and reopening reserves it again (see signals)
+            with transaction.atomic():
+                order = self.get_object()
+                # Lock the row and re-read it, so two concurrent status changes cannot
+                # both start from the same old status
+                order.refresh_from_db(fields=['status', 'order_note'], from_queryset=Order.objects.select_for_update())
+                if status_value:
+                    order.status = status_value
+                if order_note is not None:
+                    order.order_note = order_note
+                order.save()
+        except StockConflict as exc:
+            return Response(
+                {"detail": "insufficient stock to reopen order", "conflicts": exc.conflicts},
+                status=status.HTTP_409_CONFLICT,
+            )
         return Response(SellerOrderSerializer(order).data)
 
 
@@ -174,6 +369,7 @@ class ShopOrderPaymentViewSet(
     queryset = Payment.objects.select_related('order').all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated, IsSeller]
+    pagination_class = CreatedDateCursorPagination
 
 
 # ---------------------------
@@ -187,6 +383,7 @@ class ShopProductReviewViewSet(
     queryset = Review.objects.select_related('product', 'user').all()
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated, IsSeller]
+    pagination_class = CreatedDateCursorPagination
 
 
 # ---------------------------
@@ -196,68 +393,28 @@ class ShopDashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsSeller]
 
     def list(self, request):
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status=OrderStatus.PENDING).count()
-        total_revenue = Order.objects.filter(status=OrderStatus.SUCCESS).aggregate(total=dj_models.Sum("total_amount"))["total"] or Decimal("0.00")
-        total_products = Product.objects.count()
-        low_stock = Product.objects.filter(quantity__lt=5).count()
-
-        data = {
-            "total_orders": total_orders,
-            "pending_orders": pending_orders,
-            "total_revenue": total_revenue,
-            "total_products": total_products,
-            "low_stock": low_stock,
-        }
-        return Response(DashboardSerializer(data).data)
+        # Shared and briefly cached across sellers (apps.eshop.metrics)
+        return Response(DashboardSerializer(get_metrics()).data)
 
 
 class ShopAnalyticsViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsSeller]
 
     def list(self, request):
-        # Example simple analytics payload (you can expand)
-        # revenue_by_month: { "2025-01": 1234.00, ... }
-        from django.db.models.functions import TruncMonth
-        revenue_qs = (
-            Order.objects.filter(status=OrderStatus.SUCCESS)
-            .annotate(month=TruncMonth("created_date"))
-            .values("month")
-            .annotate(total=dj_models.Sum("total_amount"))
-            .order_by("month")
-        )
-        revenue_by_month = {row["month"].strftime("%Y-%m"): float(row["total"] or 0) for row in revenue_qs}
-
-        orders_by_status_qs = Order.objects.values("status").annotate(count=dj_models.Count("id"))
-        orders_by_status = {row["status"]: row["count"] for row in orders_by_status_qs}
-
-        # top products
-        top_products = Product.objects.annotate(sold=dj_models.Sum("order_items__quantity")).order_by("-sold")[:5]
-
-        # top customers
-        top_customers = User.objects.annotate(spent=dj_models.Sum("orders__total_amount")).order_by("-spent")[:5]
-        top_customers_data = [{"username": u.username, "total_spent": float(u.spent or 0)} for u in top_customers]
-
-        payload = {
-            "revenue_by_month": revenue_by_month,
-            "orders_by_status": orders_by_status,
-            "top_products": SellerProductOverviewSerializer(top_products, many=True).data,
-            "top_customers": top_customers_data,
-        }
-        return Response(SellerAnalyticsSerializer(payload).data)
+        # Read from the daily rollups (apps.eshop.rollups), not the raw orders
+        return Response(SellerAnalyticsSerializer(sales_analytics()).data)
 
 
 class ShopInventoryOverviewViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsSeller]
 
     def list(self, request):
-        total_products = Product.objects.count()
-        low_stock_items = Product.objects.filter(quantity__lt=5).count()
+        metrics = get_metrics()
         recent_movements = StockMovement.objects.select_related("product", "processed_by").order_by("-created_date")[:20]
         payload = {
-            "total_products": total_products,
-            "low_stock_items": low_stock_items,
-            "recent_movements": StockMovementSerializer(recent_movements, many=True).data
+            "total_products": metrics["total_products"],
+            "low_stock_items": metrics["low_stock"],
+            "recent_movements": recent_movements,
         }
         return Response(InventoryOverviewSerializer(payload).data)
 
@@ -268,32 +425,53 @@ class ShopInventoryOverviewViewSet(viewsets.ViewSet):
 
 # Public product browsing
 class CustomerProductViewSet(
+    CatalogConditionalMixin,
+    ProductSyncMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Product.objects.filter().select_related('category').prefetch_related('product_images', 'reviews')
+    queryset = Product.objects.filter().select_related('category').prefetch_related(
+        'product_images',
+        dj_models.Prefetch('reviews', queryset=Review.objects.select_related('user')),
+    )
     serializer_class = CustomerProductDetailSerializer
+    list_serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
+    public_cache = True
+
+    def get_serializer_class(self):
+        # Product cards for the list, images and reviews only on the detail page
+        if self.action == 'list':
+            return self.list_serializer_class
+        return super().get_serializer_class()
 
     def get_queryset(self):
         qs = super().get_queryset()
-        # optional filters
-        cat = self.request.query_params.get("category")
-        min_price = self.request.query_params.get("min_price")
-        max_price = self.request.query_params.get("max_price")
-        in_stock = self.request.query_params.get("in_stock")
-
-        if cat:
-            qs = qs.filter(category_id=cat)
-        if min_price:
-            qs = qs.filter(price__gte=Decimal(min_price))
-        if max_price:
-            qs = qs.filter(price__lte=Decimal(max_price))
-        if in_stock in ("1", "true", "True"):
-            qs = qs.filter(quantity__gt=0)
+        # optional filters: category, min_price, max_price, in_stock, search
+        filters = product_filters(self.request.query_params)
+        qs = filter_products(qs, filters)
+        if filters["search"]:
+            # Ranked full-text + trigram match, best first (apps.eshop.search)
+            qs = search_products(qs, filters["search"])
+        if self.action == 'list':
+            qs = self.list_serializer_class.setup_queryset(qs, self.request)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # A 304 from CatalogConditionalMixin has no body to extend
+        if response.status_code == status.HTTP_200_OK and request.query_params.get("facets") in ("1", "true", "True"):
+            # Sidebar counts for the same filters, one cached grouped query (apps.eshop.facets)
+            response.data["facets"] = get_facets(product_filters(request.query_params))
+        return response
+
+    @action(detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """Product name suggestions for the search box: ?q=<words typed so far>."""
+        return Response(autocomplete_products(Product.objects.all(), request.query_params.get("q", "")))
+
 
 # Wishlist (customer own)
 class CustomerWishlistViewSet(
@@ -306,7 +484,7 @@ class CustomerWishlistViewSet(
     permission_classes = [IsAuthenticated, IsCustomer, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user).select_related('product')
+        return Wishlist.objects.filter(user=self.request.user).select_related('product').prefetch_related('product__product_images')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -324,7 +502,7 @@ class CustomerReviewViewSet(
     permission_classes = [IsAuthenticated, IsCustomer, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user).select_related('product')
+        return Review.objects.filter(user=self.request.user).select_related('product', 'user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -341,7 +519,11 @@ class CustomerOrderViewSet(
     permission_classes = [IsAuthenticated, IsCustomer, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        return Order.objects.filter(client=self.request.user).prefetch_related('order_items__product', 'payment')
+        return (
+            Order.objects.filter(client=self.request.user)
+            .select_related('payment')
+            .prefetch_related('order_items__product__product_images')
+        )
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -370,48 +552,60 @@ class CustomerOrderViewSet(
         payment_method = payload.get("payment_method", "COD")
         payment_details = payload.get("payment_details", {})
 
-        # 1️⃣ Create Order
+        # 1️⃣ Parse the cart, merging repeated lines for the same product
+        lines = []
+        requested = {}
+        try:
+            for it in items:
+                prod_id = int(it.get("product"))
+                qty = int(it.get("quantity", 1))
+                price = Decimal(str(it.get("price", "0")))
+                if qty < 1:
+                    raise ValueError
+                lines.append((prod_id, qty, price))
+                requested[prod_id] = requested.get(prod_id, 0) + qty
+        except (TypeError, ValueError, ArithmeticError):
+            return Response({"detail": "invalid items"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 2️⃣ Create Order with its total already known
+        paid = payment_details.get("status") == "success"
         order = Order.objects.create(
             client=request.user,
             shipping_address=payload.get("shipping_address", ""),
             order_note=payload.get("order_note", ""),
             payment_method=payment_method,
+            total_amount=sum(qty * price for _, qty, price in lines),
+            # COD orders are paid on delivery, so only prepaid orders wait on payment
+            reserved_until=None if paid or payment_method.upper() == "COD" else reservation_expiry(),
         )
 
-        # 2️⃣ Create Order Items & Stock Movements
-        for it in items:
-            prod_id = it.get("product")
-            qty = int(it.get("quantity", 1))
-            price = Decimal(str(it.get("price", "0")))
-            product = get_object_or_404(Product, pk=prod_id)
-
-            # create order item
-            OrderItem.objects.create(order=order, product=product, quantity=qty, price=price)
-
-            # decrease stock via StockMovement
-            StockMovement.objects.create(
-                product=product,
-                movement_type=MovementType.STOCK_OUT,
-                quantity=qty,
-                total_price=price * qty,
-                processed_by=None,
-                notes=f"Order {order.order_number} created by customer"
-            )
+        # 3️⃣ Bulk create Order Items
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=prod_id, quantity=qty, price=price)
+            for prod_id, qty, price in lines
+        ])
 
-        # 3️⃣ Recalculate total
-        order.calculate_total()
-        order.save()
+        # 4️⃣ Reserve stock atomically, or fail with the list of short products
+        try:
+            reserve_stock(order, lines)
+        except StockConflict as exc:
+            transaction.set_rollback(True)
+            return Response(
+                {"detail": "insufficient stock", "conflicts": exc.conflicts},
+                status=status.HTTP_409_CONFLICT,
+            )
 
-        # 4️⃣ Create Payment if not COD or “Cash on Delivery.”
+        # 5️⃣ Create Payment if not COD or “Cash on Delivery.”
         if payment_method.upper() != "COD":
             Payment.objects.create(
                 order=order,
                 amount=order.total_amount,
                 payment_method=payment_method,
                 payment_id=payment_details.get("payment_id", ""),
-                status=payment_details.get("status", "pending"),
+                status=paid,
             )
 
+        order = self.get_queryset().get(pk=order.pk)
         return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
@@ -427,8 +621,21 @@ class CustomerProfileViewSet(viewsets.ViewSet):
 
 # Shop Overview (public)
 class ShopOverviewViewSet(viewsets.ViewSet):
+    """
+    Category summaries plus the newest in-stock products, served from a
+    pre-rendered cached body (see apps.eshop.overview).
+    """
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def list(self, request):
-        data = ShopOverviewSerializer(None).data
-        return Response(data)
+        overview = get_overview()
+        response = get_conditional_response(
+            request, etag=overview["etag"], last_modified=overview["last_modified"],
+        )
+        if response is None:
+            response = HttpResponse(overview["body"], content_type="application/json")
+        response["ETag"] = overview["etag"]
+        response["Last-Modified"] = http_date(overview["last_modified"])
+        patch_catalog_cache_control(response, public=True)
+        return response
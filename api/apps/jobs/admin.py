@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from apps.jobs.constants import JobStatus
+from apps.jobs.models import Job
+from apps.eshop.admin import custom_admin_site  # Import the custom admin site
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "max_attempts", "run_at", "created_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "idempotency_key")
+    readonly_fields = ("created_at", "locked_at", "finished_at", "last_error")
+    date_hierarchy = "created_at"
+    list_per_page = 20
+
+    actions = ["retry_now"]
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=JobStatus.RUNNING).update(
+            status=JobStatus.PENDING, run_at=timezone.now(), attempts=0, finished_at=None,
+        )
+        self.message_user(request, f"{updated} job(s) queued to run again.")
+    retry_now.short_description = "Retry selected jobs now"
+
+
+# Register with custom admin site
+custom_admin_site.register(Job, JobAdmin)
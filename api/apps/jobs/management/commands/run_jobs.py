@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.queue import work
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (order stock release, notifications, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20, help="Jobs claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the due jobs and exit.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                count = work(options["batch_size"])
+                processed += count
+                if count:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} job(s)."))
@@ -0,0 +1,30 @@
+from django.db import models
+from django.utils import timezone
+
+from apps.jobs.constants import JobStatus
+
+
+
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_jobs` (see apps.jobs.queue)."""
+    name = models.CharField(verbose_name="Name", max_length=100, db_index=True)
+    payload = models.JSONField(verbose_name="Payload", default=dict, blank=True)
+    # Enqueueing the same key twice is a no-op, so side effects never run twice
+    idempotency_key = models.CharField(verbose_name="Idempotency Key", max_length=255, unique=True, blank=True, null=True)
+    status = models.CharField(verbose_name="Status", max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING)
+    attempts = models.PositiveIntegerField(verbose_name="Attempts", default=0)
+    max_attempts = models.PositiveIntegerField(verbose_name="Max Attempts", default=5)
+    run_at = models.DateTimeField(verbose_name="Run At", default=timezone.now)
+    locked_at = models.DateTimeField(verbose_name="Locked At", blank=True, null=True)
+    last_error = models.TextField(verbose_name="Last Error", blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(verbose_name="Finished At", blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
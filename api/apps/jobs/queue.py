@@ -0,0 +1,159 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.jobs.constants import JobStatus
+from apps.jobs.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# name -> handler, filled by the @job decorator when each app's jobs module is imported
+JOBS = {}
+
+
+
+
+# ===========================
+# Registering and enqueueing jobs
+# ===========================
+def job(name):
+    """
+    Register `func` as the handler of jobs called `name`. The handler receives
+    the job payload as keyword arguments and runs inside a transaction; raising
+    schedules a retry.
+    """
+    def decorator(func):
+        JOBS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, run_at=None, max_attempts=None):
+    """
+    Add a job to the queue and return it. When `key` is given and a job with
+    that idempotency key already exists, the existing job is returned instead.
+    """
+    if name not in JOBS:
+        raise KeyError(f"no job registered as {name!r}")
+
+    fields = {
+        "name": name,
+        "payload": payload or {},
+        "run_at": run_at or timezone.now(),
+        "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def enqueue_many(name, jobs, run_at=None, max_attempts=None):
+    """
+    Add many jobs in a single INSERT. `jobs` yields (payload, key) pairs;
+    keys that already exist are skipped, like enqueue().
+    """
+    if name not in JOBS:
+        raise KeyError(f"no job registered as {name!r}")
+
+    run_at = run_at or timezone.now()
+    max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+    Job.objects.bulk_create(
+        [
+            Job(name=name, payload=payload or {}, idempotency_key=key, run_at=run_at, max_attempts=max_attempts)
+            for payload, key in jobs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_on_commit(name, payload=None, key=None, **kwargs):
+    """Enqueue once the current transaction commits, so workers never see rolled back work."""
+    transaction.on_commit(partial(enqueue, name, payload, key, **kwargs))
+
+
+
+
+# ===========================
+# Running jobs
+# ===========================
+def backoff(attempts):
+    """Delay before retry number `attempts`: exponential, capped at JOB_BACKOFF_MAX_SECONDS."""
+    seconds = settings.JOB_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.JOB_BACKOFF_MAX_SECONDS))
+
+
+def requeue_stale():
+    """Put jobs back whose worker died mid-run (locked for longer than JOB_LOCK_TIMEOUT_SECONDS)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    return Job.objects.filter(status=JobStatus.RUNNING, locked_at__lt=cutoff).update(
+        status=JobStatus.PENDING, locked_at=None,
+    )
+
+
+def claim(batch_size):
+    """
+    Lock up to `batch_size` due jobs for this worker. SKIP LOCKED lets several
+    workers poll the same table without handing out a job twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=JobStatus.PENDING, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        Job.objects.filter(pk__in=ids).update(
+            status=JobStatus.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run one claimed job and record the outcome; failures are retried with backoff."""
+    handler = JOBS.get(job.name)
+    try:
+        if handler is None:
+            raise KeyError(f"no job registered as {job.name!r}")
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.FAILED
+            job.finished_at = timezone.now()
+            logger.error("Job %s failed for good after %s attempts", job, job.attempts)
+        else:
+            job.status = JobStatus.PENDING
+            job.run_at = timezone.now() + backoff(job.attempts)
+            logger.warning("Job %s failed, retrying at %s", job, job.run_at)
+        job.save(update_fields=['status', 'run_at', 'locked_at', 'last_error', 'finished_at'])
+        return False
+
+    job.status = JobStatus.DONE
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'locked_at', 'finished_at'])
+    return True
+
+
+def work(batch_size=20):
+    """Claim and run one batch of due jobs; returns how many were run."""
+    requeue_stale()
+    jobs = claim(batch_size)
+    for claimed in jobs:
+        run(claimed)
+    return len(jobs)
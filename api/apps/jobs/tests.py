@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.jobs.constants import JobStatus
+from apps.jobs.models import Job
+from apps.jobs.queue import backoff, enqueue, enqueue_many, enqueue_on_commit, job, requeue_stale, work
+
+
+CALLS = []
+
+
+@job("tests.record")
+def record(value, fail=False):
+    CALLS.append(value)
+    if fail:
+        raise RuntimeError("boom")
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_BACKOFF_SECONDS=10, JOB_BACKOFF_MAX_SECONDS=25)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_runs_due_jobs_once(self):
+        enqueue("tests.record", {"value": 1})
+        enqueue("tests.record", {"value": 2}, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(work(), 1)
+        self.assertEqual(work(), 0)
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(Job.objects.filter(status=JobStatus.DONE).count(), 1)
+
+    def test_idempotency_key_enqueues_once(self):
+        first = enqueue("tests.record", {"value": 1}, key="order:1")
+        second = enqueue("tests.record", {"value": 1}, key="order:1")
+
+        self.assertEqual(first.pk, second.pk)
+        work()
+        self.assertEqual(CALLS, [1])
+
+    def test_enqueue_many_is_one_insert_and_skips_known_keys(self):
+        enqueue("tests.record", {"value": 1}, key="order:1")
+        with self.assertNumQueries(1):
+            enqueue_many("tests.record", [({"value": 1}, "order:1"), ({"value": 2}, "order:2"), ({"value": 3}, None)])
+
+        work()
+        self.assertEqual(sorted(CALLS), [1, 2, 3])
+
+    def test_enqueue_on_commit_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue_on_commit("tests.record", {"value": 1})
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(Job.objects.exists())
+
+    def test_failures_back_off_then_dead_letter(self):
+        queued = enqueue("tests.record", {"value": 1, "fail": True})
+        started = timezone.now()
+
+        work()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (JobStatus.PENDING, 1))
+        self.assertGreaterEqual(queued.run_at, started + timedelta(seconds=10))
+        self.assertIn("RuntimeError: boom", queued.last_error)
+
+        retried_at = queued.run_at
+        with mock.patch("apps.jobs.queue.timezone.now", return_value=retried_at):
+            work()
+        queued.refresh_from_db()
+        self.assertEqual(queued.run_at, retried_at + timedelta(seconds=20))
+
+        with mock.patch("apps.jobs.queue.timezone.now", return_value=queued.run_at):
+            work()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (JobStatus.FAILED, 3))
+        self.assertEqual(len(CALLS), 3)
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(backoff(1), timedelta(seconds=10))
+        self.assertEqual(backoff(2), timedelta(seconds=20))
+        self.assertEqual(backoff(5), timedelta(seconds=25))
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = enqueue("tests.record", {"value": 1})
+        Job.objects.filter(pk=stale.pk).update(status=JobStatus.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale(), 1)
+        work()
+        self.assertEqual(CALLS, [1])
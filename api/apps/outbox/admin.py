@@ -0,0 +1,32 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from apps.outbox.constants import EmailStatus
+from apps.outbox.models import OutboundEmail
+from apps.eshop.admin import custom_admin_site  # Import the custom admin site
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("subject", "to")
+    readonly_fields = ("created_at", "sent_at", "locked_at", "last_error")
+    date_hierarchy = "created_at"
+    list_per_page = 20
+
+    actions = ["retry_now"]
+
+    def recipients(self, obj):
+        return ", ".join(obj.to)
+    recipients.short_description = "To"
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status__in=[EmailStatus.SENT, EmailStatus.SENDING]).update(
+            status=EmailStatus.QUEUED, next_attempt_at=timezone.now(), attempts=0,
+        )
+        self.message_user(request, f"{updated} email(s) queued to send again.")
+    retry_now.short_description = "Retry selected emails now"
+
+
+# Register with custom admin site
+custom_admin_site.register(OutboundEmail, OutboundEmailAdmin)
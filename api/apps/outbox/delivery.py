@@ -0,0 +1,95 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.outbox.constants import EmailStatus
+from apps.outbox.models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+
+
+# ===========================
+# Draining the outbox
+# ===========================
+def get_delivery_connection():
+    """The real transport (SMTP by default) the outbox delivers through."""
+    return get_connection(settings.OUTBOX_DELIVERY_BACKEND, fail_silently=False)
+
+
+def backoff(attempts):
+    """Delay before retry number `attempts`: exponential, capped at OUTBOX_BACKOFF_MAX_SECONDS."""
+    seconds = settings.OUTBOX_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def requeue_stale():
+    """Put back emails whose sender died mid-batch (locked longer than OUTBOX_LOCK_TIMEOUT_SECONDS)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.OUTBOX_LOCK_TIMEOUT_SECONDS)
+    return OutboundEmail.objects.filter(status=EmailStatus.SENDING, locked_at__lt=cutoff).update(
+        status=EmailStatus.QUEUED, locked_at=None,
+    )
+
+
+def claim(batch_size):
+    """Lock up to `batch_size` due emails; SKIP LOCKED keeps parallel senders apart."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailStatus.QUEUED, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=ids).update(
+            status=EmailStatus.SENDING, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(OutboundEmail.objects.filter(pk__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def _failed(email, exc):
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    email.locked_at = None
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        # Dead letter: kept for inspection, retried only from the admin
+        email.status = EmailStatus.FAILED
+        logger.error("Email %s dead-lettered after %s attempts: %s", email.pk, email.attempts, exc)
+    else:
+        email.status = EmailStatus.QUEUED
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+        logger.warning("Email %s failed, retrying at %s: %s", email.pk, email.next_attempt_at, exc)
+    email.save(update_fields=['status', 'next_attempt_at', 'locked_at', 'last_error'])
+
+
+def deliver(connection, batch_size=50):
+    """
+    Send one batch of due emails over `connection`, which is opened if needed
+    and left open so the caller can reuse it for the next batch. Returns the
+    number of emails claimed.
+    """
+    requeue_stale()
+    emails = claim(batch_size)
+
+    for email in emails:
+        try:
+            connection.open()
+            connection.send_messages([email.to_message(connection)])
+        except Exception as exc:
+            _failed(email, exc)
+            if isinstance(exc, (smtplib.SMTPServerDisconnected, OSError)):
+                # Reconnect for the rest of the batch
+                connection.close()
+        else:
+            # Recorded right away, so a crash later in the batch does not send it again
+            OutboundEmail.objects.filter(pk=email.pk).update(
+                status=EmailStatus.SENT, sent_at=timezone.now(), locked_at=None, last_error="",
+            )
+    return len(emails)
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.outbox.delivery import deliver, get_delivery_connection
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over a persistent SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Emails claimed per batch.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the due emails and exit.")
+
+    def handle(self, *args, **options):
+        connection = get_delivery_connection()
+        processed = 0
+        try:
+            while True:
+                count = deliver(connection, options["batch_size"])
+                processed += count
+                if count:
+                    continue
+                # Idle: let the server connection go rather than have it time out
+                connection.close()
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} email(s)."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=998, verbose_name='Subject')),
+                ('body', models.TextField(blank=True, default='', verbose_name='Body')),
+                ('from_email', models.CharField(max_length=255, verbose_name='From')),
+                ('to', models.JSONField(default=list, verbose_name='To')),
+                ('cc', models.JSONField(blank=True, default=list, verbose_name='Cc')),
+                ('bcc', models.JSONField(blank=True, default=list, verbose_name='Bcc')),
+                ('reply_to', models.JSONField(blank=True, default=list, verbose_name='Reply To')),
+                ('headers', models.JSONField(blank=True, default=dict, verbose_name='Headers')),
+                ('alternatives', models.JSONField(blank=True, default=list, verbose_name='Alternatives')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt At')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Locked At')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Sent At')),
+            ],
+            options={
+                'verbose_name': 'Outbound Email',
+                'verbose_name_plural': 'Outbound Emails',
+                'ordering': ['next_attempt_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx')],
+            },
+        ),
+    ]
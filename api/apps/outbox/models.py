@@ -0,0 +1,65 @@
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils import timezone
+
+from apps.outbox.constants import EmailStatus
+
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in the outbox. Requests only insert these rows (see
+    apps.outbox.backends); `manage.py send_outbox` delivers them over SMTP.
+    """
+    subject = models.CharField(verbose_name="Subject", max_length=998)
+    body = models.TextField(verbose_name="Body", blank=True, default="")
+    from_email = models.CharField(verbose_name="From", max_length=255)
+    to = models.JSONField(verbose_name="To", default=list)
+    cc = models.JSONField(verbose_name="Cc", default=list, blank=True)
+    bcc = models.JSONField(verbose_name="Bcc", default=list, blank=True)
+    reply_to = models.JSONField(verbose_name="Reply To", default=list, blank=True)
+    headers = models.JSONField(verbose_name="Headers", default=dict, blank=True)
+    # [[content, mimetype], ...] for EmailMultiAlternatives (e.g. an HTML part)
+    alternatives = models.JSONField(verbose_name="Alternatives", default=list, blank=True)
+    status = models.CharField(verbose_name="Status", max_length=10, choices=EmailStatus.choices, default=EmailStatus.QUEUED)
+    attempts = models.PositiveIntegerField(verbose_name="Attempts", default=0)
+    next_attempt_at = models.DateTimeField(verbose_name="Next Attempt At", default=timezone.now)
+    locked_at = models.DateTimeField(verbose_name="Locked At", blank=True, null=True)
+    last_error = models.TextField(verbose_name="Last Error", blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(verbose_name="Sent At", blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx')]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.status})"
+
+    @classmethod
+    def from_message(cls, message):
+        if message.attachments:
+            raise ValueError("The outbox does not store attachments.")
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=dict(message.extra_headers),
+            alternatives=[[content, mimetype] for content, mimetype in getattr(message, "alternatives", [])],
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject, body=self.body, from_email=self.from_email,
+            to=self.to, cc=self.cc, bcc=self.bcc, reply_to=self.reply_to,
+            headers=self.headers, connection=connection,
+        )
+        for content, mimetype in self.alternatives:
+            message.attach_alternative(content, mimetype)
+        return message
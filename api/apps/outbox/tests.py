@@ -0,0 +1,185 @@
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.outbox.constants import EmailStatus
+from apps.outbox.delivery import deliver, get_delivery_connection
+from apps.outbox.models import OutboundEmail
+from apps.usr.constants import UserRole
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    Just enough of an SMTP server for smtplib: records every message and the
+    number of connections, and refuses recipients in `refused`.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.refused = set()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self.reply("221 bye")
+                return
+            if command == "EHLO":
+                self.reply("250-stand-in")
+                self.reply("250 8BITMIME")
+            elif command == "RCPT":
+                address = line.split(":", 1)[1].strip(" <>")
+                if address in self.server.refused:
+                    self.reply("550 no such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                data = b""
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data += chunk
+                self.server.messages.append((recipients, message_from_bytes(data)))
+                recipients = []
+                self.reply("250 queued")
+            elif command == "RSET":
+                recipients = []
+                self.reply("250 ok")
+            else:  # HELO, MAIL, NOOP
+                self.reply("250 ok")
+
+
+def smtp_settings(server):
+    return override_settings(
+        EMAIL_BACKEND="apps.outbox.backends.OutboxBackend",
+        OUTBOX_DELIVERY_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+        EMAIL_HOST="127.0.0.1", EMAIL_PORT=server.server_address[1],
+        EMAIL_HOST_USER="shop@example.com", EMAIL_HOST_PASSWORD="",
+        EMAIL_USE_TLS=False, EMAIL_TIMEOUT=5,
+        OUTBOX_MAX_ATTEMPTS=2, OUTBOX_BACKOFF_SECONDS=0,
+    )
+
+
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.server = SMTPStandIn().__enter__()
+        self.addCleanup(self.server.__exit__)
+        settings_override = smtp_settings(self.server)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_signup_only_queues_the_otp_email(self):
+        started = time.perf_counter()
+        response = self.client.post(reverse("sign_up"), {
+            "first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com",
+            "gender": "female", "role": UserRole.CUSTOMER,
+            "password": "Strong-pass-123", "password_confirmation": "Strong-pass-123",
+        })
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.server.connections, 0, "the request must not talk to SMTP")
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.to, queued.status), (["ada@example.com"], EmailStatus.QUEUED))
+        self.assertLess(elapsed, 2)
+
+        connection = get_delivery_connection()
+        deliver(connection)
+        connection.close()
+
+        recipients, message = self.server.messages[0]
+        self.assertEqual(recipients, ["ada@example.com"])
+        self.assertIn("Your OTP is", message.get_payload())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailStatus.SENT)
+
+    def test_batch_is_sent_over_one_connection(self):
+        mail.send_mass_mail([
+            ("Hello", f"Message {i}", "shop@example.com", [f"user{i}@example.com"])
+            for i in range(25)
+        ])
+        self.assertEqual(OutboundEmail.objects.count(), 25)
+
+        connection = get_delivery_connection()
+        self.assertEqual(deliver(connection, batch_size=10), 10)
+        self.assertEqual(deliver(connection, batch_size=10), 10)
+        self.assertEqual(deliver(connection, batch_size=10), 5)
+        connection.close()
+
+        self.assertEqual(len(self.server.messages), 25)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(OutboundEmail.objects.filter(status=EmailStatus.SENT).count(), 25)
+
+    def test_refused_email_is_retried_then_dead_lettered(self):
+        self.server.refused.add("gone@example.com")
+        mail.send_mail("Hello", "Body", "shop@example.com", ["gone@example.com"])
+        mail.send_mail("Hello", "Body", "shop@example.com", ["ok@example.com"])
+
+        connection = get_delivery_connection()
+        with self.assertLogs("apps.outbox.delivery", "WARNING"):
+            deliver(connection)
+        bounced = OutboundEmail.objects.get(to=["gone@example.com"])
+        self.assertEqual((bounced.status, bounced.attempts), (EmailStatus.QUEUED, 1))
+        self.assertIn("SMTPRecipientsRefused", bounced.last_error)
+
+        with self.assertLogs("apps.outbox.delivery", "ERROR"):
+            deliver(connection)
+        connection.close()
+        bounced.refresh_from_db()
+        self.assertEqual(bounced.status, EmailStatus.FAILED)
+        self.assertEqual(OutboundEmail.objects.get(to=["ok@example.com"]).status, EmailStatus.SENT)
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_emails_sent_before_a_crash_stay_sent(self):
+        mail.send_mass_mail([
+            ("Hello", f"Message {i}", "shop@example.com", [f"user{i}@example.com"])
+            for i in range(3)
+        ])
+        connection = get_delivery_connection()
+        send = connection.send_messages
+        calls = []
+
+        def send_then_die(messages):
+            calls.append(messages)
+            if len(calls) == 3:
+                raise KeyboardInterrupt  # the sender is killed mid-batch
+            return send(messages)
+
+        with mock.patch.object(connection, "send_messages", send_then_die), self.assertRaises(KeyboardInterrupt):
+            deliver(connection)
+        connection.close()
+
+        self.assertEqual(OutboundEmail.objects.filter(status=EmailStatus.SENT).count(), 2)
+        self.assertEqual(OutboundEmail.objects.filter(status=EmailStatus.SENDING).count(), 1)
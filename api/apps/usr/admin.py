@@ -41,6 +41,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ("country", "province", "district",)
     search_fields = ("user__email", "user__first_name", "user__last_name", "phone_number", "street",)
     list_per_page = 20
+    list_select_related = ("user",)
 
 
 # Register with custom admin site
@@ -1,22 +1,104 @@
 from rest_framework import authentication, exceptions
-import jwt
 from django.conf import settings
-from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+from apps.usr.tokens import ACCESS, TokenError, decode
+from apps.usr.utils import get_cached_user
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    The authenticated user, loaded (through the user cache) only when
+    something needs more than the signed claims. pk, role and is_active come
+    straight from the token, so role-based permission checks cost no query.
+    """
+
+    def __init__(self, payload):
+        user_id = payload['user_id']
+
+        def load():
+            # The token can outlive the account
+            user = get_cached_user(user_id)
+            if user is None:
+                raise exceptions.AuthenticationFailed('User not found')
+            return user
+
+        super().__init__(load)
+        # Set on the proxy itself, so these never trigger the load
+        self.__dict__.update(
+            pk=user_id,
+            id=user_id,
+            role=payload['role'],
+            is_active=payload['is_active'],
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
 
 class JWTAuthentication(authentication.BaseAuthentication):
-    def authenticate(self, request):
+    """
+    Stateless API authentication from a signed access token, sent either as
+    `Authorization: Bearer <token>` or in the `jwt` cookie. No session is read
+    or written. A browser attaches the cookie on its own, so cookie-sourced
+    tokens get the same CSRF check SessionAuthentication applies.
+    """
+    keyword = 'Bearer'
+
+    def get_token(self, request):
+        """Return (token, from_cookie), or (None, False) when the request carries none."""
+        header = authentication.get_authorization_header(request).split()
+        if header and header[0].lower() == self.keyword.lower().encode():
+            if len(header) != 2:
+                raise exceptions.AuthenticationFailed('Invalid token header')
+            return header[1].decode(), False
         token = request.COOKIES.get('jwt')
+        return token, bool(token)
+
+    def authenticate(self, request):
+        token, from_cookie = self.get_token(request)
         if not token:
             return None  # No JWT provided
 
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        except jwt.ExpiredSignatureError:
-            raise exceptions.AuthenticationFailed('Token has expired')
-        except jwt.InvalidTokenError:
-            raise exceptions.AuthenticationFailed('Invalid token')
+            payload = decode(token, ACCESS)
+        except TokenError as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+
+        if from_cookie:
+            self.enforce_csrf(request)
+
+        if settings.JWT_ROLE_CLAIMS and 'role' in payload:
+            if not payload.get('is_active'):
+                raise exceptions.AuthenticationFailed('User inactive')
+            return (TokenUser(payload), None)
 
-        user = get_user_model().objects.filter(id=payload['user_id']).first()
+        user = get_cached_user(payload['user_id'])
         if user is None:
             raise exceptions.AuthenticationFailed('User not found')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive')
         return (user, None)
+
+    def enforce_csrf(self, request):
+        # Same check as rest_framework's SessionAuthentication
+        def dummy_get_response(request):  # pragma: no cover
+            return None
+
+        check = authentication.CSRFCheck(dummy_get_response)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise exceptions.PermissionDenied(f'CSRF Failed: {reason}')
+
+    def authenticate_header(self, request):
+        # Makes DRF answer 401 (not 403) when authentication fails
+        return self.keyword
+
+
+class JWTAuthenticationScheme(OpenApiAuthenticationExtension):
+    target_class = 'apps.usr.authentication.JWTAuthentication'
+    name = 'jwtAuth'
+
+    def get_security_definition(self, auto_schema):
+        return {'type': 'http', 'scheme': 'bearer', 'bearerFormat': 'JWT'}
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from apps.usr.models import UserProfile
+from apps.usr.utils import invalidate_cached_user
 
 User = get_user_model()
 
@@ -9,3 +11,11 @@ User = get_user_model()
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Password, role and is_active changes must reach the auth cache; after
+    # commit, so a concurrent lookup cannot cache the old row again
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usr', '0002_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OTPCounter',
+            fields=[
+                ('key', models.CharField(max_length=150, primary_key=True, serialize=False, verbose_name='Key')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+            ],
+            options={
+                'verbose_name': 'OTP Counter',
+                'verbose_name_plural': 'OTP Counters',
+            },
+        ),
+    ]
@@ -45,3 +45,42 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"Profile of {self.user.get_full_name()}"
+
+
+
+
+class RevokedToken(models.Model):
+    """
+    Refresh tokens (by jti) and token families that may no longer be used.
+    Rows only matter until the token would have expired anyway, so the table
+    stays small (see apps.usr.tokens).
+    """
+    jti = models.CharField(verbose_name="Token ID", max_length=32, primary_key=True)
+    expires_at = models.DateTimeField(verbose_name="Expires At", db_index=True)
+
+    class Meta:
+        verbose_name = "Revoked Token"
+        verbose_name_plural = "Revoked Tokens"
+
+    def __str__(self):
+        return self.jti
+
+
+
+
+class OTPCounter(models.Model):
+    """
+    Send and attempt counters of the OTP store (see apps.usr.otp). They live in
+    the database rather than the cache so that incrementing one is a single
+    atomic UPDATE, whatever cache backend is configured.
+    """
+    key = models.CharField(verbose_name="Key", max_length=150, primary_key=True)
+    count = models.PositiveIntegerField(verbose_name="Count", default=0)
+    expires_at = models.DateTimeField(verbose_name="Expires At", db_index=True)
+
+    class Meta:
+        verbose_name = "OTP Counter"
+        verbose_name_plural = "OTP Counters"
+
+    def __str__(self):
+        return f"{self.key} = {self.count}"
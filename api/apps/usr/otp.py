@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from apps.usr.models import OTPCounter
+from apps.usr.utils import generate_otp
+
+
+
+
+# ===========================
+# OTP store
+# ===========================
+class OTPError(Exception):
+    """Base class; the message is safe to show to the user."""
+
+
+class OTPExpired(OTPError):
+    pass
+
+
+class OTPInvalid(OTPError):
+    pass
+
+
+class OTPLocked(OTPError):
+    """Too many wrong guesses; the code is burnt and a new one must be requested."""
+
+
+class OTPRateLimited(OTPError):
+    def __init__(self, message, wait):
+        super().__init__(message)
+        self.wait = wait
+
+
+class OTPStore:
+    """
+    One-time codes for a single purpose, kept in the shared OTP_CACHE_ALIAS
+    cache so that any gunicorn worker can verify a code another one issued.
+
+    Keys are namespaced by purpose and user ("<purpose>:<user_id>:code"). Each
+    code allows `max_attempts` guesses, and at most `max_sends` codes can be
+    issued per user within `send_window` seconds. Those two counters are
+    OTPCounter rows bumped by a single upsert: the database cache increments
+    with a get and a set, so parallel guesses could slip past a cache limit.
+    """
+
+    def __init__(self, purpose, ttl=300, max_attempts=5, max_sends=5, send_window=900, verified_ttl=600):
+        self.purpose = purpose
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_sends = max_sends
+        self.send_window = send_window
+        self.verified_ttl = verified_ttl
+
+    @property
+    def cache(self):
+        return caches[settings.OTP_CACHE_ALIAS]
+
+    def _key(self, user, name):
+        return f"{self.purpose}:{user.pk}:{name}"
+
+    def _count(self, key, timeout):
+        """Add one to the counter `key` and return its new value; a new window starts once it expires."""
+        now = timezone.now()
+        table = connection.ops.quote_name(OTPCounter._meta.db_table)
+        # One atomic upsert: concurrent callers each get a distinct count back
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (key, count, expires_at) VALUES (%s, 1, %s)
+                ON CONFLICT (key) DO UPDATE SET
+                    count = CASE WHEN {table}.expires_at > %s THEN {table}.count + 1 ELSE 1 END,
+                    expires_at = CASE WHEN {table}.expires_at > %s THEN {table}.expires_at ELSE EXCLUDED.expires_at END
+                RETURNING count
+                """,
+                [key, now + timedelta(seconds=timeout), now, now],
+            )
+            return cursor.fetchone()[0]
+
+    def _reset(self, user, *names):
+        OTPCounter.objects.filter(key__in=[self._key(user, name) for name in names]).delete()
+
+    def issue(self, user):
+        """Create and store a new code for `user`, replacing any previous one."""
+        if self._count(self._key(user, "sends"), self.send_window) > self.max_sends:
+            raise OTPRateLimited("Too many codes requested. Try again later.", self.send_window)
+
+        otp = generate_otp()
+        self.cache.set(self._key(user, "code"), otp, self.ttl)
+        # Resets this user's attempts and prunes expired counters in the same DELETE
+        OTPCounter.objects.filter(
+            Q(key=self._key(user, "attempts")) | Q(expires_at__lte=timezone.now())
+        ).delete()
+        return otp
+
+    def verify(self, user, otp):
+        """Check `otp` and consume it on success. Raises an OTPError otherwise."""
+        code_key = self._key(user, "code")
+        stored = self.cache.get(code_key)
+        if stored is None:
+            raise OTPExpired("OTP expired or invalid. Request a new one.")
+
+        if self._count(self._key(user, "attempts"), self.ttl) > self.max_attempts:
+            self.cache.delete(code_key)
+            raise OTPLocked("Too many attempts. Request a new OTP.")
+
+        if not constant_time_compare(stored, otp):
+            raise OTPInvalid("Incorrect OTP.")
+
+        self.cache.delete(code_key)
+        self._reset(user, "attempts")
+
+    def mark_verified(self, user):
+        """Remember that `user` passed verification (e.g. may now reset the password)."""
+        self.cache.set(self._key(user, "verified"), True, self.verified_ttl)
+
+    def is_verified(self, user):
+        return bool(self.cache.get(self._key(user, "verified")))
+
+    def clear(self, user):
+        self.cache.delete_many([self._key(user, name) for name in ("code", "verified")])
+        self._reset(user, "attempts")
+
+
+ACCOUNT_ACTIVATION = OTPStore("account_activation")
+PASSWORD_RESET = OTPStore("password_reset")
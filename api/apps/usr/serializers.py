@@ -1,10 +1,10 @@
 from django.contrib.auth import authenticate, get_user_model, update_session_auth_hash
 from django.conf import settings
-from django.core.cache import cache
 from django.core.mail import EmailMessage
 from rest_framework import serializers
+from rest_framework.exceptions import Throttled
 from apps.usr.models import UserRole, UserProfile
-from apps.usr.utils import generate_otp
+from apps.usr.otp import ACCOUNT_ACTIVATION, PASSWORD_RESET, OTPError, OTPRateLimited
 
 
 
@@ -22,23 +22,15 @@ class UserActivateVerifyOTPSerializer(serializers.Serializer):
         except get_user_model().DoesNotExist:
             raise serializers.ValidationError({"message": "User not found."})
 
-        cache_key = f"otp_{user.id}"
-        stored_otp = cache.get(cache_key)
-
-        # Validate OTP existence
-        if not stored_otp:
-            raise serializers.ValidationError(
-                {"message": "OTP expired or invalid. Request a new one."}
-            )
-
-        # Validate OTP correctness
-        if stored_otp != otp:
-            raise serializers.ValidationError({"message": "Incorrect OTP."})
+        # Validate OTP (expiry, attempts, correctness)
+        try:
+            ACCOUNT_ACTIVATION.verify(user, otp)
+        except OTPError as exc:
+            raise serializers.ValidationError({"message": str(exc)})
 
         # Activate User Inside Serializer
         user.is_active = True
         user.save(update_fields=["is_active"])
-        cache.delete(cache_key)
 
         data["user"] = user
         return data
@@ -62,10 +54,11 @@ class UserActivateResendOTPSerializer(serializers.Serializer):
     def save(self):
         email = self.validated_data["email"]
         user = get_user_model().objects.get(email=email)
-        otp = generate_otp()
 
-        cache_key = f"otp_{user.id}"
-        cache.set(cache_key, otp, timeout=300)
+        try:
+            otp = ACCOUNT_ACTIVATION.issue(user)
+        except OTPRateLimited as exc:
+            raise Throttled(wait=exc.wait, detail=str(exc))
 
         EmailMessage(
             subject="Your new OTP code",
@@ -106,15 +99,12 @@ class PasswordResetVerifyOTPSerializer(serializers.Serializer):
         except get_user_model().DoesNotExist:
             raise serializers.ValidationError({"message": "User not found."})
 
-        cache_key = f"password_reset_otp_{user.id}"
-        stored_otp = cache.get(cache_key)
-
-        if not stored_otp:
-            raise serializers.ValidationError({"message": "OTP expired or not found."})
-
-        if stored_otp != otp:
-            raise serializers.ValidationError({"message": "Invalid OTP."})
+        try:
+            PASSWORD_RESET.verify(user, otp)
+        except OTPError as exc:
+            raise serializers.ValidationError({"message": str(exc)})
 
+        data["user"] = user
         return data
 
 
@@ -1,3 +1,261 @@
-from django.test import TestCase
+import datetime
+import threading
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.test import APIRequestFactory
+
+from apps.eshop.permissions import IsCustomer, IsSeller
+from apps.usr.authentication import JWTAuthentication
+from apps.usr.constants import UserRole
+from apps.usr.models import OTPCounter, RevokedToken, User
+from apps.usr.otp import OTPError, OTPExpired, OTPInvalid, OTPLocked, OTPRateLimited, OTPStore
+from apps.usr.tokens import ACCESS, REFRESH, TokenError, decode, issue_tokens, revoke, rotate
+from apps.usr.utils import _user_key, generate_jwt_token, get_cached_user
+
+
+class OTPStoreTests(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create(email="otp@example.com", role=UserRole.CUSTOMER)
+        self.store = OTPStore("test", max_attempts=3, max_sends=2)
+
+    def test_code_is_consumed_on_success(self):
+        otp = self.store.issue(self.user)
+        self.store.verify(self.user, otp)
+        with self.assertRaises(OTPExpired):
+            self.store.verify(self.user, otp)
+
+    def test_wrong_guesses_burn_the_code(self):
+        otp = self.store.issue(self.user)
+        wrong = "000000" if otp != "000000" else "111111"
+        for _ in range(3):
+            with self.assertRaises(OTPInvalid):
+                self.store.verify(self.user, wrong)
+        with self.assertRaises(OTPLocked):
+            self.store.verify(self.user, otp)
+        with self.assertRaises(OTPExpired):
+            self.store.verify(self.user, otp)
+
+    def test_new_code_resets_attempts(self):
+        self.store.issue(self.user)
+        with self.assertRaises(OTPInvalid):
+            self.store.verify(self.user, "not-it")
+        otp = self.store.issue(self.user)
+        self.store.verify(self.user, otp)
+
+    def test_issuing_is_rate_limited(self):
+        self.store.issue(self.user)
+        self.store.issue(self.user)
+        with self.assertRaises(OTPRateLimited):
+            self.store.issue(self.user)
+
+    def test_purposes_are_namespaced(self):
+        otp = self.store.issue(self.user)
+        with self.assertRaises(OTPExpired):
+            OTPStore("other").verify(self.user, otp)
+
+
+class OTPRateLimitResponseTests(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def throttled(self, url_name, email):
+        for _ in range(OTPStore("any").max_sends + 1):
+            response = self.client.post(reverse(url_name), {"email": email})
+        self.assertEqual(response.status_code, 429)
+        return response
+
+    def test_both_otp_endpoints_answer_the_same_429(self):
+        User.objects.create(email="inactive@example.com", role=UserRole.CUSTOMER, is_active=False)
+        User.objects.create(email="active@example.com", role=UserRole.CUSTOMER)
+
+        resend = self.throttled("activate_resend_otp", "inactive@example.com")
+        reset = self.throttled("password_reset_verify_email", "active@example.com")
+        self.assertEqual(set(resend.json()), set(reset.json()))
+        self.assertTrue(int(resend["Retry-After"]) > 0)
+        self.assertTrue(int(reset["Retry-After"]) > 0)
+
+
+class OTPAttemptLimitStressTests(TransactionTestCase):
+    """Parallel wrong guesses must not get more than max_attempts tries at the code."""
+    THREADS = 8
+
+    def test_parallel_guesses_respect_the_limit(self):
+        user = User.objects.create(email="race@example.com", role=UserRole.CUSTOMER)
+        store = OTPStore("race", max_attempts=3)
+        otp = store.issue(user)
+        wrong = "000000" if otp != "000000" else "111111"
+        outcomes = []
+
+        def guesser():
+            try:
+                store.verify(user, wrong)
+            except OTPError as exc:
+                outcomes.append(type(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=guesser) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(outcomes.count(OTPInvalid), 3)
+        self.assertEqual(OTPCounter.objects.get(key=f"race:{user.pk}:attempts").count, self.THREADS)
+
+
+class CachedUserTests(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create(email="cached@example.com", role=UserRole.SELLER)
+
+    def test_user_is_served_from_cache(self):
+        get_cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk).email, "cached@example.com")
+
+    def test_changes_invalidate_the_cache(self):
+        get_cached_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = UserRole.CUSTOMER
+            self.user.is_active = False
+            self.user.save()
+        cached = get_cached_user(self.user.pk)
+        self.assertEqual((cached.role, cached.is_active), (UserRole.CUSTOMER, False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertIsNone(get_cached_user(cached.pk))
+
+    def test_password_hash_is_not_cached(self):
+        self.user.set_password("secret-pass-1")
+        self.user.save()
+        get_cached_user(self.user.pk)
+        _, cached = caches["default"].get(_user_key(self.user.pk))
+        self.assertIn("cached@example.com", cached)
+        self.assertNotIn(self.user.password, cached)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(get_cached_user(self.user.pk).check_password("secret-pass-1"))
+
+    @override_settings(JWT_ROLE_CLAIMS=True)
+    def test_role_claims_for_a_deleted_user_fail_authentication(self):
+        request = APIRequestFactory().get("/")
+        request.COOKIES["jwt"] = generate_jwt_token(self.user)
+        self.user.delete()
+
+        user, _ = JWTAuthentication().authenticate(request)
+        with self.assertRaises(AuthenticationFailed):
+            user.email
+
+    @override_settings(CACHES={**settings.CACHES, "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "cache_entries",
+    }})
+    def test_database_cache_costs_one_query_per_request(self):
+        call_command("createcachetable", verbosity=0)
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {generate_jwt_token(self.user)}")
+        JWTAuthentication().authenticate(request)
+
+        with self.assertNumQueries(1):
+            user, _ = JWTAuthentication().authenticate(request)
+            self.assertEqual(user.email, "cached@example.com")
+
+    @override_settings(JWT_ROLE_CLAIMS=True)
+    def test_role_claims_skip_the_user_lookup(self):
+        request = APIRequestFactory().get("/")
+        request.COOKIES["jwt"] = generate_jwt_token(self.user)
+
+        with self.assertNumQueries(0):
+            user, _ = JWTAuthentication().authenticate(request)
+            request.user = user
+            self.assertTrue(IsSeller().has_permission(request, None))
+            self.assertFalse(IsCustomer().has_permission(request, None))
+
+        # Anything beyond the claims loads the real user
+        self.assertEqual(user.email, "cached@example.com")
+
+    @override_settings(JWT_ROLE_CLAIMS=False)
+    def test_role_claims_are_ignored_unless_enabled(self):
+        request = APIRequestFactory().get("/")
+        request.COOKIES["jwt"] = generate_jwt_token(self.user)
+        user, _ = JWTAuthentication().authenticate(request)
+        self.assertIsInstance(user, User)
+
+
+class JWTCsrfTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="csrf@example.com", role=UserRole.CUSTOMER)
+        self.factory = APIRequestFactory(enforce_csrf_checks=True)
+
+    def test_cookie_token_requires_csrf_on_unsafe_methods(self):
+        request = self.factory.post("/")
+        request.COOKIES["jwt"] = generate_jwt_token(self.user)
+        with self.assertRaises(PermissionDenied):
+            JWTAuthentication().authenticate(request)
+
+        request = self.factory.get("/")
+        request.COOKIES["jwt"] = generate_jwt_token(self.user)
+        self.assertEqual(JWTAuthentication().authenticate(request)[0].pk, self.user.pk)
+
+    def test_bearer_token_needs_no_csrf(self):
+        request = self.factory.post("/", HTTP_AUTHORIZATION=f"Bearer {generate_jwt_token(self.user)}")
+        self.assertEqual(JWTAuthentication().authenticate(request)[0].pk, self.user.pk)
+
+
+class RefreshTokenTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="refresh@example.com", role=UserRole.CUSTOMER)
+        self.user.set_password("old-password")
+        self.user.save()
+
+    def test_refresh_rotates_the_token(self):
+        _, refresh = issue_tokens(self.user)
+        access, rotated, user = rotate(refresh)
+        self.assertEqual(user, self.user)
+        self.assertEqual(decode(access, ACCESS)["user_id"], self.user.pk)
+        self.assertEqual(decode(rotated, REFRESH)["family"], decode(refresh, REFRESH)["family"])
+        with self.assertRaises(TokenError):
+            decode(rotated, ACCESS)
+
+    def test_reuse_revokes_the_family(self):
+        _, refresh = issue_tokens(self.user)
+        _, rotated, _ = rotate(refresh)
+        with self.assertRaisesMessage(TokenError, "reused"):
+            rotate(refresh)
+        # The legitimate holder is logged out as well
+        with self.assertRaises(TokenError):
+            rotate(rotated)
+
+    def test_logout_and_password_change_revoke(self):
+        _, refresh = issue_tokens(self.user)
+        revoke(refresh)
+        with self.assertRaises(TokenError):
+            rotate(refresh)
+
+        _, refresh = issue_tokens(self.user)
+        self.user.set_password("new-password")
+        self.user.save()
+        with self.assertRaises(TokenError):
+            rotate(refresh)
+
+    def test_expired_entries_are_pruned(self):
+        RevokedToken.objects.create(jti="stale", expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        revoke(issue_tokens(self.user)[1])
+        self.assertFalse(RevokedToken.objects.filter(jti="stale").exists())
+        self.assertEqual(RevokedToken.objects.count(), 1)
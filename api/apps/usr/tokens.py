@@ -0,0 +1,129 @@
+import datetime
+import uuid
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.usr.models import RevokedToken
+
+
+# ===========================
+# Access / refresh tokens
+# ===========================
+#
+# Access tokens are short lived and fully stateless: JWTAuthentication trusts
+# the signature and never looks anything up to validate them. Refresh tokens
+# are only accepted by the refresh endpoint, and each one can be used once:
+# refreshing revokes it and issues a new pair from the same "family". Presenting
+# a refresh token that was already used revokes the whole family, and changing
+# the password invalidates every refresh token issued before.
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class TokenError(Exception):
+    pass
+
+
+def _encode(payload, lifetime):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    payload.update(iat=now, exp=now + lifetime, jti=uuid.uuid4().hex)
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+
+
+def _password_stamp(user):
+    # Changes whenever the password does, like Django's session auth hash
+    return user.get_session_auth_hash()[:16]
+
+
+def access_token(user):
+    payload = {"user_id": user.id, "type": ACCESS}
+    if settings.JWT_ROLE_CLAIMS:
+        # Lets permission checks run on the token alone (see JWTAuthentication)
+        payload["role"] = user.role
+        payload["is_active"] = user.is_active
+    return _encode(payload, datetime.timedelta(minutes=settings.JWT_ACCESS_TOKEN_MINUTES))
+
+
+def refresh_token(user, family=None):
+    payload = {
+        "user_id": user.id,
+        "type": REFRESH,
+        "family": family or uuid.uuid4().hex,
+        "pwd": _password_stamp(user),
+    }
+    return _encode(payload, datetime.timedelta(days=settings.JWT_REFRESH_TOKEN_DAYS))
+
+
+def issue_tokens(user):
+    """A fresh (access, refresh) pair starting a new refresh family, e.g. at login."""
+    return access_token(user), refresh_token(user)
+
+
+def decode(token, token_type):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise TokenError("Token has expired")
+    except jwt.InvalidTokenError:
+        raise TokenError("Invalid token")
+
+    # Tokens issued before refresh tokens existed carry no type and are access tokens
+    if payload.get("type", ACCESS) != token_type:
+        raise TokenError("Invalid token type")
+    return payload
+
+
+def _expiry(payload):
+    return datetime.datetime.fromtimestamp(payload["exp"], tz=datetime.timezone.utc)
+
+
+def _family_expiry():
+    # Later tokens of the family may outlive this one; none outlives a full refresh lifetime
+    return timezone.now() + datetime.timedelta(days=settings.JWT_REFRESH_TOKEN_DAYS)
+
+
+def _revoke(jti, expires_at):
+    """Add `jti` to the revocation list; False if it was already there."""
+    # Entries past their token's expiry are dead weight, drop them as we go
+    RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def rotate(token):
+    """
+    Exchange a refresh token for a new (access, refresh) pair and the user.
+    Raises TokenError if the token is invalid, expired, revoked or reused.
+    """
+    payload = decode(token, REFRESH)
+    if RevokedToken.objects.filter(jti=payload["family"]).exists():
+        raise TokenError("Token has been revoked")
+
+    user = get_user_model().objects.filter(id=payload["user_id"], is_active=True).first()
+    if user is None or payload.get("pwd") != _password_stamp(user):
+        raise TokenError("Token has been revoked")
+
+    # The insert doubles as a lock: of two requests racing with the same token, one loses
+    if not _revoke(payload["jti"], _expiry(payload)):
+        _revoke(payload["family"], _family_expiry())
+        raise TokenError("Token has been reused")
+
+    return access_token(user), refresh_token(user, family=payload["family"]), user
+
+
+def revoke(token):
+    """Revoke the refresh family of `token` (logout). Invalid tokens are ignored."""
+    try:
+        payload = decode(token, REFRESH)
+    except TokenError:
+        return
+    _revoke(payload["family"], _family_expiry())
@@ -11,6 +11,7 @@ from apps.usr.views import (
     PasswordResetVerifyEmailView,
     PasswordResetVerifyOTPView,
     PasswordResetConfirmView,
+    TokenRefreshView,
 )
 
 urlpatterns = [
@@ -22,6 +23,7 @@ urlpatterns = [
     path("password_reset_confirm/", PasswordResetConfirmView.as_view(), name="password_reset_confirm"),
     path('login/', UserLoginView.as_view(), name='login'),
     path('logout/', UserLogoutView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/change_password/', ChangePasswordView.as_view(), name='change_user_password'),
     path("me/profile", CurrentUserDetailView.as_view(), name="current_user_profile"),
 ]
@@ -1,27 +1,55 @@
-import datetime, jwt, random, logging
+import random, logging, uuid
 from django.conf import settings
-from django.contrib.auth import get_user_model, logout
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import AuthenticationFailed
 
+from apps.usr.tokens import ACCESS, TokenError, access_token, decode
+
 
 # Set up a logger for internal errors
 logger = logging.getLogger(__name__)
 
 
 
-# Utility function to generate JWT token
+# Utility function to generate JWT token (a short-lived access token, see apps.usr.tokens)
 def generate_jwt_token(user):
-    payload = {
-        "user_id": user.id,
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(days=7),
-        "iat": datetime.datetime.utcnow(),
-    }
+    return access_token(user)
+
+
+# Set / clear the auth cookies (access token for the API, refresh token for the refresh endpoint only)
+REFRESH_COOKIE = 'jwt_refresh'
+REFRESH_COOKIE_PATH = '/api/auth/token/'
+
+
+def set_auth_cookies(response, access, refresh):
+    response.set_cookie(
+        key='jwt',
+        value=access,
+        max_age=settings.JWT_ACCESS_TOKEN_MINUTES * 60,
+        httponly=settings.JWT_COOKIE_HTTPONLY,
+        secure=settings.JWT_COOKIE_SECURE,
+        samesite='Lax'
+    )
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=refresh,
+        max_age=settings.JWT_REFRESH_TOKEN_DAYS * 24 * 60 * 60,
+        path=REFRESH_COOKIE_PATH,
+        httponly=True,
+        secure=settings.JWT_COOKIE_SECURE,
+        samesite='Lax'
+    )
+    return response
+
 
-    # Encode the payload
-    token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
-    return token
+def clear_auth_cookies(response):
+    response.delete_cookie('jwt')
+    response.delete_cookie(REFRESH_COOKIE, path=REFRESH_COOKIE_PATH)
+    return response
 
 
 # Utility function to get user from JWT token
@@ -33,22 +61,81 @@ def get_user_from_token(request):
     
     try:
         # Decode the token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        user_id = payload.get("user_id")
-        user = get_user_model().objects.get(id=user_id)
-        return user
-    
-    except (jwt.ExpiredSignatureError, jwt.DecodeError, get_user_model().DoesNotExist): 
+        user_id = decode(token, ACCESS).get("user_id")
+    except TokenError:
         return handle_invalid_token()
 
+    # Reuse the user the permission checks already resolved
+    current = getattr(request, "user", None)
+    if current is not None and current.is_authenticated and current.pk == user_id:
+        return current
+
+    user = get_cached_user(user_id)
+    if user is None:
+        return handle_invalid_token()
+    return user
+
+
+
+
+# ===========================
+# Cached user lookup
+# ===========================
+# Users are cached for USER_CACHE_TIMEOUT seconds together with the per-user
+# version stamp they were loaded under. Every save or delete of the user
+# replaces the stamp (see apps.usr.controller.signals), so a password, role or
+# is_active change is seen on the very next request, and a lookup racing with
+# the change can only fill an entry whose stamp no longer matches.
+# The stamp and the entry are read with one get_many: a single round trip,
+# which matters with CACHE_BACKEND=db where every cache read is a query.
+# Only the fields authentication and permission checks read are cached (never
+# the password hash); anything else is loaded from the database on access.
+USER_VERSION_TIMEOUT = 60 * 60 * 24
+CACHED_USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'gender', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _user_version_key(user_id):
+    return f"auth_user:{user_id}:version"
+
+
+def _user_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """Return the user with `user_id`, or None, going to the database at most once per TTL."""
+    version_key, key = _user_version_key(user_id), _user_key(user_id)
+    cached = cache.get_many([version_key, key])
+    version = cached.get(version_key)
+    if version is None:
+        # add, not set: never replace a stamp an invalidation has just written
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, USER_VERSION_TIMEOUT):
+            version = cache.get(version_key)
+
+    User = get_user_model()
+    # from_db expects the values in model field order
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in CACHED_USER_FIELDS]
+    entry = cached.get(key)
+    if entry is not None and entry[0] == version:
+        values = entry[1]
+    else:
+        values = User.objects.filter(id=user_id).values_list(*fields).first()
+        if values is None:
+            return None
+        cache.set(key, (version, values), settings.USER_CACHE_TIMEOUT)
+    return User.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+
+def invalidate_cached_user(user_id):
+    cache.set(_user_version_key(user_id), uuid.uuid4().hex, USER_VERSION_TIMEOUT)
+
 
 
 # Handle session expiration
 def handle_session_expired(request):
     response = Response({'message': 'Session ended. Please log in again.'}, status=status.HTTP_401_UNAUTHORIZED)
-    response.delete_cookie('jwt')
-    logout(request)
-    return response
+    return clear_auth_cookies(response)
 
 
 
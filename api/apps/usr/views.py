@@ -1,8 +1,8 @@
 from django.conf import settings
-from django.contrib.auth import login, logout, get_user_model, update_session_auth_hash
-from django.core.cache import cache
+from django.contrib.auth import get_user_model
 from django.core.mail import EmailMessage
 from rest_framework import status, generics, viewsets, mixins
+from rest_framework.exceptions import Throttled
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
@@ -17,7 +17,9 @@ from apps.usr.serializers import (
     PasswordResetVerifyOTPSerializer,
     PasswordResetConfirmSerializer
 )
-from apps.usr.utils import generate_jwt_token, get_user_from_token, generate_otp
+from apps.usr.otp import ACCOUNT_ACTIVATION, PASSWORD_RESET, OTPRateLimited
+from apps.usr.tokens import TokenError, issue_tokens, revoke, rotate
+from apps.usr.utils import REFRESH_COOKIE, clear_auth_cookies, get_user_from_token, set_auth_cookies
 from apps.usr.permissions import IsNotAdmin
 
 
@@ -26,6 +28,7 @@ from apps.usr.permissions import IsNotAdmin
 class UserSignUpView(generics.GenericAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -40,12 +43,8 @@ class UserSignUpView(generics.GenericAPIView):
             user.is_active = False
             user.save()
 
-            # OTP
-            otp = generate_otp()
-            cache_key = f"otp_{user.id}"
-
-            # Store OTP (5 minutes)
-            cache.set(cache_key, otp, timeout=300)
+            # OTP (5 minutes, shared across workers)
+            otp = ACCOUNT_ACTIVATION.issue(user)
 
             # Send Email
             EmailMessage(
@@ -68,6 +67,7 @@ class UserSignUpView(generics.GenericAPIView):
 class UserActivateVerifyOTPView(generics.GenericAPIView):
     serializer_class = UserActivateVerifyOTPSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -80,6 +80,7 @@ class UserActivateVerifyOTPView(generics.GenericAPIView):
 class UserActivateResendOTPView(generics.GenericAPIView):
     serializer_class = UserActivateResendOTPSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -94,6 +95,7 @@ class UserActivateResendOTPView(generics.GenericAPIView):
 class UserLoginView(generics.GenericAPIView):
     serializer_class = UserLoginSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
     
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -102,22 +104,10 @@ class UserLoginView(generics.GenericAPIView):
             user = validated_data['user']
             message = validated_data['message']
 
-            # Generate JWT token
-            token = generate_jwt_token(user)
-            login(request, user)
-            response = Response(status=status.HTTP_200_OK)
-            
-            # Set JWT in an HttpOnly cookie
-            response.set_cookie(
-                key='jwt', 
-                value=token,
-                httponly=settings.JWT_COOKIE_HTTPONLY,
-                secure=settings.JWT_COOKIE_SECURE,
-                samesite='Lax'
-            )
-
-            response.data = {"message": message, "token": token}
-            return response
+            # Issue a short-lived access token and a rotating refresh token; no session is created
+            access, refresh = issue_tokens(user)
+            response = Response({"message": message, "token": access, "access": access}, status=status.HTTP_200_OK)
+            return set_auth_cookies(response, access, refresh)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -130,11 +120,29 @@ class UserLogoutView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsNotAdmin]
     
     def post(self, request, *args, **kwargs):
-        response = Response(status=status.HTTP_200_OK) 
-        response.delete_cookie('jwt') 
-        logout(request)
-        response.data = {'message': 'Logout success!'}
-        return response
+        # Access tokens simply expire; the refresh token is revoked so it cannot mint new ones
+        revoke(request.COOKIES.get(REFRESH_COOKIE, ""))
+        response = Response({'message': 'Logout success!'}, status=status.HTTP_200_OK)
+        return clear_auth_cookies(response)
+
+
+
+
+# Token Refresh View (rotates the refresh token on every use)
+class TokenRefreshView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        token = request.COOKIES.get(REFRESH_COOKIE) or request.data.get("refresh", "")
+        try:
+            access, refresh, user = rotate(token)
+        except TokenError as exc:
+            response = Response({"message": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+            return clear_auth_cookies(response)
+
+        response = Response({"token": access, "access": access}, status=status.HTTP_200_OK)
+        return set_auth_cookies(response, access, refresh)
 
 
 
@@ -157,8 +165,10 @@ class ChangePasswordView(generics.UpdateAPIView):
         if serializer.is_valid():
             user.set_password(serializer.validated_data['new_password'])
             user.save()
-            update_session_auth_hash(request, user)
-            return Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
+            # Older refresh tokens stop working with the old password; hand out a fresh pair
+            access, refresh = issue_tokens(user)
+            response = Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
+            return set_auth_cookies(response, access, refresh)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -203,11 +213,9 @@ class CurrentUserDetailView(generics.RetrieveUpdateDestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         user = self.get_object()
         user.delete()
-        logout(request)
 
         response = Response({"message": "Account successfully deleted."}, status=status.HTTP_204_NO_CONTENT)
-        response.delete_cookie("jwt")
-        return response
+        return clear_auth_cookies(response)
 
 
 
@@ -215,6 +223,7 @@ class CurrentUserDetailView(generics.RetrieveUpdateDestroyAPIView):
 class PasswordResetVerifyEmailView(generics.GenericAPIView):
     serializer_class = PasswordResetVerifyEmailSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -223,11 +232,12 @@ class PasswordResetVerifyEmailView(generics.GenericAPIView):
             email = serializer.validated_data["email"]
             user = get_user_model().objects.get(email=email)
 
-            # Generate OTP
-            otp = generate_otp()
-            cache_key = f"password_reset_otp_{user.id}"
-
-            cache.set(cache_key, otp, timeout=300)  # 5 minutes
+            # Generate OTP (5 minutes)
+            try:
+                otp = PASSWORD_RESET.issue(user)
+            except OTPRateLimited as exc:
+                # Same 429 body and Retry-After header as the activation resend
+                raise Throttled(wait=exc.wait, detail=str(exc))
 
             EmailMessage(
                 subject="Password Reset OTP",
@@ -250,17 +260,16 @@ class PasswordResetVerifyEmailView(generics.GenericAPIView):
 class PasswordResetVerifyOTPView(generics.GenericAPIView):
     serializer_class = PasswordResetVerifyOTPSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
 
         if serializer.is_valid():
-            email = serializer.validated_data["email"]
-            user = get_user_model().objects.get(email=email)
+            user = serializer.validated_data["user"]
 
             # OTP is already validated; now mark user as "verified for reset"
-            cache_key = f"password_reset_verified_{user.id}"
-            cache.set(cache_key, True, timeout=600)  # 10 minutes to complete password reset
+            PASSWORD_RESET.mark_verified(user)  # 10 minutes to complete password reset
 
             return Response(
                 {"message": "OTP verified. You may now reset your password."},
@@ -276,6 +285,7 @@ class PasswordResetVerifyOTPView(generics.GenericAPIView):
 class PasswordResetConfirmView(generics.GenericAPIView):
     serializer_class = PasswordResetConfirmSerializer
     permission_classes = [AllowAny]
+    authentication_classes = []
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -290,10 +300,7 @@ class PasswordResetConfirmView(generics.GenericAPIView):
                 return Response({"message": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
             # Check if OTP was verified
-            verify_key = f"password_reset_verified_{user.id}"
-            verified = cache.get(verify_key)
-
-            if not verified:
+            if not PASSWORD_RESET.is_verified(user):
                 return Response(
                     {"message": "OTP verification required before resetting password."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -303,9 +310,8 @@ class PasswordResetConfirmView(generics.GenericAPIView):
             user.set_password(new_password)
             user.save()
 
-            # Clean up cache
-            cache.delete(verify_key)
-            cache.delete(f"password_reset_otp_{user.id}")
+            # Clean up OTP state
+            PASSWORD_RESET.clear(user)
 
             return Response({"message": "Password reset successful."}, status=status.HTTP_200_OK)
 
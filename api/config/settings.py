@@ -78,6 +78,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # third-party
     "rest_framework",
@@ -86,6 +87,8 @@ INSTALLED_APPS = [
     #
     'apps.usr',
     'apps.eshop',
+    'apps.jobs',
+    'apps.outbox',
 ]
 
 MIDDLEWARE = [
@@ -167,17 +170,51 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 # Caches settings
-CACHES = {
-    'default': {
+# CACHE_BACKEND: redis | db | locmem. Anything that has to be seen by every
+# gunicorn worker (OTPs, shared caches) needs redis or db; locmem is per process
+# and only suitable for local development.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+
+
+def cache_config(prefix):
+    if CACHE_BACKEND == "redis":
+        return {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"),
+            'KEY_PREFIX': prefix,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    if CACHE_BACKEND == "db":
+        # Table created by `manage.py createcachetable`, expired rows removed by `manage.py sweep_cache`
+        return {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_entries',
+            'KEY_PREFIX': prefix,
+        }
+    return {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-local',
+        'LOCATION': prefix,
     }
+
+
+CACHES = {
+    'default': cache_config('shop'),
+    'otp': cache_config('otp'),
 }
+OTP_CACHE_ALIAS = 'otp'
 
 
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Mail sent during a request is queued in the outbox (one INSERT) and delivered
+# by `manage.py send_outbox` through OUTBOX_DELIVERY_BACKEND.
+EMAIL_BACKEND = 'apps.outbox.backends.OutboxBackend'
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_BACKOFF_SECONDS", 60))
+OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 3600))
+OUTBOX_LOCK_TIMEOUT_SECONDS = int(os.getenv("OUTBOX_LOCK_TIMEOUT_SECONDS", 600))
+EMAIL_TIMEOUT = 30
 EMAIL_HOST='smtp.gmail.com'
 EMAIL_PORT= '587'
 EMAIL_HOST_USER= 'nkurudavid44@gmail.com'
@@ -209,6 +246,39 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+
+# Product image storage (content-addressed, see apps/eshop/storage.py)
+# "local" writes under MEDIA_ROOT/product_images, "s3" targets any S3-compatible bucket
+PRODUCT_IMAGE_STORAGE = os.getenv("PRODUCT_IMAGE_STORAGE", "local")
+
+if PRODUCT_IMAGE_STORAGE == "s3":
+    PRODUCT_IMAGE_STORAGE_CONFIG = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv("PRODUCT_IMAGE_S3_BUCKET"),
+            "endpoint_url": os.getenv("PRODUCT_IMAGE_S3_ENDPOINT_URL") or None,
+            "access_key": os.getenv("PRODUCT_IMAGE_S3_ACCESS_KEY"),
+            "secret_key": os.getenv("PRODUCT_IMAGE_S3_SECRET_KEY"),
+            "region_name": os.getenv("PRODUCT_IMAGE_S3_REGION") or None,
+            "location": "product_images",
+            "default_acl": None,
+            "querystring_auth": False,
+        },
+    }
+else:
+    PRODUCT_IMAGE_STORAGE_CONFIG = {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.getenv("PRODUCT_IMAGE_ROOT", str(MEDIA_ROOT / "product_images")),
+        },
+    }
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "product_images": PRODUCT_IMAGE_STORAGE_CONFIG,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -217,12 +287,42 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 JWT_COOKIE_HTTPONLY = env_bool("JWT_COOKIE_HTTPONLY", default=True)
 JWT_COOKIE_SECURE = env_bool("JWT_COOKIE_SECURE", not DEBUG)
+# Put role and is_active into the token so role checks need no user lookup.
+# Changes to either then apply when the token is next issued.
+JWT_ROLE_CLAIMS = env_bool("JWT_ROLE_CLAIMS", False)
+# Access tokens are stateless and short lived; refresh tokens rotate on every use (apps.usr.tokens)
+JWT_ACCESS_TOKEN_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_MINUTES", 15))
+JWT_REFRESH_TOKEN_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_DAYS", 7))
+# Seconds an authenticated user is served from the cache (apps.usr.utils.get_cached_user)
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 60))
+
+
+# Unpaid (non COD) orders hold their stock for this long, see release_expired_reservations
+ORDER_RESERVATION_MINUTES = int(os.getenv("ORDER_RESERVATION_MINUTES", 30))
+# Seconds the seller dashboard metrics are served from the cache (apps.eshop.metrics)
+SHOP_METRICS_TIMEOUT = int(os.getenv("SHOP_METRICS_TIMEOUT", 5))
+# Seconds storefront facet counts are cached per filter set (apps.eshop.facets)
+SHOP_FACETS_TIMEOUT = int(os.getenv("SHOP_FACETS_TIMEOUT", 60))
+# Cache-Control of the anonymous catalogue endpoints (shared caches included), see apps.eshop.versions
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", 60))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_STALE_WHILE_REVALIDATE", 300))
+# Days product deletions are kept for the ?updated_since= feed (apps.eshop.sync)
+CATALOG_TOMBSTONE_DAYS = int(os.getenv("CATALOG_TOMBSTONE_DAYS", 30))
+
+
+# Background jobs (apps.jobs), run by `manage.py run_jobs`
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_BACKOFF_SECONDS = int(os.getenv("JOB_BACKOFF_SECONDS", 30))
+JOB_BACKOFF_MAX_SECONDS = int(os.getenv("JOB_BACKOFF_MAX_SECONDS", 3600))
+JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", 600))
 
 
 # Django REST Framework configuration
 REST_FRAMEWORK = {
+    # Stateless: the API authenticates from the signed access token only.
+    # Sessions are left to the Django admin.
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.SessionAuthentication', 
+        'apps.usr.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -5,6 +5,30 @@ python manage.py collectstatic --noinput
 
 echo "Applying database migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
+
+if [ "$CACHE_BACKEND" = "db" ]; then
+  echo "Starting cache sweeper..."
+  (while true; do python manage.py sweep_cache; sleep 600; done) &
+fi
+
+echo "Starting sales rollup refresher..."
+(while true; do python manage.py refresh_sales_rollups --days 2; sleep 3600; done) &
+
+echo "Starting expired reservation releaser..."
+# Unpaid orders past reserved_until give their stock back (ORDER_RESERVATION_MINUTES)
+(while true; do python manage.py release_expired_reservations; sleep 60; done) &
+
+echo "Starting product tombstone pruner..."
+(while true; do python manage.py prune_product_tombstones; sleep 86400; done) &
+
+echo "Starting background job worker..."
+# Restarted if it dies; jobs it held are requeued once their lock goes stale
+(while true; do python manage.py run_jobs; echo "Job worker exited, restarting..."; sleep 5; done) &
+
+echo "Starting outbox email sender..."
+# Restarted like the job worker; emails it held are requeued once their lock goes stale
+(while true; do python manage.py send_outbox; echo "Outbox sender exited, restarting..."; sleep 5; done) &
 
 echo "Starting Gunicorn..."
 python -m gunicorn config.wsgi:application \
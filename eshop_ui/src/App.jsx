@@ -262,9 +262,7 @@ const ProductCard = ({ product, onAddToCart, onToggleWishlist, isInWishlist }) =
           {product.product_images?.[0] ? (
             <img
               src={
-                product.product_images[0].image_base64.startsWith('data:')
-                  ? product.product_images[0].image_base64
-                  : `data:${product.product_images[0].mime_type};base64,${product.product_images[0].image_base64}`
+                product.product_images[0].image_url
               }
               alt={product.product_name}
             />
@@ -361,9 +359,7 @@ const CartSidebar = ({ isOpen, onClose, cart, onUpdateQuantity, onRemoveItem, on
                   {item.product_images && item.product_images[0] ? (
                     <img
                       src={
-                          item.product_images[0].image_base64.startsWith('data:')
-                            ? item.product_images[0].image_base64
-                            : `data:${item.product_images[0].mime_type};base64,${item.product_images[0].image_base64}`
+                          item.product_images[0].image_url
                         }
                       alt={item.product_name}
                       className="w-full h-full object-cover rounded"
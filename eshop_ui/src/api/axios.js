@@ -1,6 +1,16 @@
 import axios from 'axios';
 import { API_BASE_URL } from '../utils/constants';
-import Cookies from 'js-cookie';
+import { AUTH_ENDPOINTS } from './endpoints';
+
+// The access token is only kept in memory, out of reach of injected scripts.
+// After a page load it is obtained again from the httponly refresh cookie.
+let accessToken = null;
+
+export const setAccessToken = (token) => {
+  accessToken = token || null;
+};
+
+export const getAccessToken = () => accessToken;
 
 const axiosInstance = axios.create({
   baseURL: API_BASE_URL,
@@ -13,9 +23,8 @@ const axiosInstance = axios.create({
 // Request interceptor to add token
 axiosInstance.interceptors.request.use(
   (config) => {
-    const token = Cookies.get('access_token');
-    if (token) {
-      config.headers.Authorization = `Bearer ${token}`;
+    if (accessToken) {
+      config.headers.Authorization = `Bearer ${accessToken}`;
     }
     return config;
   },
@@ -24,13 +33,40 @@ axiosInstance.interceptors.request.use(
   }
 );
 
-// Response interceptor for error handling
+// Response interceptor: on 401 rotate the refresh cookie once and retry
+let refreshing = null;
+
 axiosInstance.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (
+      error.response?.status === 401 &&
+      original &&
+      !original._retry &&
+      original.url !== AUTH_ENDPOINTS.TOKEN_REFRESH
+    ) {
+      original._retry = true;
+      try {
+        refreshing = refreshing || axiosInstance.post(AUTH_ENDPOINTS.TOKEN_REFRESH);
+        const { data } = await refreshing;
+        setAccessToken(data.access);
+        original.headers.Authorization = `Bearer ${data.access}`;
+        return axiosInstance(original);
+      } catch (refreshError) {
+        setAccessToken(null);
+        window.location.href = '/login';
+        return Promise.reject(refreshError);
+      } finally {
+        refreshing = null;
+      }
+    }
     if (error.response?.status === 401) {
-      Cookies.remove('access_token');
-      window.location.href = '/login';
+      setAccessToken(null);
+      // Silent requests (restoring the session on page load) handle a 401 themselves
+      if (!original?.skipAuthRedirect) {
+        window.location.href = '/login';
+      }
     }
     return Promise.reject(error);
   }
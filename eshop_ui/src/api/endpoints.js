@@ -11,6 +11,7 @@ export const AUTH_ENDPOINTS = {
   PASSWORD_RESET_CONFIRM: '/auth/password_reset_confirm/',
   LOGIN: '/auth/login/',
   LOGOUT: '/auth/logout/',
+  TOKEN_REFRESH: '/auth/token/refresh/',
   CHANGE_PASSWORD: '/auth/me/change_password/',
   PROFILE: '/auth/me/profile',
 };
@@ -10,7 +10,7 @@ const CartItem = ({ item, onUpdateQuantity, onRemove }) => {
       <div className="w-16 h-16 md:w-20 md:h-20 bg-gray-200 rounded-lg flex-shrink-0 overflow-hidden">
         {item.product_images && item.product_images[0] ? (
           <img
-            src={`data:${item.product_images[0].mime_type};base64,${item.product_images[0].image_base64}`}
+            src={item.product_images[0].image_url}
             alt={item.product_name}
             className="w-full h-full object-cover"
           />
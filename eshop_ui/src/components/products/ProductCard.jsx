@@ -14,6 +14,10 @@ const ProductCard = ({ product, onQuickView }) => {
     const [isInWishlist, setIsInWishlist] = useState(false);
     const [loading, setLoading] = useState(false);
 
+    // List endpoints send a compact card (thumbnail, review_count); wishlist items carry the full product
+    const image = product.thumbnail || product.product_images?.[0]?.image_url;
+    const reviewCount = product.review_count ?? product.reviews?.length ?? 0;
+
     const handleAddToCart = (e) => {
         e.stopPropagation();
         if (!product.in_stock) {
@@ -71,9 +75,12 @@ const ProductCard = ({ product, onQuickView }) => {
             {/* Image Container */}
             <div className="relative overflow-hidden bg-gray-100">
                 <div className="aspect-w-1 aspect-h-1 w-full h-48 sm:h-56 md:h-64">
-                    {product.product_images && product.product_images.length > 0 ? (
+                    {image ? (
                         <img
-                            src={`data:${product.product_images[0].mime_type};base64,${product.product_images[0].image_base64}`}
+                            src={image}
+                            srcSet={product.thumbnail ? undefined : product.product_images[0].srcset?.webp}
+                            sizes="(max-width: 640px) 50vw, 320px"
+                            loading="lazy"
                             alt={product.product_name}
                             className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
                         />
@@ -163,9 +170,9 @@ const ProductCard = ({ product, onQuickView }) => {
                     <span className="text-xs md:text-sm text-gray-600">
                         ({product.average_rating || '0.0'})
                     </span>
-                    {product.reviews && product.reviews.length > 0 && (
+                    {reviewCount > 0 && (
                         <span className="text-xs text-gray-500">
-                            {product.reviews.length} reviews
+                            {reviewCount} reviews
                         </span>
                     )}
                 </div>
@@ -1,16 +1,32 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { X, Star, ShoppingCart, Heart, Plus, Minus } from 'lucide-react';
 import { useCart } from '../../hooks/useCart';
 import { useNavigate } from 'react-router-dom';
 import Button from '../common/Button';
 import Modal from '../common/Modal';
+import axiosInstance from '../../api/axios';
+import { SHOP_PUBLIC_ENDPOINTS } from '../../api/endpoints';
 
-const ProductQuickView = ({ product, isOpen, onClose }) => {
+const ProductQuickView = ({ product: summary, isOpen, onClose }) => {
     const navigate = useNavigate();
     const { addToCart } = useCart();
     const [quantity, setQuantity] = useState(1);
     const [selectedImage, setSelectedImage] = useState(0);
-
+    const [details, setDetails] = useState(null);
+
+    // List rows are compact cards: load the full product (images, description) once opened
+    useEffect(() => {
+        if (!isOpen || !summary) return;
+        let active = true;
+        axiosInstance.get(SHOP_PUBLIC_ENDPOINTS.PRODUCT_DETAIL(summary.id))
+            .then(({ data }) => active && setDetails(data))
+            .catch(() => {});
+        return () => {
+            active = false;
+        };
+    }, [isOpen, summary]);
+
+    const product = details && summary && details.id === summary.id ? details : summary;
     if (!product) return null;
 
     const handleAddToCart = () => {
@@ -33,7 +49,13 @@ const ProductQuickView = ({ product, isOpen, onClose }) => {
                     <div className="bg-gray-100 rounded-lg overflow-hidden mb-4 aspect-square">
                         {product.product_images && product.product_images.length > 0 ? (
                             <img
-                                src={`data:${product.product_images[selectedImage].mime_type};base64,${product.product_images[selectedImage].image_base64}`}
+                                src={product.product_images[selectedImage]?.image_url}
+                                alt={product.product_name}
+                                className="w-full h-full object-cover"
+                            />
+                        ) : product.thumbnail ? (
+                            <img
+                                src={product.thumbnail}
                                 alt={product.product_name}
                                 className="w-full h-full object-cover"
                             />
@@ -55,7 +77,7 @@ const ProductQuickView = ({ product, isOpen, onClose }) => {
                                         }`}
                                 >
                                     <img
-                                        src={`data:${img.mime_type};base64,${img.image_base64}`}
+                                        src={img.image_url}
                                         alt={`${product.product_name} ${idx + 1}`}
                                         className="w-full h-full object-cover aspect-square"
                                     />
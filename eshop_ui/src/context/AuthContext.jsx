@@ -1,7 +1,6 @@
 import React, { createContext, useState, useEffect } from 'react';
-import axiosInstance from '../api/axios';
+import axiosInstance, { getAccessToken, setAccessToken } from '../api/axios';
 import { AUTH_ENDPOINTS } from '../api/endpoints';
-import Cookies from 'js-cookie';
 import toast from 'react-hot-toast';
 
 export const AuthContext = createContext();
@@ -17,14 +16,18 @@ export const AuthProvider = ({ children }) => {
   // Check if user is authenticated
   const checkAuth = async () => {
     try {
-      const token = Cookies.get('access_token');
-      if (token) {
-        const { data } = await axiosInstance.get(AUTH_ENDPOINTS.PROFILE);
-        setUser(data);
+      if (!getAccessToken()) {
+        // Restore the session from the httponly refresh cookie, if there is one
+        const { data } = await axiosInstance.post(AUTH_ENDPOINTS.TOKEN_REFRESH, null, { skipAuthRedirect: true });
+        setAccessToken(data.access);
       }
+      const { data } = await axiosInstance.get(AUTH_ENDPOINTS.PROFILE);
+      setUser(data);
     } catch (error) {
-      console.error('Auth check failed:', error);
-      Cookies.remove('access_token');
+      if (error.response?.status !== 401) {
+        console.error('Auth check failed:', error);
+      }
+      setAccessToken(null);
       setUser(null);
     } finally {
       setLoading(false);
@@ -91,7 +94,7 @@ export const AuthProvider = ({ children }) => {
       });
 
       if (data.access) {
-        Cookies.set('access_token', data.access, { expires: 7 });
+        setAccessToken(data.access);
       }
 
       await checkAuth();
@@ -112,7 +115,7 @@ export const AuthProvider = ({ children }) => {
   const logout = async () => {
     try {
       await axiosInstance.post(AUTH_ENDPOINTS.LOGOUT);
-      Cookies.remove('access_token');
+      setAccessToken(null);
       setUser(null);
       toast.success('Logged out successfully', {
         icon: '👋',
@@ -120,7 +123,7 @@ export const AuthProvider = ({ children }) => {
     } catch (error) {
       console.error('Logout error:', error);
       // Still clear local state even if API call fails
-      Cookies.remove('access_token');
+      setAccessToken(null);
       setUser(null);
     }
   };
@@ -232,7 +235,7 @@ export const AuthProvider = ({ children }) => {
   const deleteAccount = async () => {
     try {
       await axiosInstance.delete(AUTH_ENDPOINTS.PROFILE);
-      Cookies.remove('access_token');
+      setAccessToken(null);
       setUser(null);
       toast.success('Account deleted successfully');
     } catch (error) {
@@ -278,7 +278,7 @@ const Checkout = () => {
                                         <div className="w-16 h-16 bg-gray-100 rounded-lg flex items-center justify-center flex-shrink-0">
                                             {item.product_images?.[0] ? (
                                                 <img
-                                                    src={`data:${item.product_images[0].mime_type};base64,${item.product_images[0].image_base64}`}
+                                                    src={item.product_images[0].image_url}
                                                     alt={item.product_name}
                                                     className="w-full h-full object-cover rounded-lg"
                                                 />
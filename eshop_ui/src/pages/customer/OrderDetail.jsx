@@ -175,7 +175,7 @@ const OrderDetail = () => {
                                         <div className="w-20 h-20 bg-gray-100 rounded-lg flex items-center justify-center flex-shrink-0">
                                             {item.product?.product_images?.[0] ? (
                                                 <img
-                                                    src={`data:${item.product.product_images[0].mime_type};base64,${item.product.product_images[0].image_base64}`}
+                                                    src={item.product.product_images[0].image_url}
                                                     alt={item.product.product_name}
                                                     className="w-full h-full object-cover rounded-lg"
                                                 />
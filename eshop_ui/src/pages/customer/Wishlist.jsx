@@ -126,7 +126,7 @@ const Wishlist = () => {
                                 <div className="relative overflow-hidden rounded-lg mb-4 bg-gray-100 aspect-square">
                                     {item.product.product_images && item.product.product_images.length > 0 ? (
                                         <img
-                                            src={`data:${item.product.product_images[0].mime_type};base64,${item.product.product_images[0].image_base64}`}
+                                            src={item.product.product_images[0].image_url}
                                             alt={item.product.product_name}
                                             className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
                                         />
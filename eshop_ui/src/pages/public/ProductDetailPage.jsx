@@ -115,7 +115,7 @@ const ProductDetailPage = () => {
                             <div className="bg-gray-100 aspect-square rounded-t-lg overflow-hidden">
                                 {product.product_images && product.product_images.length > 0 ? (
                                     <img
-                                        src={`data:${product.product_images[selectedImage].mime_type};base64,${product.product_images[selectedImage].image_base64}`}
+                                        src={product.product_images[selectedImage].image_url}
                                         alt={product.product_name}
                                         className="w-full h-full object-cover"
                                     />
@@ -137,7 +137,7 @@ const ProductDetailPage = () => {
                                                 }`}
                                         >
                                             <img
-                                                src={`data:${img.mime_type};base64,${img.image_base64}`}
+                                                src={img.image_url}
                                                 alt={`${product.product_name} ${idx + 1}`}
                                                 className="w-full h-full object-cover"
                                             />
@@ -50,7 +50,7 @@ const ProductsPage = () => {
         if (searchQuery) {
             result = result.filter(product =>
                 product.product_name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                product.description.toLowerCase().includes(searchQuery.toLowerCase())
+                (product.description || '').toLowerCase().includes(searchQuery.toLowerCase())
             );
         }
 